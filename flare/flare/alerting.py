@@ -1,13 +1,27 @@
 from enum import Enum
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field, replace
 from abc import ABC, abstractmethod
+from collections import deque
 import requests  # type: ignore
-from typing import Dict, List, Optional, Any
+from requests.adapters import HTTPAdapter  # type: ignore
+from typing import Deque, Dict, List, Optional, Any, Tuple
+import atexit
 import logging
+import threading
+import time
 
 
 logger = logging.getLogger("flare")
 
+# Defaults of AlertWebhookTarget. Connect is slightly above a multiple of 3s,
+# the TCP retransmission window.
+WEBHOOK_CONNECT_TIMEOUT_SECONDS = 3.05
+WEBHOOK_READ_TIMEOUT_SECONDS = 10.0
+WEBHOOK_POOL_SIZE = 10
+
+# Guards the lazy creation of per-target session locks
+_session_locks_lock = threading.Lock()
+
 
 class FeatureAlertKind(Enum):
     # Sample was more than x standard deviations from mean
@@ -22,6 +36,10 @@ class FeatureAlertKind(Enum):
     NEGATIVE = "Negative"
     # Sample was not a valid variant of a categorical feature
     CATEGORICAL = "Categorical"
+    # Recent samples are distributed differently from the baseline
+    DRIFT = "Drift"
+    # Recent samples hold more distinct values than the whole baseline
+    CARDINALITY = "Cardinality"
 
 
 @dataclass
@@ -30,6 +48,8 @@ class FeatureAlert:
     name: str
     # See FeatureAlertKind.value
     kind: str
+    # Number of occurrences this alert stands for (see AlertAggregator)
+    count: int = 1
 
 
 @dataclass
@@ -43,9 +63,76 @@ class Alert:
     model_name: str
     features: List[FeatureAlert]
     exception: Optional[InferenceException]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class AlertTarget(ABC):
+    @abstractmethod
+    def send_alert(self, alert: Alert) -> bool:
+        pass
 
 
-class AlertWebhookTarget(ABC):
+class AlertWebhookTarget(AlertTarget):
+    # Each target posts through its own requests session, so connections
+    # to the webhook are kept alive and reused across alerts, and a target
+    # can be shared by threads. The session is created on first use. A
+    # webhook that does not accept the connection within connect_timeout,
+    # or does not respond within read_timeout, fails the alert instead of
+    # blocking the caller.
+
+    connect_timeout: float = WEBHOOK_CONNECT_TIMEOUT_SECONDS
+    read_timeout: float = WEBHOOK_READ_TIMEOUT_SECONDS
+    pool_size: int = WEBHOOK_POOL_SIZE
+    # Class defaults keep subclasses that skip super().__init__() working
+    _session: Optional[requests.Session] = None
+    _session_lock: Optional[threading.Lock] = None
+
+    def __init__(
+        self,
+        connect_timeout: float = WEBHOOK_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = WEBHOOK_READ_TIMEOUT_SECONDS,
+        pool_size: int = WEBHOOK_POOL_SIZE,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_size = pool_size
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        session = self._session
+        if session is None:
+            with self._lock():
+                session = self._session
+                if session is None:
+                    session = self._session = self._new_session()
+        return session
+
+    def close(self):
+        # Closes pooled connections. A later alert opens a new session.
+        with self._lock():
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+    def _lock(self) -> threading.Lock:
+        lock = self._session_lock
+        if lock is None:
+            with _session_locks_lock:
+                lock = self._session_lock
+                if lock is None:
+                    lock = self._session_lock = threading.Lock()
+        return lock
+
+    def _new_session(self) -> requests.Session:
+        # pool_size connections are kept alive per host; more concurrent
+        # alerts open extra connections rather than wait for one
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
     @abstractmethod
     def _alert_webhook_url(self) -> str:
         pass
@@ -54,15 +141,23 @@ class AlertWebhookTarget(ABC):
     def _format_alert(self, alert: Alert) -> Dict[Any, Any]:
         pass
 
-    def send_alert(self, alert: Alert):
+    def send_alert(self, alert: Alert) -> bool:
         if (alert.exception is None) and (len(alert.features) == 0):
             logger.error("Alert has no exception/feature alerts. Not sending")
-            return
+            return False
 
         formatted_alert = self._format_alert(alert)
         logger.debug(formatted_alert)
 
-        resp = requests.post(self._alert_webhook_url(), json=formatted_alert)
+        try:
+            resp = self.session.post(
+                self._alert_webhook_url(),
+                json=formatted_alert,
+                timeout=(self.connect_timeout, self.read_timeout),
+            )
+        except requests.RequestException as e:
+            logger.error(f"Failed to send alert to {type(self).__name__}: {e}")
+            return False
 
         if resp.ok:
             logger.info(f"Sent alert to {type(self).__name__}")
@@ -71,10 +166,286 @@ class AlertWebhookTarget(ABC):
                 f"Failed to send alert to {type(self).__name__}. "
                 + f"Code: {resp.status_code}. Body: {resp.text}"
             )
+        return resp.ok
+
+
+class DropPolicy(Enum):
+    # Discard the incoming alert when the queue is full
+    DROP_NEWEST = "DropNewest"
+    # Discard the oldest queued alert to make room for the incoming one
+    DROP_OLDEST = "DropOldest"
+
+
+@dataclass
+class DispatchCounters:
+    queued: int = 0
+    sent: int = 0
+    dropped: int = 0
+    failed: int = 0
+
+
+class BackgroundAlertDispatcher(AlertTarget):
+    # Wraps another target and sends alerts from worker threads, so a slow
+    # webhook never adds latency to the inference call that raised them.
+
+    def __init__(
+        self,
+        target: AlertTarget,
+        max_queue_size: int = 1000,
+        num_workers: int = 1,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 30.0,
+        drop_policy: DropPolicy = DropPolicy.DROP_NEWEST,
+    ):
+        self.target = target
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.drop_policy = drop_policy
+
+        self._queue: Deque[Alert] = deque()
+        self._in_flight = 0
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._counters = DispatchCounters()
+
+        self._workers = [
+            threading.Thread(
+                target=self._run, name=f"flare-alerts-{n}", daemon=True
+            )
+            for n in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        atexit.register(self.shutdown)
+
+    @property
+    def counters(self) -> DispatchCounters:
+        with self._condition:
+            return replace(self._counters)
+
+    def send_alert(self, alert: Alert) -> bool:
+        with self._condition:
+            if self._stopping:
+                logger.error("Alert dispatcher is shut down. Dropping alert")
+                self._counters.dropped += 1
+                return False
+
+            if len(self._queue) >= self.max_queue_size:
+                self._counters.dropped += 1
+                if self.drop_policy == DropPolicy.DROP_NEWEST:
+                    logger.warning("Alert queue is full. Dropping new alert")
+                    return False
+                logger.warning("Alert queue is full. Dropping oldest alert")
+                self._queue.popleft()
+
+            self._queue.append(alert)
+            self._counters.queued += 1
+            self._condition.notify()
+            return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        # Blocks until every queued alert has been delivered or given up on.
+        # Returns False if the timeout expired first.
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._queue and self._in_flight == 0, timeout
+            )
+
+    def shutdown(self, timeout: Optional[float] = 10.0):
+        flushed = self.flush(timeout)
+        if not flushed:
+            logger.warning("Timed out flushing alerts on shutdown")
+
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        atexit.unregister(self.shutdown)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._queue or self._stopping)
+                if not self._queue:
+                    return
+                alert = self._queue.popleft()
+                self._in_flight += 1
+
+            sent = self._deliver(alert)
+
+            with self._condition:
+                self._in_flight -= 1
+                if sent:
+                    self._counters.sent += 1
+                else:
+                    self._counters.failed += 1
+                self._condition.notify_all()
+
+    def _deliver(self, alert: Alert) -> bool:
+        delay = self.backoff_seconds
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.target.send_alert(alert):
+                    return True
+            except Exception as e:
+                logger.exception(f"Error sending alert: {e}")
+
+            if attempt < self.max_retries:
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_backoff_seconds)
+
+        logger.error(
+            f"Giving up on alert after {self.max_retries + 1} attempts"
+        )
+        return False
+
+
+class _AggregationWindow(object):
+    def __init__(self):
+        self.alert_count = 0
+        self.exception_count = 0
+        self.exception: Optional[InferenceException] = None
+        self.features: Dict[Tuple[str, str], int] = {}
+        self.sampling: Optional[Dict[str, Any]] = None
+
+
+class AlertAggregator(AlertTarget):
+    # Sits in front of another target and collapses repeated alerts. Alerts
+    # are fingerprinted by (model, feature, kind) and counted for
+    # `window_seconds`, after which one digest Alert per model is sent.
+    # At most `max_digests_per_minute` digests reach the wrapped target;
+    # when the limit is hit, the window is extended and counts keep
+    # accumulating.
+
+    def __init__(
+        self,
+        target: AlertTarget,
+        window_seconds: float = 60.0,
+        max_digests_per_minute: Optional[int] = None,
+    ):
+        self.target = target
+        self.window_seconds = window_seconds
+        self.max_digests_per_minute = max_digests_per_minute
+
+        self._lock = threading.Lock()
+        self._windows: Dict[str, _AggregationWindow] = {}
+        self._sent_at: Deque[float] = deque()
+        self._timer: Optional[threading.Timer] = None
+
+        atexit.register(self.flush)
+
+    def send_alert(self, alert: Alert) -> bool:
+        with self._lock:
+            window = self._windows.get(alert.model_name)
+            if window is None:
+                window = _AggregationWindow()
+                self._windows[alert.model_name] = window
+
+            window.alert_count += 1
+            for feature_alert in alert.features:
+                key = (feature_alert.name, feature_alert.kind)
+                window.features[key] = (
+                    window.features.get(key, 0) + feature_alert.count
+                )
+            if alert.exception is not None:
+                window.exception_count += 1
+                if window.exception is None:
+                    window.exception = alert.exception
+            if "sampling" in alert.metadata:
+                window.sampling = alert.metadata["sampling"]
+
+            if self._timer is None:
+                self._schedule()
+        return True
+
+    def flush(self):
+        # Sends every pending digest immediately, ignoring the rate limit.
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            digests = self._take_digests(force=True)
+        self._send(digests)
+
+    def _schedule(self, delay: Optional[float] = None):
+        self._timer = threading.Timer(
+            self.window_seconds if delay is None else delay,
+            self._close_window,
+        )
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _close_window(self):
+        with self._lock:
+            self._timer = None
+            digests = self._take_digests(force=False)
+            if self._windows:
+                # Rate limited: keep counting into the current window until
+                # the oldest digest drops out of the rate limit period.
+                delay = self.window_seconds
+                if self._sent_at:
+                    oldest = time.monotonic() - self._sent_at[0]
+                    delay = max(delay, 60 - oldest)
+                self._schedule(delay)
+        self._send(digests)
+
+    def _take_digests(self, force: bool) -> List[Alert]:
+        now = time.monotonic()
+        while self._sent_at and now - self._sent_at[0] > 60:
+            self._sent_at.popleft()
+
+        digests = []
+        for model_name in list(self._windows):
+            if (
+                not force
+                and self.max_digests_per_minute is not None
+                and len(self._sent_at) >= self.max_digests_per_minute
+            ):
+                logger.warning("Alert rate limit reached. Delaying digest")
+                break
+            window = self._windows.pop(model_name)
+            self._sent_at.append(now)
+            digests.append(
+                Alert(
+                    model_name=model_name,
+                    features=[
+                        FeatureAlert(name=name, kind=kind, count=count)
+                        for (name, kind), count in window.features.items()
+                    ],
+                    exception=window.exception,
+                    metadata={
+                        "window_seconds": self.window_seconds,
+                        "alert_count": window.alert_count,
+                        "exception_count": window.exception_count,
+                    },
+                )
+            )
+            if window.sampling is not None:
+                digests[-1].metadata["sampling"] = window.sampling
+        return digests
+
+    def _send(self, digests: List[Alert]):
+        for digest in digests:
+            try:
+                self.target.send_alert(digest)
+            except Exception as e:
+                logger.exception(f"Error sending alert digest: {e}")
 
 
 class SlackAlertTarget(AlertWebhookTarget):
-    def __init__(self, slack_webhook_path: str):
+    def __init__(
+        self,
+        slack_webhook_path: str,
+        connect_timeout: float = WEBHOOK_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = WEBHOOK_READ_TIMEOUT_SECONDS,
+        pool_size: int = WEBHOOK_POOL_SIZE,
+    ):
+        super().__init__(connect_timeout, read_timeout, pool_size)
         # Everything after https://hooks.slack.com/services
         # FORMAT: /XXXXX/XXXXXX/XXXXXXXXXXXXXXXXXXXX
         self.slack_webhook_path = slack_webhook_path
@@ -137,6 +508,11 @@ class SlackAlertTarget(AlertWebhookTarget):
                                 [
                                     f"- Feature: {fa.name}. "
                                     + f"Alert kind: {fa.kind}"
+                                    + (
+                                        f". Occurrences: {fa.count}"
+                                        if fa.count > 1
+                                        else ""
+                                    )
                                     for fa in alert.features
                                 ]
                             ),
@@ -145,11 +521,33 @@ class SlackAlertTarget(AlertWebhookTarget):
                 ]
             )
 
+        if sampling := alert.metadata.get("sampling"):
+            msg_structure["blocks"].append(
+                {
+                    "type": "context",
+                    "elements": [
+                        {
+                            "type": "mrkdwn",
+                            "text": "Sampling active: "
+                            + f"{sampling['call_rate']:.1%} of calls and "
+                            + f"{sampling['row_rate']:.1%} of rows checked.",
+                        }
+                    ],
+                }
+            )
+
         return msg_structure
 
 
 class ZapierAlertTarget(AlertWebhookTarget):
-    def __init__(self, zapier_webhook_path: str):
+    def __init__(
+        self,
+        zapier_webhook_path: str,
+        connect_timeout: float = WEBHOOK_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = WEBHOOK_READ_TIMEOUT_SECONDS,
+        pool_size: int = WEBHOOK_POOL_SIZE,
+    ):
+        super().__init__(connect_timeout, read_timeout, pool_size)
         # this is everything after https://hooks.zapier.com/hooks/catch
         # FORMAT: /XXXXX/XXXXXX
         self.zapier_webhook_path = zapier_webhook_path
@@ -162,7 +560,14 @@ class ZapierAlertTarget(AlertWebhookTarget):
 
 
 class CustomAlertTarget(AlertWebhookTarget):
-    def __init__(self, webhook_url: str):
+    def __init__(
+        self,
+        webhook_url: str,
+        connect_timeout: float = WEBHOOK_CONNECT_TIMEOUT_SECONDS,
+        read_timeout: float = WEBHOOK_READ_TIMEOUT_SECONDS,
+        pool_size: int = WEBHOOK_POOL_SIZE,
+    ):
+        super().__init__(connect_timeout, read_timeout, pool_size)
         self.webhook_url = webhook_url
 
     def _alert_webhook_url(self) -> str:
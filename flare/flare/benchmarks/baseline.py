@@ -0,0 +1,269 @@
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+import flare
+from flare.benchmarks.report import environment, write_report
+from flare.examples import generate_example_dataframe
+from flare.generators import gen_constraints, gen_statistics
+
+FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "gen_statistics": gen_statistics,
+    "gen_constraints": gen_constraints,
+    "gen_statistics_approximate": partial(
+        gen_statistics, approximate_distinct=True
+    ),
+}
+
+# Share of the columns of each type, by column mix
+MIXES = {
+    "numeric": {"float": 0.5, "int": 0.25, "positive_int": 0.25},
+    "object": {"str": 0.5, "mixed": 0.5},
+    "high_cardinality": {"id": 0.5, "str": 0.25, "float": 0.25},
+    "example": {
+        "int": 0.2,
+        "positive_int": 0.2,
+        "float": 0.2,
+        "str": 0.2,
+        "mixed": 0.2,
+    },
+}
+
+# Grids of (rows, columns). Cases above max_cells are skipped.
+QUICK_ROWS = [1_000, 100_000, 1_000_000]
+QUICK_COLUMNS = [10, 100]
+QUICK_MAX_CELLS = 20_000_000
+FULL_ROWS = [1_000, 100_000, 1_000_000, 10_000_000, 30_000_000]
+FULL_COLUMNS = [10, 100, 1_000, 2_000]
+FULL_MAX_CELLS = 1_000_000_000
+
+
+def run(
+    rows: Sequence[int] = QUICK_ROWS,
+    columns: Sequence[int] = QUICK_COLUMNS,
+    mixes: Sequence[str] = ("numeric", "object", "high_cardinality"),
+    functions: Sequence[str] = ("gen_statistics", "gen_constraints"),
+    max_cells: int = QUICK_MAX_CELLS,
+    repeat: int = 1,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    # Each case runs in its own process, so its peak RSS is not inflated by
+    # earlier cases
+    results = []
+    for case in _cases(rows, columns, mixes, functions, max_cells):
+        case.update(repeat=repeat, seed=seed)
+        results.append(_run_in_subprocess(case))
+
+    return {
+        "benchmark": "baseline",
+        "environment": environment(),
+        "parameters": {
+            "max_cells": max_cells,
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    # Times one function on one synthetic frame, in this process. Peak RSS
+    # is measured from after the frame is built, where the platform allows
+    # resetting it (Linux), and otherwise includes building the frame.
+    df = generate_example_dataframe(
+        n_rows=case["rows"],
+        n_cols_per_type=columns_per_type(case["mix"], case["columns"]),
+        seed=case["seed"],
+    )
+    n_rows = len(df)
+    input_bytes = int(df.memory_usage(deep=True).sum())
+    function = FUNCTIONS[case["function"]]
+
+    gc.collect()
+    rss_before = _current_rss_bytes()
+    peak_reset = _reset_peak_rss()
+    seconds = []
+    for _ in range(case["repeat"]):
+        start = time.perf_counter()
+        function(df)
+        seconds.append(time.perf_counter() - start)
+    peak = _peak_rss_bytes()
+
+    best = min(seconds)
+    growth = None
+    if peak is not None and rss_before is not None:
+        growth = max(peak - rss_before, 0)
+    return dict(
+        case,
+        name=f"{case['function']}/{case['mix']}/{n_rows}x{case['columns']}",
+        seconds=best,
+        mean_seconds=sum(seconds) / len(seconds),
+        rows_per_second=n_rows / best if best > 0 else None,
+        input_bytes=input_bytes,
+        input_bytes_per_row=input_bytes / n_rows,
+        peak_rss_bytes=peak,
+        peak_rss_growth_bytes=growth,
+        bytes_per_row=growth / n_rows if growth is not None else None,
+        peak_includes_input=not peak_reset,
+    )
+
+
+def columns_per_type(mix: str, n_columns: int) -> Dict[str, int]:
+    # Splits n_columns by the shares of mix; the first type takes the
+    # remainder
+    shares = MIXES[mix]
+    counts = {name: int(n_columns * share) for name, share in shares.items()}
+    first = next(iter(counts))
+    counts[first] += n_columns - sum(counts.values())
+    return counts
+
+
+def _cases(
+    rows: Iterable[int],
+    columns: Iterable[int],
+    mixes: Iterable[str],
+    functions: Iterable[str],
+    max_cells: int,
+) -> List[Dict[str, Any]]:
+    cases = []
+    for mix in mixes:
+        for n_columns in columns:
+            for n_rows in rows:
+                if n_rows * n_columns > max_cells:
+                    continue
+                for function in functions:
+                    cases.append(
+                        {
+                            "function": function,
+                            "mix": mix,
+                            "rows": n_rows,
+                            "columns": n_columns,
+                        }
+                    )
+    return cases
+
+
+def _run_in_subprocess(case: Dict[str, Any]) -> Dict[str, Any]:
+    # The flare package is made importable in the child even when it is
+    # not installed
+    package_root = os.path.dirname(os.path.dirname(flare.__file__))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [package_root] + [p for p in [env.get("PYTHONPATH")] if p]
+    )
+    env.setdefault("FLARE_ANALYTICS_OPT_OUT", "1")
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "flare.benchmarks.baseline",
+            "--case",
+            json.dumps(case),
+        ],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if process.returncode != 0:
+        # e.g. killed for running out of memory
+        return dict(
+            case,
+            error=process.stderr.strip().splitlines()[-1:]
+            or [f"exit code {process.returncode}"],
+        )
+    # The result is the last line; the package may print before it
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def _current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return _max_rss_bytes()
+
+
+def _reset_peak_rss() -> bool:
+    # Writing 5 to clear_refs resets the peak RSS (VmHWM) on Linux 4.0+
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return _max_rss_bytes()
+
+
+def _max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Throughput and peak memory of baseline generation, "
+        + "as JSON"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Up to tens of millions of rows and thousands of columns",
+    )
+    parser.add_argument("--rows", nargs="+", type=int, default=None)
+    parser.add_argument("--columns", nargs="+", type=int, default=None)
+    parser.add_argument(
+        "--mixes",
+        nargs="+",
+        choices=list(MIXES),
+        default=["numeric", "object", "high_cardinality"],
+    )
+    parser.add_argument(
+        "--functions", nargs="+", choices=list(FUNCTIONS), default=None
+    )
+    parser.add_argument("--max-cells", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", default=None)
+    parser.add_argument("--case", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case is not None:
+        print(json.dumps(run_case(json.loads(args.case))))
+        return
+
+    report = run(
+        rows=args.rows or (FULL_ROWS if args.full else QUICK_ROWS),
+        columns=args.columns or (FULL_COLUMNS if args.full else QUICK_COLUMNS),
+        mixes=args.mixes,
+        functions=args.functions or ("gen_statistics", "gen_constraints"),
+        max_cells=args.max_cells
+        or (FULL_MAX_CELLS if args.full else QUICK_MAX_CELLS),
+        repeat=args.repeat,
+        seed=args.seed,
+    )
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+from typing import Any, Dict, Optional, Sequence
+import json
+import platform
+import sys
+import numpy as np
+import pandas as pd  # type: ignore
+
+
+def environment() -> Dict[str, Any]:
+    # Recorded with the results, so runs are compared like for like
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def summarize(seconds: Sequence[float]) -> Dict[str, float]:
+    # Latency summary of per-call timings, in microseconds
+    us = np.asarray(seconds, dtype=np.float64) * 1e6
+    return {
+        "p50_us": float(np.percentile(us, 50)),
+        "p90_us": float(np.percentile(us, 90)),
+        "p99_us": float(np.percentile(us, 99)),
+        "mean_us": float(us.mean()),
+        "min_us": float(us.min()),
+        "max_us": float(us.max()),
+    }
+
+
+def write_report(report: Dict[str, Any], output: Optional[str]):
+    # JSON to output, or to stdout when output is None or "-"
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output is None or output == "-":
+        sys.stdout.write(text + "\n")
+        return
+    with open(output, "w") as f:
+        f.write(text + "\n")
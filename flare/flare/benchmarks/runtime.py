@@ -0,0 +1,240 @@
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from flare.alerting import Alert, AlertTarget
+from flare.benchmarks.report import environment, summarize, write_report
+from flare.examples import (
+    EXAMPLE_DF_ID_TYPE,
+    EXAMPLE_DF_TYPES,
+    generate_example_dataframe,
+)
+from flare.generators import NumpyEncoder, gen_constraints, gen_statistics
+from flare.runtime import (
+    FLARE_CONSTRAINTS_PATH_VAR,
+    FLARE_STATISTICS_PATH_VAR,
+    Flare,
+)
+
+# Which baseline documents exist in a scenario
+BASELINES = {
+    "both": ("statistics", "constraints"),
+    "statistics": ("statistics",),
+    "constraints": ("constraints",),
+    "none": (),
+}
+INPUTS = ["row", "record", "batch"]
+
+
+class MockTarget(AlertTarget):
+    # Accepts alerts without sending them, so dispatch costs nothing
+    def __init__(self):
+        self.alerts_sent = 0
+
+    def send_alert(self, alert: Alert) -> bool:
+        self.alerts_sent += 1
+        return True
+
+
+def run(
+    batch_rows: int = 10000,
+    cols_per_type: Union[int, Dict[str, int]] = 2,
+    iterations: int = 1000,
+    batch_iterations: int = 50,
+    baselines: Sequence[str] = tuple(BASELINES),
+    inputs: Sequence[str] = INPUTS,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    # Times `with Flare(...)` per call, for single rows (as a one-row
+    # DataFrame, and as a record), and for batches of batch_rows rows.
+    # Baselines come from the same distribution as the checked rows.
+    # cols_per_type is a count for each example type, or counts by type
+    # as in generate_example_dataframe, e.g. {"float": 50, "str": 2}.
+    df = generate_example_dataframe(
+        n_rows=max(batch_rows, 1000),
+        n_cols_per_type=cols_per_type,
+        seed=seed,
+    )
+    rows = [df.iloc[[i]] for i in range(min(len(df), 1000))]
+    records = [row.iloc[0].to_dict() for row in rows]
+    batch = df.iloc[:batch_rows]
+    calls: Dict[str, Callable[[int], Any]] = {
+        "row": lambda i: rows[i % len(rows)],
+        "record": lambda i: records[i % len(records)],
+        "batch": lambda i: batch,
+    }
+
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = _write_baselines(directory, df)
+        for name in baselines:
+            for kind in inputs:
+                n = batch_iterations if kind == "batch" else iterations
+                results.append(
+                    _time_scenario(
+                        name,
+                        kind,
+                        calls[kind],
+                        n,
+                        paths,
+                        directory,
+                        n_rows=len(batch) if kind == "batch" else 1,
+                        n_columns=len(df.columns),
+                    )
+                )
+
+    return {
+        "benchmark": "runtime",
+        "environment": environment(),
+        "parameters": {
+            "batch_rows": batch_rows,
+            "cols_per_type": cols_per_type,
+            "iterations": iterations,
+            "batch_iterations": batch_iterations,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _write_baselines(directory: str, df: Any) -> Dict[str, str]:
+    documents: List[Any] = [
+        ("statistics", gen_statistics(df)),
+        ("constraints", gen_constraints(df)),
+    ]
+    paths = {}
+    for name, document in documents:
+        path = os.path.join(directory, name + ".json")
+        with open(path, "w") as f:
+            json.dump(asdict(document), f, cls=NumpyEncoder)
+        paths[name] = path
+    return paths
+
+
+def _time_scenario(
+    baselines: str,
+    kind: str,
+    make_input: Callable[[int], Any],
+    iterations: int,
+    paths: Dict[str, str],
+    directory: str,
+    n_rows: int,
+    n_columns: int,
+) -> Dict[str, Any]:
+    # Missing documents point at files that do not exist, as when a model
+    # is deployed without them
+    documents = BASELINES[baselines]
+    environ = {
+        FLARE_STATISTICS_PATH_VAR: (
+            paths["statistics"]
+            if "statistics" in documents
+            else os.path.join(directory, "missing-statistics.json")
+        ),
+        FLARE_CONSTRAINTS_PATH_VAR: (
+            paths["constraints"]
+            if "constraints" in documents
+            else os.path.join(directory, "missing-constraints.json")
+        ),
+    }
+    previous = {key: os.environ.get(key) for key in environ}
+    os.environ.update(environ)
+
+    model_name = f"benchmark-{baselines}-{kind}"
+    target = MockTarget()
+    # Warm up the baseline cache, drift monitor and code paths
+    warmup = max(iterations // 10, 1)
+    seconds = []
+    try:
+        for i in range(warmup + iterations):
+            x = make_input(i)
+            start = time.perf_counter()
+            with Flare(model_name, x, target):
+                pass
+            elapsed = time.perf_counter() - start
+            if i >= warmup:
+                seconds.append(elapsed)
+    finally:
+        _restore_environ(previous)
+
+    result: Dict[str, Any] = {
+        "name": f"{kind}/{baselines}",
+        "input": kind,
+        "baselines": baselines,
+        "rows": n_rows,
+        "columns": n_columns,
+        "iterations": iterations,
+        "alerts_sent": target.alerts_sent,
+    }
+    result.update(summarize(seconds))
+    return result
+
+
+def _restore_environ(previous: Dict[str, Optional[str]]):
+    for key, value in previous.items():
+        if value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
+
+
+def _cols_per_type(value: str) -> Union[int, Dict[str, int]]:
+    # "2", or counts by type as "float=50,str=2"
+    if "=" not in value:
+        return int(value)
+    counts = {}
+    for item in value.split(","):
+        name, _, count = item.partition("=")
+        if name not in EXAMPLE_DF_TYPES + [EXAMPLE_DF_ID_TYPE]:
+            raise argparse.ArgumentTypeError(
+                f"Unknown example column type: {name}"
+            )
+        counts[name] = int(count)
+    return counts
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Per-call overhead of the Flare runtime, as JSON"
+    )
+    parser.add_argument("--batch-rows", type=int, default=10000)
+    parser.add_argument(
+        "--cols-per-type",
+        type=_cols_per_type,
+        default=2,
+        help='Columns of each type, or counts by type as "float=50,str=2"',
+    )
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--batch-iterations", type=int, default=50)
+    parser.add_argument(
+        "--baselines", nargs="+", choices=list(BASELINES), default=None
+    )
+    parser.add_argument("--inputs", nargs="+", choices=INPUTS, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", default=None)
+    args = parser.parse_args(argv)
+
+    # Missing baselines are expected in some scenarios
+    logger = logging.getLogger("flare")
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        report = run(
+            batch_rows=args.batch_rows,
+            cols_per_type=args.cols_per_type,
+            iterations=args.iterations,
+            batch_iterations=args.batch_iterations,
+            baselines=args.baselines or tuple(BASELINES),
+            inputs=args.inputs or INPUTS,
+            seed=args.seed,
+        )
+    finally:
+        logger.setLevel(level)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple, Type
+import logging
+import os
+import threading
+import time
+from flare.statistics import Statistics
+from flare.constraints import Constraints
+from flare.engine import CheckEngine
+from flare.metrics import BASELINE_LOAD_SECONDS, metrics
+from flare.serialization import load_document
+
+logger = logging.getLogger("flare")
+
+# (st_mtime_ns, st_size) of a baseline file, or None if it could not be
+# stat'ed. A changed signature invalidates the cached entry for that path.
+FileSignature = Optional[Tuple[int, int]]
+
+# (document name, seconds) of the baseline files read for a plan
+LoadTimes = List[Tuple[str, float]]
+
+
+@dataclass(frozen=True)
+class ValidationPlan:
+    # Parsed baselines shared by every Flare instance that uses the same
+    # files. These objects must be treated as read-only.
+    statistics: Optional[Statistics]
+    constraints: Optional[Constraints]
+    engine: CheckEngine
+
+
+@dataclass(frozen=True)
+class CacheInfo:
+    hits: int
+    misses: int
+    size: int
+
+
+class BaselineCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents: Dict[str, Tuple[FileSignature, Any]] = {}
+        self._plans: Dict[
+            Tuple[str, str],
+            Tuple[FileSignature, FileSignature, ValidationPlan],
+        ] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get_plan(
+        self, statistics_path: str, constraints_path: str
+    ) -> ValidationPlan:
+        statistics_sig = _signature(statistics_path)
+        constraints_sig = _signature(constraints_path)
+        key = (statistics_path, constraints_path)
+
+        with self._lock:
+            cached = self._plans.get(key)
+            if cached is not None and cached[:2] == (
+                statistics_sig,
+                constraints_sig,
+            ):
+                self._hits += 1
+                return cached[2]
+
+            self._misses += 1
+            load_times: LoadTimes = []
+            statistics = self._load(
+                statistics_path, statistics_sig, Statistics, load_times
+            )
+            constraints = self._load(
+                constraints_path, constraints_sig, Constraints, load_times
+            )
+            plan = ValidationPlan(
+                statistics=statistics,
+                constraints=constraints,
+                engine=CheckEngine(statistics, constraints),
+            )
+            observe_load_times(plan, load_times)
+            self._plans[key] = (statistics_sig, constraints_sig, plan)
+            return plan
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, len(self._plans))
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self._plans.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def _load(
+        self,
+        path: str,
+        signature: FileSignature,
+        data_class: Type,
+        load_times: LoadTimes,
+    ):
+        # Failures are cached against the file signature as well, so a
+        # missing or malformed baseline is only reported once per change.
+        cached = self._documents.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        name = data_class.__name__.lower()
+        document = None
+        start = time.perf_counter()
+        try:
+            document = load_document(path, data_class)
+            load_times.append((name, time.perf_counter() - start))
+            logger.debug(f"Loaded {name} baseline: {document}")
+        except Exception as e:
+            logger.exception(f"Could not load {name} baseline: {e}")
+
+        self._documents[path] = (signature, document)
+        return document
+
+
+def observe_load_times(plan: ValidationPlan, load_times: LoadTimes):
+    # Recorded once the plan is built, as its constraints can disable
+    # metrics (MonitoringConfig.emit_metrics)
+    if metrics.enabled and plan.engine.emit_metrics:
+        for name, seconds in load_times:
+            metrics.observe(
+                BASELINE_LOAD_SECONDS, seconds, (("document", name),)
+            )
+
+
+def _signature(path: str) -> FileSignature:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+# Process-wide cache used by flare.runtime.Flare
+baseline_cache = BaselineCache()
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Union
 
 
 @dataclass
@@ -7,9 +7,20 @@ class NumericalConstraints:
     is_non_negative: bool
 
 
+@dataclass
+class BloomFilterSketch:
+    n_hashes: int
+    false_positive_rate: float
+    # Bit array as little-endian 64-bit words: base64 of their bytes, or
+    # as signed integers in binary baselines, where they are memory-mapped
+    words: Union[str, List[int]]
+
+
 @dataclass
 class StringConstraints:
     domains: List[str]
+    # Domains too large to list, as a Bloom filter of the known values
+    domain_filter: Optional[BloomFilterSketch] = None
 
 
 @dataclass
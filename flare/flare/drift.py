@@ -0,0 +1,398 @@
+import pandas as pd  # type: ignore
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+import math
+import os
+import logging
+import threading
+from flare.statistics import Statistics
+from flare.constraints import Constraints, DistributionConstraints
+from flare.alerting import FeatureAlert, FeatureAlertKind
+from flare.sketches import HyperLogLog, process_hash, process_hashes
+from flare.types import is_null_scalar, scalar_to_float
+
+FLARE_DRIFT_WINDOW_ROWS_VAR = "FLARE_DRIFT_WINDOW_ROWS"
+
+# Kolmogorov-Smirnov coefficient for a 5% significance level, used by the
+# 'Robust' comparison method.
+KS_COEFFICIENT = 1.358
+
+# 4KB per window, with a standard error of 1.6%
+WINDOW_HLL_PRECISION = 12
+
+logger = logging.getLogger("flare")
+
+
+class _FeatureWindow(ABC):
+    # Histogram of the rows seen in the current window over the baseline's
+    # buckets. Only counts are kept, so memory does not depend on traffic.
+
+    def __init__(
+        self,
+        name: str,
+        baseline_counts: np.ndarray,
+        config: DistributionConstraints,
+    ):
+        self.name = name
+        self.config = config
+        self.baseline_size = int(baseline_counts.sum())
+        self.baseline = baseline_counts / baseline_counts.sum()
+        self.counts = np.zeros(len(baseline_counts), dtype=np.int64)
+
+    @abstractmethod
+    def _codes(self, col: pd.Series) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def _code(self, value: Any) -> Optional[int]:
+        pass
+
+    def update(self, col: pd.Series):
+        codes = self._codes(col)
+        self.counts += np.bincount(codes, minlength=len(self.counts))
+
+    def update_value(self, value: Any):
+        code = self._code(value)
+        if code is not None:
+            self.counts[code] += 1
+
+    def distance(self) -> float:
+        return float(
+            np.abs(
+                np.cumsum(self.counts / self.counts.sum())
+                - np.cumsum(self.baseline)
+            ).max()
+        )
+
+    def close(self) -> List[FeatureAlert]:
+        size = int(self.counts.sum())
+        if size == 0:
+            return []
+
+        distance = self.distance()
+        self.counts[:] = 0
+        threshold = self.config.comparison_threshold
+        if self.config.comparison_method == "Robust":
+            # Also require the difference to be statistically significant
+            # given the baseline and window sizes.
+            threshold = max(
+                threshold,
+                KS_COEFFICIENT
+                * math.sqrt(
+                    (self.baseline_size + size) / (self.baseline_size * size)
+                ),
+            )
+
+        logger.debug(f"Drift distance for {self.name}: {distance}")
+        if distance > threshold:
+            return [
+                FeatureAlert(name=self.name, kind=FeatureAlertKind.DRIFT.value)
+            ]
+        return []
+
+
+class _NumericalWindow(_FeatureWindow):
+    # Buckets are the baseline's KLL buckets plus one underflow and one
+    # overflow bucket for values outside the baseline range.
+
+    def __init__(
+        self,
+        name: str,
+        edges: np.ndarray,
+        baseline_counts: np.ndarray,
+        config: DistributionConstraints,
+    ):
+        super().__init__(
+            name, np.concatenate([[0], baseline_counts, [0]]), config
+        )
+        self.edges = edges
+
+    def _codes(self, col: pd.Series) -> np.ndarray:
+        values = pd.to_numeric(col, errors="coerce").to_numpy(
+            dtype=np.float64, na_value=np.nan
+        )
+        values = values[~np.isnan(values)]
+        codes = np.searchsorted(self.edges[1:-1], values, side="left") + 1
+        codes[values < self.edges[0]] = 0
+        codes[values > self.edges[-1]] = len(self.edges)
+        return codes
+
+    def _code(self, value: Any) -> Optional[int]:
+        number = scalar_to_float(value)
+        if math.isnan(number):
+            return None
+        if number < self.edges[0]:
+            return 0
+        if number > self.edges[-1]:
+            return len(self.edges)
+        return int(np.searchsorted(self.edges[1:-1], number, side="left")) + 1
+
+
+class _CategoricalWindow(_FeatureWindow):
+    # One bucket per baseline category plus one for other values. Distance
+    # is the largest difference in frequency of any single category.
+    #
+    # When the categories are only the baseline's most frequent values,
+    # other values had other_count rows in the baseline, and a window where
+    # their share exceeds domain_content_threshold raises a Categorical
+    # alert. This is checked even when compare (drift) is off.
+
+    def __init__(
+        self,
+        name: str,
+        categories: List[str],
+        baseline_counts: np.ndarray,
+        config: DistributionConstraints,
+        other_count: int = 0,
+        domain_content_threshold: Optional[float] = None,
+        compare: bool = True,
+    ):
+        super().__init__(
+            name, np.concatenate([[other_count], baseline_counts]), config
+        )
+        self.domain_content_threshold = domain_content_threshold
+        self.compare = compare
+        self.index = pd.Index(categories)
+        self.codes = {category: i + 1 for i, category in enumerate(categories)}
+
+    def _codes(self, col: pd.Series) -> np.ndarray:
+        return self.index.get_indexer(col.dropna()) + 1
+
+    def _code(self, value: Any) -> Optional[int]:
+        if is_null_scalar(value):
+            return None
+        try:
+            return self.codes.get(value, 0)
+        except TypeError:
+            return 0
+
+    def distance(self) -> float:
+        return float(
+            np.abs(self.counts / self.counts.sum() - self.baseline).max()
+        )
+
+    def close(self) -> List[FeatureAlert]:
+        size = int(self.counts.sum())
+        other_share = self.counts[0] / size if size > 0 else 0.0
+        if self.compare:
+            result = super().close()
+        else:
+            self.counts[:] = 0
+            result = []
+        threshold = self.domain_content_threshold
+        if threshold is not None and other_share > threshold:
+            logger.debug(f"Share of other {self.name}: {other_share}")
+            result.append(
+                FeatureAlert(
+                    name=self.name, kind=FeatureAlertKind.CATEGORICAL.value
+                )
+            )
+        return result
+
+
+class _CardinalityWindow(object):
+    # Distinct values of a string feature in the current window, for
+    # features with too many values for a categorical distribution. A
+    # sample of the baseline's traffic cannot hold more distinct values
+    # than the whole baseline, so a window that does (beyond the comparison
+    # threshold) is seeing values the baseline never saw, e.g. after an
+    # upstream change in ID format.
+
+    def __init__(
+        self,
+        name: str,
+        baseline_distinct: float,
+        config: DistributionConstraints,
+    ):
+        self.name = name
+        self.baseline_distinct = baseline_distinct
+        self.config = config
+        self.sketch = HyperLogLog(WINDOW_HLL_PRECISION)
+
+    def update(self, col: pd.Series):
+        values = col.dropna().to_numpy(dtype=object)
+        if len(values) > 0:
+            self.sketch.update_hashes(process_hashes(values))
+
+    def update_value(self, value: Any):
+        if not is_null_scalar(value):
+            self.sketch.add_hash(process_hash(value))
+
+    def close(self) -> List[FeatureAlert]:
+        distinct = self.sketch.count()
+        self.sketch.clear()
+        logger.debug(f"Distinct values of {self.name} in window: {distinct}")
+        limit = self.baseline_distinct * (1 + self.config.comparison_threshold)
+        if distinct > limit:
+            return [
+                FeatureAlert(
+                    name=self.name, kind=FeatureAlertKind.CARDINALITY.value
+                )
+            ]
+        return []
+
+
+class DriftMonitor(object):
+    # Compares the traffic seen by this process against the baseline
+    # distributions over windows of `window_rows` rows. No inference data
+    # is retained, only per-feature bucket counts for the current window.
+    #
+    # Drift and cardinality are only compared with detect_drift, for
+    # features whose perform_comparison is Enabled. The share of values
+    # outside a feature's heavy hitters is always checked.
+
+    def __init__(
+        self,
+        statistics: Optional[Statistics],
+        constraints: Optional[Constraints],
+        window_rows: Optional[int] = None,
+        detect_drift: bool = False,
+    ):
+        self.statistics = statistics
+        self.constraints = constraints
+        self.detect_drift = detect_drift
+        self.window_rows = window_rows or int(
+            os.environ.get(FLARE_DRIFT_WINDOW_ROWS_VAR, "1000")
+        )
+        self.rows_in_window = 0
+        self.windows: List[_FeatureWindow] = []
+        self.cardinality_windows: List[_CardinalityWindow] = []
+        self._lock = threading.Lock()
+
+        if statistics is None or constraints is None:
+            return
+
+        configs = {
+            constraint.name: (
+                constraint.monitoringConfigOverrides
+                or constraints.monitoring_config
+            )
+            for constraint in constraints.features
+        }
+
+        for feature in statistics.features:
+            config = configs.get(feature.name, constraints.monitoring_config)
+            distribution_config = config.distribution_constraints
+            compare = (
+                detect_drift
+                and distribution_config.perform_comparison == "Enabled"
+            )
+
+            numerical = feature.numerical_statistics
+            if compare and numerical and numerical.distribution:
+                buckets = numerical.distribution.kll.buckets
+                if sum(b.count for b in buckets) > 0:
+                    self.windows.append(
+                        _NumericalWindow(
+                            feature.name,
+                            np.array(
+                                [b.lower_bound for b in buckets]
+                                + [buckets[-1].upper_bound]
+                            ),
+                            np.array([b.count for b in buckets]),
+                            distribution_config,
+                        )
+                    )
+
+            string = feature.string_statistics
+            complete = False
+            if string and string.distribution:
+                categorical = string.distribution.categorical
+                categories = categorical.buckets
+                # Heavy hitters: the categories are the most frequent ones
+                heavy_hitters = categorical.other_count is not None
+                complete = not heavy_hitters
+                if (compare or heavy_hitters) and sum(
+                    b.count for b in categories
+                ) > 0:
+                    self.windows.append(
+                        _CategoricalWindow(
+                            feature.name,
+                            [b.value for b in categories],
+                            np.array([b.count for b in categories]),
+                            distribution_config,
+                            other_count=categorical.other_count or 0,
+                            domain_content_threshold=(
+                                config.domain_content_threshold
+                                if heavy_hitters
+                                else None
+                            ),
+                            compare=compare,
+                        )
+                    )
+            if compare and string and string.distinct_sketch and not complete:
+                self.cardinality_windows.append(
+                    _CardinalityWindow(
+                        feature.name,
+                        HyperLogLog.from_sketch(
+                            string.distinct_sketch
+                        ).count(),
+                        distribution_config,
+                    )
+                )
+
+    def update(self, x: pd.DataFrame) -> List[FeatureAlert]:
+        if not self.windows and not self.cardinality_windows:
+            return []
+
+        with self._lock:
+            for window in self.windows:
+                window.update(x[window.name])
+            for cardinality in self.cardinality_windows:
+                cardinality.update(x[cardinality.name])
+            return self._advance(len(x))
+
+    def update_record(self, record: Mapping[str, Any]) -> List[FeatureAlert]:
+        # Single-record variant of update(), without building a DataFrame
+        if not self.windows and not self.cardinality_windows:
+            return []
+
+        with self._lock:
+            for window in self.windows:
+                window.update_value(record[window.name])
+            for cardinality in self.cardinality_windows:
+                cardinality.update_value(record[cardinality.name])
+            return self._advance(1)
+
+    def _advance(self, n_rows: int) -> List[FeatureAlert]:
+        self.rows_in_window += n_rows
+        if self.rows_in_window < self.window_rows:
+            return []
+
+        self.rows_in_window = 0
+        result = []
+        windows: List[Any] = [*self.windows, *self.cardinality_windows]
+        for window in windows:
+            result.extend(window.close())
+
+        logger.info(f"Found {len(result)} drift alerts.")
+        return result
+
+
+_monitors: Dict[Tuple[str, bool], DriftMonitor] = {}
+_monitors_lock = threading.Lock()
+
+
+def get_drift_monitor(
+    model_name: str,
+    statistics: Optional[Statistics],
+    constraints: Optional[Constraints],
+    detect_drift: bool = False,
+) -> DriftMonitor:
+    # One monitor per model, detect_drift and process. The monitor is
+    # rebuilt (and its window discarded) when the model's baselines are
+    # reloaded.
+    key = (model_name, detect_drift)
+    with _monitors_lock:
+        monitor = _monitors.get(key)
+        if (
+            monitor is None
+            or monitor.statistics is not statistics
+            or monitor.constraints is not constraints
+        ):
+            monitor = DriftMonitor(
+                statistics, constraints, detect_drift=detect_drift
+            )
+            _monitors[key] = monitor
+        return monitor
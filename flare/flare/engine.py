@@ -0,0 +1,687 @@
+import pandas as pd  # type: ignore
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+import functools
+import os
+import logging
+from flare.statistics import Statistics, NumericalStatistics
+from flare.constraints import Constraints
+from flare.alerting import FeatureAlert, FeatureAlertKind
+from flare.metrics import CHECK_SECONDS, NULL_STOPWATCH, Stopwatch, metrics
+from flare.sketches import KLL, BloomFilter
+from flare.types import (
+    FeatureType,
+    is_null_scalar,
+    MAX_ROWS_FOR_OBJECT_TYPE_INFERENCE,
+    is_string_values,
+    matches_feature_type,
+    scalar_to_float,
+)
+
+FLARE_OUTLIER_CUTOFF_VAR = "FLARE_OUTLIER_CUTOFF"
+
+# Interquartile range of a standard normal distribution. Dividing an IQR by
+# this gives a robust estimate of the standard deviation.
+NORMAL_IQR = 1.349
+
+# Columns up to this length are checked against categorical domains with
+# set lookups, which avoid the fixed cost of vectorized probing (~100us).
+# Longer ones probe the hash table of a pd.Index of the domain, built once
+# per plan.
+MAX_SET_LOOKUP_VALUES = 4096
+
+logger = logging.getLogger("flare")
+
+# Per-row violations of one check, keyed by (feature name, alert kind)
+Masks = Dict[Tuple[str, str], np.ndarray]
+
+# A single inference record: feature name -> value, or a 1-D array in the
+# order of CheckEngine.record_columns
+Record = Union[Mapping[str, Any], np.ndarray]
+
+
+@dataclass
+class ValidationResult:
+    # Alerts for a batch plus, for every row-level check that fired, which
+    # rows violated it. Masks are bit-packed (np.packbits), so a mask costs
+    # one bit per row. Type alerts apply to a whole column and have no mask.
+    alerts: List[FeatureAlert]
+    index: pd.Index
+    masks: Masks = field(default_factory=dict)
+    counts: Dict[Tuple[str, str], int] = field(default_factory=dict)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.index)
+
+    def mask(self, name: str, kind: str) -> np.ndarray:
+        packed = self.masks.get((name, kind))
+        if packed is None:
+            return np.zeros(self.n_rows, dtype=bool)
+        return np.unpackbits(packed, count=self.n_rows).astype(bool)
+
+    def count(self, name: str, kind: str) -> int:
+        return self.counts.get((name, kind), 0)
+
+    def rate(self, name: str, kind: str) -> float:
+        if self.n_rows == 0:
+            return 0.0
+        return self.count(name, kind) / self.n_rows
+
+    @property
+    def invalid_rows(self) -> np.ndarray:
+        result = np.zeros(self.n_rows, dtype=bool)
+        for name, kind in self.masks:
+            result |= self.mask(name, kind)
+        return result
+
+    @property
+    def valid_rows(self) -> np.ndarray:
+        return ~self.invalid_rows
+
+
+def _frozen(values: List[float]) -> np.ndarray:
+    array = np.array(values, dtype=np.float64)
+    array.setflags(write=False)
+    return array
+
+
+def _frozen_index(values: List[int]) -> np.ndarray:
+    array = np.array(values, dtype=np.intp)
+    array.setflags(write=False)
+    return array
+
+
+def _dtype_kind(dtype: Any) -> str:
+    # The FeatureType a column of this dtype satisfies, "object" for object
+    # columns, which are strings only if their values are, or "" if none.
+    # Categorical columns are strings if their categories are.
+    if isinstance(dtype, pd.CategoricalDtype):
+        if is_string_values(dtype.categories.to_numpy()):
+            return FeatureType.STRING.value
+        return ""
+    return _dtype_name_kind(str(dtype))
+
+
+@functools.lru_cache(maxsize=None)
+def _dtype_name_kind(dtype_name: str) -> str:
+    if dtype_name.startswith("float"):
+        return FeatureType.FRACTIONAL.value
+    if dtype_name.startswith("int") or dtype_name.startswith("uint"):
+        return FeatureType.INTEGRAL.value
+    if dtype_name == "object":
+        return "object"
+    if dtype_name == "string" or dtype_name[:2] in {"<U", ">U", "=U"}:
+        return FeatureType.STRING.value
+    return ""
+
+
+def _in_set(value: Any, values: frozenset) -> bool:
+    try:
+        return value in values
+    except TypeError:
+        return False
+
+
+def _comparison_methods(
+    constraints: Optional[Constraints],
+) -> Tuple[str, Dict[str, str]]:
+    # Default distribution comparison method, and per-feature overrides
+    if constraints is None:
+        return "Simple", {}
+
+    default = constraints.monitoring_config.distribution_constraints
+    overrides = {
+        constraint.name: (
+            constraint.monitoringConfigOverrides.distribution_constraints
+        ).comparison_method
+        for constraint in constraints.features
+        if constraint.monitoringConfigOverrides is not None
+    }
+    return default.comparison_method, overrides
+
+
+def _outlier_reference(
+    statistic: NumericalStatistics, comparison_method: str
+) -> Tuple[float, float]:
+    # The 'Robust' method measures outliers against the median and IQR from
+    # the baseline's KLL sketch, instead of the mean and standard deviation.
+    if comparison_method == "Robust" and statistic.distribution is not None:
+        sketch = KLL.from_distribution(statistic.distribution.kll)
+        if sketch is not None:
+            q1, median, q3 = sketch.quantiles(np.array([0.25, 0.5, 0.75]))
+            if q3 > q1:
+                return float(median), float(q3 - q1) / NORMAL_IQR
+
+    return statistic.mean, statistic.std_dev
+
+
+class CheckEngine(object):
+    # Compiled form of a statistics/constraints baseline. All numeric
+    # features are gathered into a single 2-D block per call and checked
+    # against precomputed vectors, so the per-call cost does not grow with
+    # per-column Python dispatch.
+
+    def __init__(
+        self,
+        statistics: Optional[Statistics],
+        constraints: Optional[Constraints],
+    ):
+        self.statistics = statistics
+        self.constraints = constraints
+
+        # Columns gathered into the numeric block, in first-use order
+        self.numeric_columns: List[str] = []
+        self._slots: Dict[str, int] = {}
+
+        stat_names: List[str] = []
+        stat_slots: List[int] = []
+        centers: List[float] = []
+        scales: List[float] = []
+        mins: List[float] = []
+        maxs: List[float] = []
+        null_names: List[str] = []
+        null_is_numeric: List[bool] = []
+        default_method, methods = _comparison_methods(constraints)
+
+        if statistics is not None:
+            for feature in statistics.features:
+                num_missing = None
+                if numerical_statistic := feature.numerical_statistics:
+                    stat_names.append(feature.name)
+                    stat_slots.append(self._slot(feature.name))
+                    center, scale = _outlier_reference(
+                        numerical_statistic,
+                        methods.get(feature.name, default_method),
+                    )
+                    centers.append(center)
+                    scales.append(scale)
+                    mins.append(numerical_statistic.min)
+                    maxs.append(numerical_statistic.max)
+                    num_missing = numerical_statistic.common.num_missing
+
+                if string_statistic := feature.string_statistics:
+                    num_missing = string_statistic.common.num_missing
+
+                if num_missing is not None and num_missing == 0:
+                    null_names.append(feature.name)
+                    null_is_numeric.append(
+                        feature.numerical_statistics is not None
+                    )
+
+        negative_names: List[str] = []
+        negative_slots: List[int] = []
+        if constraints is not None:
+            for constraint in constraints.features:
+                num_constraint = constraint.num_constraints
+                if num_constraint and num_constraint.is_non_negative:
+                    negative_names.append(constraint.name)
+                    negative_slots.append(self._slot(constraint.name))
+
+        self._stat_names = stat_names
+        self._stat_slots = _frozen_index(stat_slots)
+        self._centers = _frozen(centers)
+        self._scales = _frozen(scales)
+        self._mins = _frozen(mins)
+        self._maxs = _frozen(maxs)
+
+        self._null_numeric_names = [
+            name
+            for name, is_numeric in zip(null_names, null_is_numeric)
+            if is_numeric
+        ]
+        self._null_numeric_slots = _frozen_index(
+            [self._slots[name] for name in self._null_numeric_names]
+        )
+        self._null_other_names = [
+            name
+            for name, is_numeric in zip(null_names, null_is_numeric)
+            if not is_numeric
+        ]
+
+        self._negative_names = negative_names
+        self._negative_slots = _frozen_index(negative_slots)
+
+        # Feature order of 1-D array records, i.e. the training columns
+        names = [
+            feature.name
+            for document in (statistics, constraints)
+            if document is not None
+            for feature in document.features
+        ]
+        self.record_columns: List[str] = list(dict.fromkeys(names))
+
+        # MonitoringConfig.emit_metrics: time each check family when a
+        # metrics exporter is configured
+        self.emit_metrics = (
+            constraints is None
+            or constraints.monitoring_config.emit_metrics == "Enabled"
+        )
+
+        self._domain_sets = {
+            constraint.name: frozenset(constraint.string_constraints.domains)
+            for constraint in (constraints.features if constraints else [])
+            if constraint.string_constraints
+            and len(constraint.string_constraints.domains) > 0
+        }
+        self._domain_indexes = {
+            name: pd.Index(list(domain), dtype=object)
+            for name, domain in self._domain_sets.items()
+        }
+        for index in self._domain_indexes.values():
+            # Builds the index's hash table, kept for the plan's lifetime
+            index.get_indexer(index[:1])
+        # Large domains, as Bloom filters over the baseline's bit arrays
+        self._domain_filters = {
+            constraint.name: BloomFilter.from_sketch(
+                constraint.string_constraints.domain_filter
+            )
+            for constraint in (constraints.features if constraints else [])
+            if constraint.string_constraints
+            and constraint.string_constraints.domain_filter is not None
+        }
+
+        constraint_features = constraints.features if constraints else []
+        # Alerts are reported in the order of the constraints
+        self._constraint_ranks = {
+            constraint.name: i
+            for i, constraint in enumerate(constraint_features)
+        }
+        self._domain_names = [
+            constraint.name
+            for constraint in constraint_features
+            if constraint.name in self._domain_sets
+            or constraint.name in self._domain_filters
+        ]
+        typed = [
+            constraint
+            for constraint in constraint_features
+            if constraint.inferred_type
+            in {
+                FeatureType.FRACTIONAL.value,
+                FeatureType.INTEGRAL.value,
+                FeatureType.STRING.value,
+            }
+        ]
+        self._typed_names = [constraint.name for constraint in typed]
+        self._expected_kinds = np.array(
+            [constraint.inferred_type for constraint in typed], dtype=object
+        )
+        self._expected_kinds.setflags(write=False)
+
+    def _slot(self, name: str) -> int:
+        if name not in self._slots:
+            self._slots[name] = len(self.numeric_columns)
+            self.numeric_columns.append(name)
+        return self._slots[name]
+
+    def check(self, x: pd.DataFrame) -> List[FeatureAlert]:
+        return self._check(x, None)
+
+    def check_record(self, record: Record) -> List[FeatureAlert]:
+        # Single-record fast path: the same alerts as check() on the
+        # one-row DataFrame built from the record, without building it.
+        # Checks run on plain values and on small arrays with one entry per
+        # feature, using the vectors precompiled for check().
+        # Records are timed as a whole, as family "record"
+        watch = self._stopwatch()
+        record = self.as_record(record)
+        values = np.array(
+            [scalar_to_float(record[name]) for name in self.numeric_columns],
+            dtype=np.float64,
+        )
+        result: List[FeatureAlert] = []
+        result.extend(self._check_record_constraints(record, values))
+        result.extend(self._check_record_statistics(record, values))
+        watch.lap("record")
+        metrics.observe_stopwatch(CHECK_SECONDS, watch)
+        return result
+
+    def as_record(self, record: Record) -> Mapping[str, Any]:
+        if isinstance(record, np.ndarray):
+            if record.ndim != 1 or len(record) != len(self.record_columns):
+                raise ValueError(
+                    f"Expected a 1-D record of {len(self.record_columns)} "
+                    + f"features, got shape {record.shape}"
+                )
+            return dict(zip(self.record_columns, record.tolist()))
+        return record
+
+    def validate(self, x: pd.DataFrame) -> ValidationResult:
+        # Same checks as check(), also keeping the per-row comparisons
+        masks: Masks = {}
+        alerts = self._check(x, masks)
+        return ValidationResult(
+            alerts=alerts,
+            index=x.index,
+            masks={key: np.packbits(rows) for key, rows in masks.items()},
+            counts={key: int(rows.sum()) for key, rows in masks.items()},
+        )
+
+    def _check(
+        self, x: pd.DataFrame, masks: Optional[Masks]
+    ) -> List[FeatureAlert]:
+        watch = self._stopwatch()
+        block = self._numeric_block(x)
+        result: List[FeatureAlert] = []
+        result.extend(self._check_constraints(x, block, masks, watch))
+        result.extend(self._check_statistics(x, block, masks, watch))
+        metrics.observe_stopwatch(CHECK_SECONDS, watch)
+        return result
+
+    def _stopwatch(self) -> Stopwatch:
+        if self.emit_metrics:
+            return metrics.stopwatch()
+        return NULL_STOPWATCH
+
+    def _numeric_block(self, x: pd.DataFrame) -> np.ndarray:
+        if not self.numeric_columns:
+            return np.empty((len(x), 0), dtype=np.float64)
+
+        frame = x[self.numeric_columns]
+        try:
+            return frame.to_numpy(dtype=np.float64, na_value=np.nan)
+        except (TypeError, ValueError):
+            # Non-numeric values in a numeric feature. These are reported
+            # by the type check, and kept apart from nulls by _null_rows.
+            logger.debug(
+                "Non-numeric values found in numeric features. "
+                + "Coercing to NaN for statistical checks."
+            )
+            return np.column_stack(
+                [
+                    pd.to_numeric(col, errors="coerce").to_numpy(
+                        dtype=np.float64, na_value=np.nan
+                    )
+                    for _, col in frame.items()
+                ]
+            )
+
+    def _check_statistics(
+        self,
+        x: pd.DataFrame,
+        block: np.ndarray,
+        masks: Optional[Masks],
+        watch: Stopwatch,
+    ) -> List[FeatureAlert]:
+        if self.statistics is None:
+            logger.info("Skipping statistical checks.")
+            return []
+
+        watch.reset()
+        values = block[:, self._stat_slots]
+        outlier_rows = self._outliers(values)
+        watch.lap("outlier")
+        bound_rows = (values < self._mins) | (values > self._maxs)
+        watch.lap("bound")
+        null_names, null_rows = self._null_rows(x, block)
+        watch.lap("null")
+
+        result = self._statistics_alerts(
+            dict(zip(self._stat_names, outlier_rows.any(axis=0))),
+            dict(zip(self._stat_names, bound_rows.any(axis=0))),
+            dict(zip(null_names, null_rows.any(axis=0))),
+        )
+
+        if masks is not None:
+            # Column of each alert's feature in the per-row arrays
+            stat_columns = {name: i for i, name in enumerate(self._stat_names)}
+            null_columns = {name: i for i, name in enumerate(null_names)}
+            per_row = {
+                FeatureAlertKind.OUTLIER.value: (outlier_rows, stat_columns),
+                FeatureAlertKind.BOUND.value: (bound_rows, stat_columns),
+                FeatureAlertKind.NULL.value: (null_rows, null_columns),
+            }
+            for alert in result:
+                rows, columns = per_row[alert.kind]
+                masks[(alert.name, alert.kind)] = rows[:, columns[alert.name]]
+
+        logger.info(f"Found {len(result)} statistical alerts.")
+        return result
+
+    def _outliers(self, values: np.ndarray) -> np.ndarray:
+        outlier_cutoff = float(os.environ.get(FLARE_OUTLIER_CUTOFF_VAR, "4"))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (
+                np.abs(values - self._centers) / self._scales > outlier_cutoff
+            )
+
+    def _statistics_alerts(
+        self,
+        outliers: Dict[str, bool],
+        bounds: Dict[str, bool],
+        nulls: Dict[str, bool],
+    ) -> List[FeatureAlert]:
+        if self.statistics is None:
+            return []
+
+        result = []
+        for feature in self.statistics.features:
+            name = feature.name
+            if outliers.get(name, False):
+                result.append(
+                    FeatureAlert(
+                        name=name, kind=FeatureAlertKind.OUTLIER.value
+                    )
+                )
+            if bounds.get(name, False):
+                result.append(
+                    FeatureAlert(name=name, kind=FeatureAlertKind.BOUND.value)
+                )
+            if nulls.get(name, False):
+                result.append(
+                    FeatureAlert(name=name, kind=FeatureAlertKind.NULL.value)
+                )
+        return result
+
+    def _check_record_statistics(
+        self, record: Mapping[str, Any], values: np.ndarray
+    ) -> List[FeatureAlert]:
+        if self.statistics is None:
+            logger.info("Skipping statistical checks.")
+            return []
+
+        stat_values = values[self._stat_slots]
+        bounds = (stat_values < self._mins) | (stat_values > self._maxs)
+        nulls = {}
+        for name, slot in zip(
+            self._null_numeric_names, self._null_numeric_slots
+        ):
+            # NaN also stands for values that are not numeric
+            nulls[name] = bool(np.isnan(values[slot])) and bool(
+                pd.isna(record[name])
+            )
+        for name in self._null_other_names:
+            nulls[name] = is_null_scalar(record[name])
+
+        result = self._statistics_alerts(
+            dict(zip(self._stat_names, self._outliers(stat_values).tolist())),
+            dict(zip(self._stat_names, bounds.tolist())),
+            nulls,
+        )
+        logger.info(f"Found {len(result)} statistical alerts.")
+        return result
+
+    def _check_record_constraints(
+        self, record: Mapping[str, Any], values: np.ndarray
+    ) -> List[FeatureAlert]:
+        if self.constraints is None:
+            return []
+
+        negatives = dict(
+            zip(
+                self._negative_names,
+                (values[self._negative_slots] < 0).tolist(),
+            )
+        )
+
+        result = []
+        for constraint in self.constraints.features:
+            name = constraint.name
+            value = record[name]
+            if negatives.get(name, False):
+                result.append(
+                    FeatureAlert(
+                        name=name, kind=FeatureAlertKind.NEGATIVE.value
+                    )
+                )
+            in_domain = True
+            if name in self._domain_sets:
+                in_domain = _in_set(value, self._domain_sets[name])
+            elif name in self._domain_filters:
+                in_domain = self._domain_filters[name].contains_value(value)
+            if not in_domain:
+                result.append(
+                    FeatureAlert(
+                        name=name, kind=FeatureAlertKind.CATEGORICAL.value
+                    )
+                )
+            if not matches_feature_type(value, constraint.inferred_type):
+                result.append(
+                    FeatureAlert(name=name, kind=FeatureAlertKind.TYPE.value)
+                )
+        return result
+
+    def _null_rows(
+        self, x: pd.DataFrame, block: np.ndarray
+    ) -> Tuple[List[str], np.ndarray]:
+        # Per-row null flags of the features that had no nulls in the
+        # baseline, numeric features first
+        rows = np.isnan(block[:, self._null_numeric_slots])
+        if rows.any():
+            # NaN also stands for values that are not numeric
+            rows &= x[self._null_numeric_names].isna().to_numpy()
+        if not self._null_other_names:
+            return self._null_numeric_names, rows
+        return (
+            self._null_numeric_names + self._null_other_names,
+            np.hstack([rows, x[self._null_other_names].isna().to_numpy()]),
+        )
+
+    def _check_constraints(
+        self,
+        x: pd.DataFrame,
+        block: np.ndarray,
+        masks: Optional[Masks],
+        watch: Stopwatch,
+    ) -> List[FeatureAlert]:
+        if self.constraints is None:
+            return []
+
+        watch.reset()
+        negative_rows = block[:, self._negative_slots] < 0
+        result = []
+        for i, (name, flag) in enumerate(
+            zip(self._negative_names, negative_rows.any(axis=0).tolist())
+        ):
+            if flag:
+                result.append(
+                    FeatureAlert(
+                        name=name,
+                        kind=FeatureAlertKind.NEGATIVE.value,
+                    )
+                )
+                if masks is not None:
+                    masks[(name, FeatureAlertKind.NEGATIVE.value)] = (
+                        negative_rows[:, i]
+                    )
+        watch.lap("negative")
+
+        for name in self._domain_names:
+            result.extend(self._check_domain(name, x[name], masks))
+        watch.lap("categorical")
+        result.extend(self._check_types(x))
+        watch.lap("type")
+        # Stable, so each feature keeps the negative, categorical, type order
+        result.sort(key=lambda alert: self._constraint_ranks[alert.name])
+        return result
+
+    def _check_domain(
+        self,
+        name: str,
+        col: pd.Series,
+        masks: Optional[Masks] = None,
+    ) -> List[FeatureAlert]:
+        result: List[FeatureAlert] = []
+
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            # Only the categories are looked up. Rows take their category's
+            # result by code, and missing values (code -1) the last entry.
+            categorical = col.array
+            known = self._in_domain(name, categorical.categories)
+            in_domain = np.append(known, False)[categorical.codes]
+        else:
+            in_domain = self._in_domain(name, col)
+
+        if not in_domain.all():
+            result.append(
+                FeatureAlert(
+                    name=col.name,
+                    kind=FeatureAlertKind.CATEGORICAL.value,
+                )
+            )
+            if masks is not None:
+                masks[(col.name, FeatureAlertKind.CATEGORICAL.value)] = (
+                    ~in_domain
+                )
+        return result
+
+    def _in_domain(
+        self, name: str, values: Union[pd.Series, pd.Index]
+    ) -> np.ndarray:
+        if name in self._domain_filters:
+            return self._domain_filters[name].contains(
+                values.to_numpy(dtype=object)
+            )
+        # Unhashable values, e.g. lists, raise TypeError in the vectorized
+        # and set lookups. They are not in any domain.
+        if len(values) > MAX_SET_LOOKUP_VALUES:
+            try:
+                return self._domain_indexes[name].get_indexer(values) >= 0
+            except TypeError:
+                pass
+        domain = self._domain_sets[name]
+        items = values.tolist()
+        try:
+            return np.array([value in domain for value in items], dtype=bool)
+        except TypeError:
+            return np.array(
+                [_in_set(value, domain) for value in items], dtype=bool
+            )
+
+    def _check_types(self, x: pd.DataFrame) -> List[FeatureAlert]:
+        # Column types are compared through their dtypes. Only object
+        # columns of String features are looked at value by value, taken
+        # out of the frame together.
+        dtypes = dict(zip(x.columns.tolist(), x.dtypes.tolist()))
+        kinds = np.array(
+            [_dtype_kind(dtypes[name]) for name in self._typed_names],
+            dtype=object,
+        )
+        mismatched = kinds != self._expected_kinds
+        objects = np.flatnonzero(
+            (kinds == "object")
+            & (self._expected_kinds == FeatureType.STRING.value)
+        )
+        if len(objects) == 0:
+            return self._type_alerts(mismatched)
+
+        values = x[[self._typed_names[i] for i in objects]].to_numpy()
+        if len(x) <= MAX_ROWS_FOR_OBJECT_TYPE_INFERENCE:
+            present = pd.notna(values)
+            if pd.api.types.infer_dtype(values[present]) == "string":
+                # Only columns without any values are not strings
+                mismatched[objects] = ~present.any(axis=0)
+                return self._type_alerts(mismatched)
+        for j, i in enumerate(objects.tolist()):
+            mismatched[i] = not is_string_values(values[:, j])
+        return self._type_alerts(mismatched)
+
+    def _type_alerts(self, mismatched: np.ndarray) -> List[FeatureAlert]:
+        return [
+            FeatureAlert(
+                name=self._typed_names[i], kind=FeatureAlertKind.TYPE.value
+            )
+            for i in np.flatnonzero(mismatched).tolist()
+        ]
@@ -1,5 +1,6 @@
 import pandas as pd  # type: ignore
 import numpy as np  # type: ignore
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
 
 EXAMPLE_DF_N_COLS_PER_TYPE = 2
 EXAMPLE_DF_N_PER_COL = 1000
@@ -10,61 +11,65 @@ EXAMPLE_DF_STRING_DOMAINS = ["eeny", "meeny", "miny", "moe"]
 EXAMPLE_DF_NULL_PERCENTS = {"int_0": 0.1, "float_0": 0.2, "str_0": 0.3}
 
 
-def generate_example_dataframe() -> pd.DataFrame:
+EXAMPLE_DF_TYPES = ["int", "positive_int", "float", "str", "mixed"]
+# High-cardinality strings, e.g. user IDs. Not in the default types.
+EXAMPLE_DF_ID_TYPE = "id"
 
-    ints_df = pd.DataFrame(
-        np.random.randint(
-            EXAMPLE_DF_MIN_INT,
-            EXAMPLE_DF_MAX_INT,
-            size=(EXAMPLE_DF_N_PER_COL, EXAMPLE_DF_N_COLS_PER_TYPE),
-        ),
-        columns=[f"int_{n}" for n in range(EXAMPLE_DF_N_COLS_PER_TYPE)],
-    )
 
-    positive_ints_df = pd.DataFrame(
-        np.random.randint(
-            0,
-            EXAMPLE_DF_MAX_INT,
-            size=(EXAMPLE_DF_N_PER_COL, EXAMPLE_DF_N_COLS_PER_TYPE),
-        ),
-        columns=[
-            f"positive_int_{n}" for n in range(EXAMPLE_DF_N_COLS_PER_TYPE)
-        ],
-    )
+def generate_example_dataframe(
+    n_rows: int = EXAMPLE_DF_N_PER_COL,
+    n_cols_per_type: Union[int, Dict[str, int]] = EXAMPLE_DF_N_COLS_PER_TYPE,
+    types: Sequence[str] = EXAMPLE_DF_TYPES,
+    null_percents: Dict[str, float] = EXAMPLE_DF_NULL_PERCENTS,
+    seed: Optional[int] = None,
+) -> pd.DataFrame:
+    # n_cols_per_type is a column count for each of types, or a dict of
+    # counts by type, e.g. {"float": 100, "id": 10} for a mostly numeric
+    # frame with some high-cardinality strings. Null percents of columns
+    # that are not generated are ignored.
+    rng: Any = np.random if seed is None else np.random.RandomState(seed)
+    if isinstance(n_cols_per_type, int):
+        n_cols_per_type = {name: n_cols_per_type for name in types}
 
-    floats_df = pd.DataFrame(
-        np.random.random(
-            size=(EXAMPLE_DF_N_PER_COL, EXAMPLE_DF_N_COLS_PER_TYPE)
-        ),
-        columns=[f"float_{n}" for n in range(EXAMPLE_DF_N_COLS_PER_TYPE)],
-    )
+    frames = []
+    for name, n_cols in n_cols_per_type.items():
+        if n_cols > 0:
+            frames.append(
+                pd.DataFrame(
+                    _generate_values(rng, name, (n_rows, n_cols)),
+                    columns=[f"{name}_{n}" for n in range(n_cols)],
+                )
+            )
+    full_df = pd.concat(frames, axis=1)
 
-    strings_df = pd.DataFrame(
-        np.random.choice(
-            EXAMPLE_DF_STRING_DOMAINS,
-            size=(EXAMPLE_DF_N_PER_COL, EXAMPLE_DF_N_COLS_PER_TYPE),
-        ),
-        columns=[f"str_{n}" for n in range(EXAMPLE_DF_N_COLS_PER_TYPE)],
-    )
-
-    mixed_df = pd.DataFrame(
-        np.random.choice(
-            np.array([EXAMPLE_DF_STRING_DOMAINS[0], 1, 2.0], dtype="object"),
-            size=(EXAMPLE_DF_N_PER_COL, EXAMPLE_DF_N_COLS_PER_TYPE),
-        ),
-        columns=[f"mixed_{n}" for n in range(EXAMPLE_DF_N_COLS_PER_TYPE)],
-    )
-
-    full_df = pd.concat(
-        [ints_df, positive_ints_df, floats_df, strings_df, mixed_df], axis=1
-    )
-
-    for target_col, target_frac in EXAMPLE_DF_NULL_PERCENTS.items():
-        indeces = np.random.choice(
-            range(EXAMPLE_DF_N_PER_COL),
-            size=int(EXAMPLE_DF_N_PER_COL * target_frac),
+    for target_col, target_frac in null_percents.items():
+        if target_col not in full_df.columns:
+            continue
+        indeces = rng.choice(
+            range(n_rows),
+            size=int(n_rows * target_frac),
             replace=False,
         )
         full_df.loc[indeces, target_col] = None
 
     return full_df
+
+
+def _generate_values(rng: Any, name: str, size: Tuple[int, int]) -> Any:
+    if name == "int":
+        return rng.randint(EXAMPLE_DF_MIN_INT, EXAMPLE_DF_MAX_INT, size=size)
+    if name == "positive_int":
+        return rng.randint(0, EXAMPLE_DF_MAX_INT, size=size)
+    if name == "float":
+        return rng.random(size=size)
+    if name == "str":
+        return rng.choice(EXAMPLE_DF_STRING_DOMAINS, size=size)
+    if name == "mixed":
+        return rng.choice(
+            np.array([EXAMPLE_DF_STRING_DOMAINS[0], 1, 2.0], dtype="object"),
+            size=size,
+        )
+    if name == EXAMPLE_DF_ID_TYPE:
+        ids = rng.randint(0, max(size[0], 1), size=size)
+        return np.char.add("id_", ids.astype(str)).astype(object)
+    raise ValueError(f"Unknown example column type: {name}")
@@ -1,180 +1,170 @@
-from flare.constraints import (
-    Constraints,
-    NumericalConstraints,
-    StringConstraints,
-    MonitoringConfig,
-    DistributionConstraints,
-)
-from flare.constraints import Feature as ConstraintFeature
-from flare.statistics import (
-    Statistics,
-    Dataset,
-    NumericalStatistics,
-    StringStatistics,
-    CommonStatistics,
-)
-from flare.statistics import Feature as StatisticsFeature
+from flare.constraints import Constraints
+from flare.statistics import Statistics
 from flare.analytics import AnalyticsClient
-
-from flare.types import FeatureType
+from flare.partials import PartialBaseline
+from flare.profiling import DatasetProfile, profile_chunks, profile_dataframe
+from flare.serialization import (
+    BINARY_EXTENSION,
+    NumpyEncoder,
+    load_document,
+    write_binary,
+)
+from flare.sketches import DEFAULT_HLL_PRECISION
 import pandas as pd  # type: ignore
+from typing import Any, Iterable, Optional, Sequence
 from dataclasses import asdict
 import json
-import numpy as np
-
-MAX_UNIQUES_THRESHOLD = 20
-MAX_ROWS_FOR_OBJECT_TYPE_INFERENCE = 10 ** 5
 
 analytics = AnalyticsClient()
 
 
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return json.JSONEncoder.default(self, obj)
-
-
-def baseline(df: pd.DataFrame):
-    statistics = gen_statistics(df)
-    constraints = gen_constraints(df)
-
-    with open("constraints.json", "w") as f:
-        json.dump(asdict(constraints), f, cls=NumpyEncoder)
-
-    with open("statistics.json", "w") as f:
-        json.dump(asdict(statistics), f, cls=NumpyEncoder)
-
-    analytics.track_baseline_created()
-
-
-def gen_statistics(df: pd.DataFrame) -> Statistics:
-    statistics = Statistics(
-        dataset=Dataset(len(df)),
-        features=[
-            _create_statistics_feature(feature_series)
-            for name, feature_series in df.iteritems()
-        ],
+def baseline(
+    df: pd.DataFrame,
+    n_jobs: Optional[int] = None,
+    binary: bool = False,
+    approximate_distinct: bool = False,
+    hll_precision: int = DEFAULT_HLL_PRECISION,
+    domain_filter_fpr: Optional[float] = None,
+    domain_filter_columns: Optional[Sequence[str]] = None,
+):
+    # Each column is profiled once for both baselines. approximate_distinct
+    # counts distinct strings with a HyperLogLog sketch of 2**hll_precision
+    # registers rather than exactly, for ID-like columns too large to hold
+    # every distinct value in memory.
+    #
+    # domain_filter_fpr constrains string columns with large vocabularies
+    # (domain_filter_columns, or all of them) to their known values, with a
+    # Bloom filter of that false positive rate. Write these with
+    # binary=True, so the filters are memory-mapped on load.
+    profile = profile_dataframe(
+        df, n_jobs, approximate_distinct, hll_precision
     )
-
-    return statistics
-
-
-def gen_constraints(df: pd.DataFrame) -> Constraints:
-    features = [
-        _create_constraints_feature(feature_series)
-        for name, feature_series in df.iteritems()
-    ]
-
-    monitoring_config = MonitoringConfig(DistributionConstraints())
-
-    constraints = Constraints(features, monitoring_config)
-
-    return constraints
-
-
-def _create_statistics_feature(feature_series: pd.Series) -> StatisticsFeature:
-    feature_name = feature_series.name
-    feature_type = _infer_feature_type(feature_series)
-
-    feature = StatisticsFeature(
-        name=feature_name, inferred_type=feature_type.value
+    _write_baseline(
+        profile.to_statistics(),
+        profile.to_constraints(
+            domain_filter_fpr, domain_filter_columns, binary
+        ),
+        binary,
     )
 
-    # NOTE (Josh): this is duplicative of the completeness
-    # constraint and also seems internally redundant?
-    n_missing = feature_series.isna().sum()
-    n_present = len(feature_series) - n_missing
-
-    common = CommonStatistics(n_present, n_missing)
-
-    if feature_type in {FeatureType.INTEGRAL, FeatureType.FRACTIONAL}:
-        feature.numerical_statistics = NumericalStatistics(
-            common=common,
-            mean=feature_series.mean(),
-            sum=feature_series.sum(),
-            std_dev=feature_series.std(),
-            min=feature_series.min(),
-            max=feature_series.max(),
-        )
-
-    elif feature_type == FeatureType.STRING:
-        feature.string_statistics = StringStatistics(
-            common=common, distinct_count=len(feature_series.dropna().unique())
-        )
-
-    return feature
-
-
-def _create_constraints_feature(
-    feature_series: pd.Series,
-) -> ConstraintFeature:
-    feature_name = feature_series.name
 
-    # 1. Infer type
-    feature_type = _infer_feature_type(feature_series)
+def baseline_from_chunks(
+    chunks: Iterable[pd.DataFrame],
+    binary: bool = False,
+    approximate_distinct: bool = False,
+    hll_precision: int = DEFAULT_HLL_PRECISION,
+    domain_filter_fpr: Optional[float] = None,
+    domain_filter_columns: Optional[Sequence[str]] = None,
+):
+    # Streaming variant of baseline() for training data that does not fit
+    # in memory, e.g. pd.read_csv(path, chunksize=100_000).
+    profile = profile_chunks(chunks, approximate_distinct, hll_precision)
+    _write_baseline(
+        profile.to_statistics(),
+        profile.to_constraints(
+            domain_filter_fpr, domain_filter_columns, binary
+        ),
+        binary,
+    )
 
-    # 2. Measure completeness
-    n_missing = feature_series.isna().sum()
-    feature_completeness = 1 - (n_missing / len(feature_series))
 
-    feature = ConstraintFeature(
-        name=feature_name,
-        inferred_type=feature_type.value,
-        completeness=feature_completeness,
+def partial_baseline(
+    df: pd.DataFrame,
+    path: str,
+    n_jobs: Optional[int] = None,
+    binary: bool = False,
+    approximate_distinct: bool = False,
+    hll_precision: int = DEFAULT_HLL_PRECISION,
+):
+    # Profile of one partition of the training data, e.g. on each worker
+    # of a cluster, written to path. merge_partials() combines the
+    # partials into the baseline that baseline() would write for the whole
+    # dataset.
+    profile = profile_dataframe(
+        df, n_jobs, approximate_distinct, hll_precision
     )
-
-    # 3. Enrich with type-specific constraints
-    if feature_type in {FeatureType.INTEGRAL, FeatureType.FRACTIONAL}:
-        feature.num_constraints = NumericalConstraints(
-            is_non_negative=bool(feature_series.min() >= 0)
+    _write_document(path, profile.to_partial(), binary)
+
+
+def merge_partials(
+    paths: Iterable[str],
+    binary: bool = False,
+    partial_path: Optional[str] = None,
+    domain_filter_fpr: Optional[float] = None,
+    domain_filter_columns: Optional[Sequence[str]] = None,
+):
+    # Writes the baseline of any number of partials of disjoint partitions.
+    # Counts, moments, bounds and value counts merge exactly, and the KLL,
+    # HyperLogLog and FrequentItems sketches within their error bounds.
+    # Domain values are in order of first appearance over paths.
+    #
+    # partial_path also writes the merged partial, so the baseline can be
+    # updated with new data later, with
+    # merge_partials([partial_path, new_path], partial_path=partial_path).
+    profile: Optional[DatasetProfile] = None
+    for path in paths:
+        partial = DatasetProfile.from_partial(
+            load_document(path, PartialBaseline)
         )
+        if profile is None:
+            profile = partial
+        else:
+            profile.merge(partial)
+    if profile is None:
+        raise ValueError("No partial baselines to merge")
+
+    if partial_path is not None:
+        _write_document(partial_path, profile.to_partial(), binary)
+    _write_baseline(
+        profile.to_statistics(),
+        profile.to_constraints(
+            domain_filter_fpr, domain_filter_columns, binary
+        ),
+        binary,
+    )
 
-    elif feature_type == FeatureType.STRING:
-        uniques = feature_series.dropna().unique()
-        if len(uniques) <= MAX_UNIQUES_THRESHOLD:
-            feature.string_constraints = StringConstraints(
-                domains=list(uniques)
-            )
-
-    return feature
-
-
-def _infer_feature_type(feature_series: pd.Series) -> FeatureType:
-    dtype_name = str(feature_series.dtype)
-
-    # {"int8", "int16", "int32", "int64", "intp"}
-    # {"uint8", "uint16", "uint32", "uint64", "uintp"}
-    if dtype_name.startswith("int") or dtype_name.startswith("uint"):
-        feature_type = FeatureType.INTEGRAL
-
-    # {"float16", "float32", "float64", "float96", "float128"}:
-    elif dtype_name.startswith("float"):
-        feature_type = FeatureType.FRACTIONAL
-
-    # {"string", "<U16/32/...", ">U16/32/...", "=U16/32/..."}
-    elif (dtype_name == "string") or (dtype_name[:2] in {"<U", ">U", "=U"}):
-        feature_type = FeatureType.STRING
 
-    elif dtype_name == "object":
-        # Assume unknown type as object
-        # dtype is assigned to mixed type
-        # data
-        feature_type = FeatureType.UNKNOWN
+def _write_baseline(
+    statistics: Statistics, constraints: Constraints, binary: bool = False
+):
+    # binary=True writes constraints.flare and statistics.flare in the
+    # compact format of flare.serialization instead of JSON
+    extension = BINARY_EXTENSION if binary else ".json"
+    _write_document("constraints" + extension, constraints, binary)
+    _write_document("statistics" + extension, statistics, binary)
+    analytics.track_baseline_created()
 
-        # If dataset is small-ish, attempt to infer
-        # if object dtype is actually strings
-        if len(feature_series) <= MAX_ROWS_FOR_OBJECT_TYPE_INFERENCE:
-            types = set(map(type, feature_series.dropna()))
-            if types == {str}:
-                feature_type = FeatureType.STRING
 
+def _write_document(path: str, document: Any, binary: bool = False):
+    if binary:
+        write_binary(path, document)
     else:
-        # Bools, datetimes, etc are all treated as unknown
-        feature_type = FeatureType.UNKNOWN
-
-    return feature_type
+        with open(path, "w") as f:
+            json.dump(asdict(document), f, cls=NumpyEncoder)
+
+
+def gen_statistics(
+    df: pd.DataFrame,
+    n_jobs: Optional[int] = None,
+    approximate_distinct: bool = False,
+    hll_precision: int = DEFAULT_HLL_PRECISION,
+) -> Statistics:
+    # n_jobs > 1 profiles columns in parallel processes. The output is
+    # identical to the serial path.
+    return profile_dataframe(
+        df, n_jobs, approximate_distinct, hll_precision
+    ).to_statistics()
+
+
+def gen_constraints(
+    df: pd.DataFrame,
+    n_jobs: Optional[int] = None,
+    approximate_distinct: bool = False,
+    domain_filter_fpr: Optional[float] = None,
+    domain_filter_columns: Optional[Sequence[str]] = None,
+    binary: bool = False,
+) -> Constraints:
+    # binary=True: for writing with flare.serialization.write_binary
+    return profile_dataframe(df, n_jobs, approximate_distinct).to_constraints(
+        domain_filter_fpr, domain_filter_columns, binary
+    )
@@ -0,0 +1,317 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+import atexit
+import logging
+import math
+import socket
+import threading
+import time
+
+logger = logging.getLogger("flare")
+
+# Label name/value pairs of a metric. Call sites keep these as constants so
+# recording a metric does not build new objects.
+Labels = Tuple[Tuple[str, str], ...]
+
+BASELINE_LOAD_SECONDS = "flare_baseline_load_seconds"
+CHECK_SECONDS = "flare_check_seconds"
+VALIDATION_SECONDS = "flare_validation_seconds"
+DISPATCH_SECONDS = "flare_dispatch_seconds"
+CHECKS_TOTAL = "flare_checks_total"
+FEATURE_ALERTS_TOTAL = "flare_feature_alerts_total"
+DISPATCH_FAILURES_TOTAL = "flare_dispatch_failures_total"
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (
+    0.000005,
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class MetricsExporter(ABC):
+    @abstractmethod
+    def observe(self, name: str, value: float, labels: Labels):
+        pass
+
+    @abstractmethod
+    def increment(self, name: str, value: float, labels: Labels):
+        pass
+
+    def flush(self):
+        pass
+
+
+class Stopwatch(object):
+    # Accumulates time per check family. lap(family) charges the time since
+    # the previous lap (or reset) to family.
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def reset(self):
+        self._last = time.perf_counter()
+
+    def lap(self, family: str):
+        now = time.perf_counter()
+        self.seconds[family] = self.seconds.get(family, 0.0) + (
+            now - self._last
+        )
+        self._last = now
+
+
+class _NullStopwatch(Stopwatch):
+    # Shared stand-in when metrics are disabled; records nothing
+    def __init__(self):
+        self.seconds = {}
+
+    def reset(self):
+        pass
+
+    def lap(self, family: str):
+        pass
+
+
+NULL_STOPWATCH: Stopwatch = _NullStopwatch()
+
+
+class Metrics(object):
+    # Fans metrics out to the registered exporters. With no exporter,
+    # `enabled` is False and instrumented code skips its timers entirely.
+
+    def __init__(self):
+        self.exporters: List[MetricsExporter] = []
+        self.enabled = False
+        self._family_labels: Dict[str, Labels] = {}
+
+    def add_exporter(self, exporter: MetricsExporter):
+        self.exporters.append(exporter)
+        self.enabled = True
+
+    def remove_exporter(self, exporter: MetricsExporter):
+        self.exporters.remove(exporter)
+        self.enabled = len(self.exporters) > 0
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        for exporter in self.exporters:
+            exporter.observe(name, value, labels)
+
+    def increment(self, name: str, value: float = 1, labels: Labels = ()):
+        for exporter in self.exporters:
+            exporter.increment(name, value, labels)
+
+    def stopwatch(self) -> Stopwatch:
+        return Stopwatch() if self.enabled else NULL_STOPWATCH
+
+    def observe_stopwatch(self, name: str, stopwatch: Stopwatch):
+        for family, seconds in stopwatch.seconds.items():
+            labels = self._family_labels.get(family)
+            if labels is None:
+                labels = self._family_labels.setdefault(
+                    family, (("family", family),)
+                )
+            self.observe(name, seconds, labels)
+
+    def flush(self):
+        for exporter in self.exporters:
+            exporter.flush()
+
+
+class _Histogram(object):
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+
+class PrometheusExporter(MetricsExporter):
+    # Aggregates histograms and counters in memory. render() returns them
+    # in the Prometheus text exposition format, e.g. to serve from the
+    # model server's /metrics endpoint.
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+
+    def observe(self, name: str, value: float, labels: Labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = _Histogram(self.buckets)
+            histogram.counts[index] += 1
+            histogram.sum += value
+
+    def increment(self, name: str, value: float, labels: Labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, histograms in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in histograms.items():
+                    cumulative = 0
+                    bounds = [_format_value(b) for b in self.buckets]
+                    for bound, count in zip(
+                        bounds + ["+Inf"], histogram.counts
+                    ):
+                        cumulative += count
+                        bucket_labels = labels + (("le", bound),)
+                        lines.append(
+                            f"{name}_bucket{_format_labels(bucket_labels)} "
+                            + f"{cumulative}"
+                        )
+                    lines.append(
+                        f"{name}_sum{_format_labels(labels)} "
+                        + _format_value(histogram.sum)
+                    )
+                    lines.append(
+                        f"{name}_count{_format_labels(labels)} {cumulative}"
+                    )
+
+            for name, counters in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in counters.items():
+                    lines.append(
+                        f"{name}{_format_labels(labels)} "
+                        + _format_value(value)
+                    )
+        return "\n".join(lines) + "\n"
+
+
+class StatsDExporter(MetricsExporter):
+    # Sends metrics as StatsD lines over UDP: timings in milliseconds
+    # ("name:1.5|ms") and counters ("name:1|c"), with labels as DogStatsD
+    # tags ("|#family:outlier"), or appended to the name when use_tags is
+    # False. Lines are batched into packets of up to max_packet_bytes and
+    # sent at least every flush_interval_seconds while metrics are
+    # recorded. Sending never raises; delivery is best effort like StatsD.
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8125,
+        prefix: str = "",
+        use_tags: bool = True,
+        max_packet_bytes: int = 1432,
+        flush_interval_seconds: float = 1.0,
+    ):
+        self.address = (host, port)
+        self.prefix = prefix
+        self.use_tags = use_tags
+        self.max_packet_bytes = max_packet_bytes
+        self.flush_interval_seconds = flush_interval_seconds
+        self._flushed_at = time.monotonic()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+        self._lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._buffer_bytes = 0
+        atexit.register(self.flush)
+
+    def observe(self, name: str, value: float, labels: Labels):
+        self._add(name, _format_value(value * 1000), "ms", labels)
+
+    def increment(self, name: str, value: float, labels: Labels):
+        self._add(name, _format_value(value), "c", labels)
+
+    def flush(self):
+        with self._lock:
+            packet = self._take()
+        self._send(packet)
+
+    def _add(self, name: str, value: str, kind: str, labels: Labels):
+        line = self._line(name, value, kind, labels)
+        packet: Optional[bytes] = None
+        with self._lock:
+            if self._buffer_bytes + len(line) + 1 > self.max_packet_bytes:
+                packet = self._take()
+            self._buffer.append(line)
+            self._buffer_bytes += len(line) + 1
+            if packet is None and (
+                time.monotonic() - self._flushed_at
+                >= self.flush_interval_seconds
+            ):
+                packet = self._take()
+        if packet:
+            self._send(packet)
+
+    def _line(self, name: str, value: str, kind: str, labels: Labels) -> bytes:
+        name = self.prefix + name
+        if not self.use_tags:
+            name = ".".join([name] + [label for _, label in labels])
+            return f"{name}:{value}|{kind}".encode("utf-8")
+        line = f"{name}:{value}|{kind}"
+        if labels:
+            line += "|#" + ",".join(f"{k}:{v}" for k, v in labels)
+        return line.encode("utf-8")
+
+    def _take(self) -> bytes:
+        packet = b"\n".join(self._buffer)
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._flushed_at = time.monotonic()
+        return packet
+
+    def _send(self, packet: bytes):
+        if not packet:
+            return
+        try:
+            self._socket.sendto(packet, self.address)
+        except OSError as e:
+            logger.debug(f"Could not send metrics: {e}")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+# Process-wide metrics used by the Flare runtime. Disabled until an exporter
+# is added.
+metrics = Metrics()
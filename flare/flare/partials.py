@@ -0,0 +1,50 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+from flare.statistics import HyperLogLogSketch, KLLSketch
+
+
+@dataclass
+class FrequentItemsSketch:
+    capacity: int
+    n: int
+    error: int
+    values: List[str]
+    counts: List[int]
+
+
+@dataclass
+class PartialFeature:
+    name: str
+    # FeatureType values seen in the column
+    types: List[str]
+    n_rows: int
+    n_missing: int
+    # FeatureType values of chunks where every value was missing
+    null_types: List[str] = field(default_factory=list)
+
+    # Numerical accumulators, over non-null values. sum, min and max are
+    # ints while only integer chunks were seen; min and max are None when
+    # there are no values.
+    n_values: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    sum: Union[int, float] = 0
+    min: Optional[Union[int, float]] = None
+    max: Optional[Union[int, float]] = None
+    sketch: Optional[KLLSketch] = None
+
+    # Counts of each distinct string, in order of first appearance. Empty
+    # once they are summarized by distinct_sketch and frequent_items.
+    values: List[str] = field(default_factory=list)
+    counts: List[int] = field(default_factory=list)
+    distinct_sketch: Optional[HyperLogLogSketch] = None
+    frequent_items: Optional[FrequentItemsSketch] = None
+
+
+@dataclass
+class PartialBaseline:
+    item_count: int
+    features: List[PartialFeature]
+    approximate_distinct: bool
+    hll_precision: int
+    version: int = 0
@@ -0,0 +1,657 @@
+import pandas as pd  # type: ignore
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Union
+from flare.constraints import (
+    Constraints,
+    NumericalConstraints,
+    StringConstraints,
+    MonitoringConfig,
+    DistributionConstraints,
+)
+from flare.constraints import Feature as ConstraintFeature
+from flare.statistics import (
+    Statistics,
+    Dataset,
+    NumericalStatistics,
+    NumericalDistribution,
+    StringStatistics,
+    StringDistribution,
+    CategoricalDistribution,
+    CategoryBucket,
+    CommonStatistics,
+)
+from flare.statistics import Feature as StatisticsFeature
+from flare.partials import PartialBaseline, PartialFeature
+from flare.sketches import (
+    DEFAULT_FREQUENT_ITEMS_CAPACITY,
+    DEFAULT_HLL_PRECISION,
+    KLL,
+    BloomFilter,
+    FrequentItems,
+    HyperLogLog,
+)
+from flare.types import FeatureType, is_string_series
+
+MAX_UNIQUES_THRESHOLD = 20
+
+# Columns with more distinct values get a categorical distribution of their
+# most frequent values, if at most MAX_HEAVY_HITTERS of them cover all but
+# HEAVY_HITTERS_TAIL_SHARE of the rows. The tail share is half the default
+# domain_content_threshold, so the baseline's own traffic stays well below
+# the threshold at runtime.
+MAX_HEAVY_HITTERS = DEFAULT_FREQUENT_ITEMS_CAPACITY
+HEAVY_HITTERS_TAIL_SHARE = (
+    MonitoringConfig(DistributionConstraints()).domain_content_threshold / 2
+)
+
+
+class ColumnProfile(object):
+    # Running summary of one column. Profiles are updated chunk by chunk
+    # and can be merged, so a column never needs to be in memory at once:
+    # exact counts, Welford/Chan mean and variance, min/max, a KLL sketch
+    # and the counts of each distinct string value.
+    #
+    # With approximate_distinct, value counts are only kept while they are
+    # few enough for a categorical domain. Past that, distinct values are
+    # counted in a HyperLogLog sketch and frequent values in a FrequentItems
+    # summary, so memory no longer grows with the number of distinct values.
+
+    def __init__(
+        self,
+        name: str,
+        approximate_distinct: bool = False,
+        hll_precision: int = DEFAULT_HLL_PRECISION,
+    ):
+        self.name = name
+        self.approximate_distinct = approximate_distinct
+        self.hll_precision = hll_precision
+        self.types: Set[FeatureType] = set()
+        # Types of all-null chunks, used only if no chunk has values
+        self.null_types: Set[FeatureType] = set()
+        self.n_rows = 0
+        self.n_missing = 0
+
+        # Numerical accumulators, over non-null values
+        self.n_values = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        # Integer chunks keep sum, min and max as exact ints
+        self.sum: Union[int, float] = 0
+        self.min: Union[int, float] = np.inf
+        self.max: Union[int, float] = -np.inf
+        self.sketch = KLL()
+
+        # String accumulators. Once value_counts_overflow is set, the value
+        # counts were folded into hll and frequent_items and are no longer
+        # kept.
+        self.value_counts = pd.Series([], dtype=np.int64)
+        self.value_counts_overflow = False
+        self.hll: Optional[HyperLogLog] = None
+        self.frequent_items: Optional[FrequentItems] = None
+
+    @property
+    def feature_type(self) -> FeatureType:
+        types = self.types or self.null_types
+        if not types:
+            return FeatureType.UNKNOWN
+        if types == {FeatureType.INTEGRAL}:
+            return FeatureType.INTEGRAL
+        if types <= {FeatureType.INTEGRAL, FeatureType.FRACTIONAL}:
+            return FeatureType.FRACTIONAL
+        if types == {FeatureType.STRING}:
+            return FeatureType.STRING
+        return FeatureType.UNKNOWN
+
+    def update(self, feature_series: pd.Series):
+        # Plain numpy numeric columns are converted once, and the same
+        # array gives the null count and every numerical accumulator.
+        values: Optional[np.ndarray] = None
+        dtype = feature_series.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "iuf":
+            values = feature_series.to_numpy(dtype=np.float64)
+            missing = np.isnan(values)
+            n_missing = int(missing.sum())
+        else:
+            n_missing = int(feature_series.isna().sum())
+
+        self.n_rows += len(feature_series)
+        self.n_missing += n_missing
+
+        # All-null chunks say nothing about the column's type, e.g.
+        # read_csv gives float64 for a string column missing from a chunk
+        if n_missing == len(feature_series):
+            self.null_types.add(infer_feature_type(feature_series))
+            return
+
+        feature_type = infer_feature_type(feature_series)
+        self.types.add(feature_type)
+
+        if feature_type in {FeatureType.INTEGRAL, FeatureType.FRACTIONAL}:
+            if values is None:
+                values = feature_series.to_numpy(
+                    dtype=np.float64, na_value=np.nan
+                )
+                missing = np.isnan(values)
+            self._update_numerical(
+                values[~missing] if n_missing else values,
+                (
+                    feature_series.to_numpy()
+                    if feature_type == FeatureType.INTEGRAL
+                    else None
+                ),
+            )
+
+        elif feature_type == FeatureType.STRING:
+            self._add_value_counts(
+                feature_series.value_counts(dropna=True, sort=False)
+            )
+
+    def _add_value_counts(self, value_counts: pd.Series):
+        if not self.value_counts_overflow:
+            self._merge_value_counts(value_counts)
+            if (
+                self.approximate_distinct
+                and len(self.value_counts) > MAX_UNIQUES_THRESHOLD
+            ):
+                self._overflow_value_counts()
+            return
+
+        # Only the distinct values are hashed
+        assert self.hll is not None and self.frequent_items is not None
+        self.hll.update(value_counts.index.to_numpy(dtype=object))
+        self.frequent_items.update_counts(value_counts)
+
+    def _overflow_value_counts(self):
+        self.hll = self.distinct_sketch()
+        self.frequent_items = FrequentItems()
+        self.frequent_items.update_counts(self.value_counts)
+        self.value_counts = pd.Series([], dtype=np.int64)
+        self.value_counts_overflow = True
+
+    def distinct_sketch(self) -> HyperLogLog:
+        # HyperLogLog of every distinct value seen, including the ones only
+        # kept in value_counts
+        sketch = HyperLogLog(self.hll_precision)
+        if self.hll is not None:
+            sketch.merge(self.hll)
+        if len(self.value_counts) > 0:
+            sketch.update(self.value_counts.index.to_numpy(dtype=object))
+        return sketch
+
+    @property
+    def distinct_count(self) -> int:
+        if self.value_counts_overflow:
+            return int(round(self.distinct_sketch().count()))
+        return len(self.value_counts)
+
+    def _update_numerical(
+        self, values: np.ndarray, integers: Optional[np.ndarray] = None
+    ):
+        if len(values) == 0:
+            return
+        chunk_mean = values.mean()
+        self._merge_moments(
+            len(values),
+            chunk_mean,
+            float(np.square(values - chunk_mean).sum()),
+        )
+        if integers is not None:
+            self.sum += int(integers.sum())
+            self.min = min(self.min, int(integers.min()))
+            self.max = max(self.max, int(integers.max()))
+        else:
+            self.sum += float(values.sum())
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+        self.sketch.update(values)
+
+    def _merge_moments(self, n: int, mean: float, m2: float):
+        # Chan et al. parallel update of the running mean and M2
+        total = self.n_values + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n_values * n / total
+        self.n_values = total
+
+    def _merge_value_counts(self, value_counts: pd.Series):
+        # Keeps values in order of first appearance
+        self.value_counts = (
+            pd.concat([self.value_counts, value_counts])
+            .groupby(level=0, sort=False)
+            .sum()
+            .astype(np.int64)
+        )
+
+    def merge(self, other: "ColumnProfile"):
+        self.types |= other.types
+        self.null_types |= other.null_types
+        self.n_rows += other.n_rows
+        self.n_missing += other.n_missing
+        if other.n_values > 0:
+            self._merge_moments(other.n_values, other.mean, other.m2)
+            self.sum += other.sum
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.sketch.merge(other.sketch)
+        if other.value_counts_overflow:
+            if not self.value_counts_overflow:
+                self._overflow_value_counts()
+            assert self.hll is not None and self.frequent_items is not None
+            assert other.hll is not None and other.frequent_items is not None
+            self.hll.merge(other.hll)
+            self.frequent_items.merge(other.frequent_items)
+        self._add_value_counts(other.value_counts)
+
+    def to_partial(self) -> PartialFeature:
+        has_values = self.n_values > 0
+        return PartialFeature(
+            name=self.name,
+            types=sorted(feature_type.value for feature_type in self.types),
+            null_types=sorted(
+                feature_type.value for feature_type in self.null_types
+            ),
+            n_rows=self.n_rows,
+            n_missing=self.n_missing,
+            n_values=self.n_values,
+            mean=float(self.mean),
+            m2=float(self.m2),
+            sum=self.sum,
+            min=self.min if has_values else None,
+            max=self.max if has_values else None,
+            sketch=self.sketch.to_sketch() if has_values else None,
+            values=self.value_counts.index.tolist(),
+            counts=self.value_counts.tolist(),
+            distinct_sketch=self.hll.to_sketch() if self.hll else None,
+            frequent_items=(
+                self.frequent_items.to_sketch()
+                if self.frequent_items
+                else None
+            ),
+        )
+
+    @classmethod
+    def from_partial(
+        cls,
+        feature: PartialFeature,
+        approximate_distinct: bool = False,
+        hll_precision: int = DEFAULT_HLL_PRECISION,
+    ) -> "ColumnProfile":
+        column = cls(feature.name, approximate_distinct, hll_precision)
+        column.types = {FeatureType(value) for value in feature.types}
+        column.null_types = {
+            FeatureType(value) for value in feature.null_types
+        }
+        column.n_rows = feature.n_rows
+        column.n_missing = feature.n_missing
+        column.n_values = feature.n_values
+        column.mean = feature.mean
+        column.m2 = feature.m2
+        column.sum = feature.sum
+        if feature.n_values > 0:
+            assert feature.min is not None and feature.max is not None
+            column.min = feature.min
+            column.max = feature.max
+        if feature.sketch is not None:
+            column.sketch = KLL.from_sketch(feature.sketch)
+        column.value_counts = pd.Series(
+            np.asarray(feature.counts, dtype=np.int64),
+            index=pd.Index(list(feature.values), dtype=object),
+        )
+        if feature.distinct_sketch is not None:
+            assert feature.frequent_items is not None
+            column.hll = HyperLogLog.from_sketch(feature.distinct_sketch)
+            column.frequent_items = FrequentItems.from_sketch(
+                feature.frequent_items
+            )
+            column.value_counts_overflow = True
+        return column
+
+    def to_statistics_feature(self) -> StatisticsFeature:
+        feature_type = self.feature_type
+        feature = StatisticsFeature(
+            name=self.name, inferred_type=feature_type.value
+        )
+        common = CommonStatistics(self.n_rows - self.n_missing, self.n_missing)
+
+        if feature_type in {FeatureType.INTEGRAL, FeatureType.FRACTIONAL}:
+            # Integral columns report sum, min and max as ints
+            number = int if feature_type == FeatureType.INTEGRAL else float
+            feature.numerical_statistics = NumericalStatistics(
+                common=common,
+                mean=self.mean if self.n_values > 0 else np.nan,
+                sum=number(self.sum),
+                std_dev=(
+                    np.sqrt(self.m2 / (self.n_values - 1))
+                    if self.n_values > 1
+                    else np.nan
+                ),
+                min=number(self.min) if self.n_values > 0 else np.nan,
+                max=number(self.max) if self.n_values > 0 else np.nan,
+                distribution=NumericalDistribution(
+                    kll=self.sketch.to_distribution()
+                ),
+            )
+
+        elif feature_type == FeatureType.STRING:
+            feature.string_statistics = StringStatistics(
+                common=common,
+                distinct_count=self.distinct_count,
+                distinct_sketch=self.distinct_sketch().to_sketch(),
+            )
+            if self._has_domain():
+                feature.string_statistics.distribution = StringDistribution(
+                    categorical=CategoricalDistribution(
+                        buckets=_category_buckets(self.value_counts)
+                    )
+                )
+            elif (heavy_hitters := self.heavy_hitters()) is not None:
+                feature.string_statistics.distribution = StringDistribution(
+                    categorical=CategoricalDistribution(
+                        buckets=_category_buckets(heavy_hitters),
+                        other_count=common.num_present
+                        - int(heavy_hitters.sum()),
+                    )
+                )
+
+        return feature
+
+    def to_constraints_feature(
+        self, domain_filter_fpr: Optional[float] = None, binary: bool = False
+    ) -> ConstraintFeature:
+        # domain_filter_fpr: string columns with too many values to list
+        # as domains get a Bloom filter of their values instead, with this
+        # false positive rate. This needs the exact value counts, so it is
+        # skipped for columns summarized by approximate_distinct. binary
+        # stores the filter's bits for a binary baseline.
+        feature_type = self.feature_type
+        feature = ConstraintFeature(
+            name=self.name,
+            inferred_type=feature_type.value,
+            completeness=(
+                1 - (self.n_missing / self.n_rows)
+                if self.n_rows > 0
+                else np.nan
+            ),
+        )
+
+        if feature_type in {FeatureType.INTEGRAL, FeatureType.FRACTIONAL}:
+            feature.num_constraints = NumericalConstraints(
+                is_non_negative=bool(self.n_values > 0 and self.min >= 0)
+            )
+
+        elif feature_type == FeatureType.STRING:
+            if self._has_domain():
+                feature.string_constraints = StringConstraints(
+                    domains=list(self.value_counts.index)
+                )
+            elif (
+                domain_filter_fpr is not None
+                and not self.value_counts_overflow
+            ):
+                bloom = BloomFilter.for_capacity(
+                    len(self.value_counts), domain_filter_fpr
+                )
+                bloom.update(self.value_counts.index.to_numpy())
+                feature.string_constraints = StringConstraints(
+                    domains=[], domain_filter=bloom.to_sketch(binary)
+                )
+
+        return feature
+
+    def heavy_hitters(self) -> Optional[pd.Series]:
+        # Counts of the fewest most frequent values that cover all but
+        # HEAVY_HITTERS_TAIL_SHARE of the rows, or None if more than
+        # MAX_HEAVY_HITTERS would be needed. Counts from a FrequentItems
+        # summary are lower bounds, so coverage is never overstated.
+        if self.frequent_items is not None:
+            counts = self.frequent_items.top(MAX_HEAVY_HITTERS)
+        else:
+            counts = self.value_counts.sort_values(
+                ascending=False, kind="stable"
+            )[:MAX_HEAVY_HITTERS]
+
+        n_present = self.n_rows - self.n_missing
+        covered = np.cumsum(counts.to_numpy())
+        needed = n_present * (1 - HEAVY_HITTERS_TAIL_SHARE)
+        n_values = int(np.searchsorted(covered, needed, side="left")) + 1
+        if n_values > len(counts):
+            return None
+        return counts[:n_values]
+
+    def _has_domain(self) -> bool:
+        return (
+            not self.value_counts_overflow
+            and len(self.value_counts) <= MAX_UNIQUES_THRESHOLD
+        )
+
+
+def _category_buckets(counts: pd.Series) -> List[CategoryBucket]:
+    return [
+        CategoryBucket(value=value, count=int(count))
+        for value, count in counts.items()
+    ]
+
+
+class DatasetProfile(object):
+    def __init__(
+        self,
+        approximate_distinct: bool = False,
+        hll_precision: int = DEFAULT_HLL_PRECISION,
+    ):
+        self.item_count = 0
+        self.columns: Dict[str, ColumnProfile] = {}
+        self.approximate_distinct = approximate_distinct
+        self.hll_precision = hll_precision
+
+    def update(self, df: pd.DataFrame):
+        self.item_count += len(df)
+        for name, feature_series in df.items():
+            if name not in self.columns:
+                self.columns[name] = ColumnProfile(
+                    name, self.approximate_distinct, self.hll_precision
+                )
+            self.columns[name].update(feature_series)
+
+    def merge(self, other: "DatasetProfile"):
+        self.item_count += other.item_count
+        for name, column in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(column)
+            else:
+                self.columns[name] = column
+
+    def to_partial(self) -> PartialBaseline:
+        return PartialBaseline(
+            item_count=self.item_count,
+            features=[column.to_partial() for column in self.columns.values()],
+            approximate_distinct=self.approximate_distinct,
+            hll_precision=self.hll_precision,
+        )
+
+    @classmethod
+    def from_partial(cls, partial: PartialBaseline) -> "DatasetProfile":
+        profile = cls(partial.approximate_distinct, partial.hll_precision)
+        profile.item_count = partial.item_count
+        for feature in partial.features:
+            profile.columns[feature.name] = ColumnProfile.from_partial(
+                feature, partial.approximate_distinct, partial.hll_precision
+            )
+        return profile
+
+    def to_statistics(self) -> Statistics:
+        return Statistics(
+            dataset=Dataset(self.item_count),
+            features=[
+                column.to_statistics_feature()
+                for column in self.columns.values()
+            ],
+        )
+
+    def to_constraints(
+        self,
+        domain_filter_fpr: Optional[float] = None,
+        domain_filter_columns: Optional[Iterable[str]] = None,
+        binary: bool = False,
+    ) -> Constraints:
+        # Domain filters are built for domain_filter_columns, or for every
+        # string column when None. Leave out ID-like columns, whose new
+        # values are expected. binary: see to_constraints_feature.
+        filtered = (
+            set(self.columns)
+            if domain_filter_columns is None
+            else set(domain_filter_columns)
+        )
+        features: List[ConstraintFeature] = [
+            column.to_constraints_feature(
+                domain_filter_fpr if name in filtered else None, binary
+            )
+            for name, column in self.columns.items()
+        ]
+        monitoring_config = MonitoringConfig(DistributionConstraints())
+        return Constraints(features, monitoring_config)
+
+
+def profile_dataframe(
+    df: pd.DataFrame,
+    n_jobs: Optional[int] = None,
+    approximate_distinct: bool = False,
+    hll_precision: int = DEFAULT_HLL_PRECISION,
+) -> DatasetProfile:
+    # Profiles every column in a single pass. The profile produces both the
+    # statistics and the constraints baselines.
+    profile = DatasetProfile(approximate_distinct, hll_precision)
+    profile.item_count = len(df)
+    func = partial(
+        _profile_column,
+        approximate_distinct=approximate_distinct,
+        hll_precision=hll_precision,
+    )
+    for column in map_columns(func, df, n_jobs):
+        profile.columns[column.name] = column
+    return profile
+
+
+def _profile_column(
+    feature_series: pd.Series,
+    approximate_distinct: bool = False,
+    hll_precision: int = DEFAULT_HLL_PRECISION,
+) -> ColumnProfile:
+    column = ColumnProfile(
+        feature_series.name, approximate_distinct, hll_precision
+    )
+    column.update(feature_series)
+    return column
+
+
+def profile_chunks(
+    chunks: Iterable[pd.DataFrame],
+    approximate_distinct: bool = False,
+    hll_precision: int = DEFAULT_HLL_PRECISION,
+) -> DatasetProfile:
+    # Peak memory is bounded by the chunk size (plus the distinct values
+    # of string columns, unless approximate_distinct), not by the size of
+    # the dataset.
+    profile = DatasetProfile(approximate_distinct, hll_precision)
+    for chunk in chunks:
+        profile.update(chunk)
+    return profile
+
+
+def map_columns(
+    func: Callable[[pd.Series], Any],
+    df: pd.DataFrame,
+    n_jobs: Optional[int] = None,
+) -> List[Any]:
+    # Applies func to every column of df, in column order. With n_jobs > 1
+    # columns are spread over a process pool. Plain numpy numeric columns
+    # are handed to workers through shared memory instead of being pickled;
+    # other columns (objects, strings, extension dtypes) are pickled.
+    if n_jobs is None or n_jobs == 1:
+        return [func(feature_series) for _, feature_series in df.items()]
+
+    buffers: List[SharedMemory] = []
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = []
+            for name, feature_series in df.items():
+                dtype = feature_series.dtype
+                if isinstance(dtype, np.dtype) and dtype.kind in "iuf":
+                    values = feature_series.to_numpy()
+                    buffer = SharedMemory(
+                        create=True, size=max(values.nbytes, 1)
+                    )
+                    buffers.append(buffer)
+                    shared: np.ndarray = np.ndarray(
+                        values.shape, dtype=dtype, buffer=buffer.buf
+                    )
+                    shared[:] = values
+                    del shared
+                    futures.append(
+                        pool.submit(
+                            _apply_to_shared_column,
+                            func,
+                            buffer.name,
+                            dtype.str,
+                            len(values),
+                            name,
+                        )
+                    )
+                else:
+                    futures.append(pool.submit(func, feature_series))
+            return [future.result() for future in futures]
+    finally:
+        for buffer in buffers:
+            buffer.close()
+            buffer.unlink()
+
+
+def _apply_to_shared_column(
+    func: Callable[[pd.Series], Any],
+    buffer_name: str,
+    dtype: str,
+    length: int,
+    name: str,
+) -> Any:
+    buffer = SharedMemory(name=buffer_name)
+    try:
+        values: np.ndarray = np.ndarray(
+            (length,), dtype=np.dtype(dtype), buffer=buffer.buf
+        )
+        result = func(pd.Series(values, name=name, copy=False))
+        # Drop every view of the buffer before closing it
+        del values
+        return result
+    finally:
+        buffer.close()
+
+
+def infer_feature_type(feature_series: pd.Series) -> FeatureType:
+    dtype_name = str(feature_series.dtype)
+
+    # {"int8", "int16", "int32", "int64", "intp"}
+    # {"uint8", "uint16", "uint32", "uint64", "uintp"}
+    if dtype_name.startswith("int") or dtype_name.startswith("uint"):
+        feature_type = FeatureType.INTEGRAL
+
+    # {"float16", "float32", "float64", "float96", "float128"}:
+    elif dtype_name.startswith("float"):
+        feature_type = FeatureType.FRACTIONAL
+
+    # {"string", "<U16/32/...", ">U16/32/...", "=U16/32/..."}
+    elif (dtype_name == "string") or (dtype_name[:2] in {"<U", ">U", "=U"}):
+        feature_type = FeatureType.STRING
+
+    elif dtype_name == "object":
+        # Object dtype is assigned to mixed type data as well as strings
+        feature_type = FeatureType.UNKNOWN
+        if is_string_series(feature_series):
+            feature_type = FeatureType.STRING
+
+    else:
+        # Bools, datetimes, etc are all treated as unknown
+        feature_type = FeatureType.UNKNOWN
+
+    return feature_type
@@ -0,0 +1,247 @@
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Dict, Iterable, Optional, Set, Union
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import numpy as np
+from flare.cache import LoadTimes, ValidationPlan, observe_load_times
+from flare.constraints import Constraints
+from flare.engine import CheckEngine
+from flare.serialization import BINARY_EXTENSION, load_document
+from flare.statistics import Statistics
+
+logger = logging.getLogger("flare")
+
+
+@dataclass(frozen=True)
+class BaselinePaths:
+    statistics: str
+    constraints: str
+
+
+@dataclass
+class ModelInfo:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    evictions: int = 0
+    load_seconds: float = 0.0
+    last_load_seconds: float = 0.0
+    size_bytes: int = 0
+
+
+class BaselineRegistry:
+    # Baselines of many models in one process, keyed by model name. Plans
+    # are loaded on first use and the least recently used ones are evicted
+    # when their estimated size exceeds max_bytes. Baseline files are found
+    # in the manifest, if any, and otherwise at <root>/<model_name>/
+    # statistics.json and constraints.json (or the .flare binary files).
+    #
+    # The manifest is a dict, or the path of a JSON file, mapping model names
+    # to {"statistics": path, "constraints": path}. Relative paths in a
+    # manifest file are relative to the file.
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        manifest: Optional[Union[str, Dict[str, Dict[str, str]]]] = None,
+        max_bytes: Optional[int] = None,
+        preload: Iterable[str] = (),
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._manifest: Dict[str, BaselinePaths] = {}
+        if manifest is not None:
+            self._manifest = _read_manifest(manifest)
+
+        self._lock = threading.Lock()
+        self._plans: "OrderedDict[str, ValidationPlan]" = OrderedDict()
+        self._info: Dict[str, ModelInfo] = {}
+        self._loading: Dict[str, threading.Lock] = {}
+        # Bumped by invalidate(), so loads that started before are dropped
+        self._generations: Dict[str, int] = {}
+        self._total_bytes = 0
+
+        self.preload(preload)
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def paths(self, model_name: str) -> BaselinePaths:
+        if model_name in self._manifest:
+            return self._manifest[model_name]
+        if self.root is None:
+            raise KeyError(f"No baselines registered for {model_name}")
+
+        directory = os.path.join(self.root, model_name)
+        return BaselinePaths(
+            statistics=_baseline_file(directory, "statistics"),
+            constraints=_baseline_file(directory, "constraints"),
+        )
+
+    def preload(self, model_names: Iterable[str]):
+        for model_name in model_names:
+            self.get_plan(model_name)
+
+    def get_plan(self, model_name: str) -> ValidationPlan:
+        with self._lock:
+            info = self._info.setdefault(model_name, ModelInfo())
+            plan = self._plans.get(model_name)
+            if plan is not None:
+                self._plans.move_to_end(model_name)
+                info.hits += 1
+                return plan
+            info.misses += 1
+            loading = self._loading.setdefault(model_name, threading.Lock())
+
+        # Loads run outside the registry lock, so other models are served
+        # meanwhile. Concurrent misses for one model load it only once.
+        with loading:
+            with self._lock:
+                plan = self._plans.get(model_name)
+                if plan is not None:
+                    self._plans.move_to_end(model_name)
+                    return plan
+                generation = self._generations.get(model_name, 0)
+
+            start = time.perf_counter()
+            plan = self._load(model_name)
+            elapsed = time.perf_counter() - start
+            size = _deep_size(plan)
+
+            with self._lock:
+                info.loads += 1
+                info.load_seconds += elapsed
+                info.last_load_seconds = elapsed
+                # Invalidated meanwhile: the plan may be of the old files,
+                # so it serves this call but is not cached
+                if self._generations.get(model_name, 0) == generation:
+                    info.size_bytes = size
+                    self._plans[model_name] = plan
+                    self._total_bytes += size
+                    self._evict(keep=model_name)
+            return plan
+
+    def invalidate(self, model_name: str):
+        # Drops the model's plan, e.g. after its baseline files changed
+        with self._lock:
+            self._generations[model_name] = (
+                self._generations.get(model_name, 0) + 1
+            )
+            if model_name in self._plans:
+                del self._plans[model_name]
+                self._total_bytes -= self._info[model_name].size_bytes
+
+    def info(self, model_name: str) -> ModelInfo:
+        with self._lock:
+            info = self._info.get(model_name, ModelInfo())
+            return ModelInfo(**info.__dict__)
+
+    def models(self) -> Dict[str, ModelInfo]:
+        with self._lock:
+            return {
+                name: ModelInfo(**info.__dict__)
+                for name, info in self._info.items()
+            }
+
+    def loaded(self) -> Iterable[str]:
+        with self._lock:
+            return list(self._plans)
+
+    def _load(self, model_name: str) -> ValidationPlan:
+        paths = self.paths(model_name)
+        load_times: LoadTimes = []
+        statistics = _load_or_none(paths.statistics, Statistics, load_times)
+        constraints = _load_or_none(paths.constraints, Constraints, load_times)
+        plan = ValidationPlan(
+            statistics=statistics,
+            constraints=constraints,
+            engine=CheckEngine(statistics, constraints),
+        )
+        observe_load_times(plan, load_times)
+        return plan
+
+    def _evict(self, keep: str):
+        if self.max_bytes is None:
+            return
+        while self._total_bytes > self.max_bytes and len(self._plans) > 1:
+            model_name = next(iter(self._plans))
+            if model_name == keep:
+                break
+            del self._plans[model_name]
+            info = self._info[model_name]
+            info.evictions += 1
+            self._total_bytes -= info.size_bytes
+            logger.debug(f"Evicted baselines of {model_name}")
+
+
+def _read_manifest(
+    manifest: Union[str, Dict[str, Dict[str, str]]],
+) -> Dict[str, BaselinePaths]:
+    directory = ""
+    if isinstance(manifest, str):
+        directory = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, "r") as f:
+            manifest = json.load(f)
+
+    return {
+        model_name: BaselinePaths(
+            statistics=os.path.join(directory, entry["statistics"]),
+            constraints=os.path.join(directory, entry["constraints"]),
+        )
+        for model_name, entry in manifest.items()  # type: ignore
+    }
+
+
+def _baseline_file(directory: str, name: str) -> str:
+    binary = os.path.join(directory, name + BINARY_EXTENSION)
+    if os.path.exists(binary):
+        return binary
+    return os.path.join(directory, name + ".json")
+
+
+def _load_or_none(path: str, data_class: Any, load_times: LoadTimes) -> Any:
+    name = data_class.__name__.lower()
+    start = time.perf_counter()
+    try:
+        document = load_document(path, data_class)
+    except Exception as e:
+        logger.exception(f"Could not load {name} baseline {path}: {e}")
+        return None
+    load_times.append((name, time.perf_counter() - start))
+    return document
+
+
+def _deep_size(value: Any, seen: Optional[Set[int]] = None) -> int:
+    # Estimated memory held by a plan. Arrays count their data buffer, so
+    # memory-mapped baselines count their file-backed arrays too.
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (
+            value.nbytes if value.base is not None else 0
+        )
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(
+            _deep_size(k, seen) + _deep_size(v, seen) for k, v in value.items()
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in value)
+    elif is_dataclass(value):
+        size += sum(
+            _deep_size(getattr(value, f.name), seen) for f in fields(value)
+        )
+    elif hasattr(value, "__dict__"):
+        size += _deep_size(vars(value), seen)
+    return size
@@ -1,20 +1,42 @@
 import pandas as pd  # type: ignore
-from typing import Optional, List
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Optional,
+    List,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+import functools
+import inspect
+import sys
+import time
 import traceback
 import os
 import logging
-import json
-from dacite import from_dict
+from flare.cache import ValidationPlan, baseline_cache
+from flare.drift import get_drift_monitor
+from flare.engine import Record, ValidationResult
+from flare.metrics import (
+    CHECKS_TOTAL,
+    DISPATCH_FAILURES_TOTAL,
+    DISPATCH_SECONDS,
+    FEATURE_ALERTS_TOTAL,
+    VALIDATION_SECONDS,
+    metrics,
+)
+from flare.registry import BaselineRegistry
 from flare.statistics import Statistics
-from flare.statistics import Feature as FeatureStatistics
 from flare.constraints import Constraints
-from flare.constraints import Feature as FeatureConstraint
+from flare.sampling import SamplingPolicy
 from flare.alerting import (
     FeatureAlert,
     Alert,
     InferenceException,
-    FeatureAlertKind,
-    AlertWebhookTarget,
+    AlertTarget,
 )
 
 FLARE_STATISTICS_PATH_VAR = "FLARE_STATISTICS_PATH"
@@ -22,200 +44,304 @@ FLARE_CONSTRAINTS_PATH_VAR = "FLARE_CONSTRAINTS_PATH"
 
 logger = logging.getLogger("flare")
 
+F = TypeVar("F", bound=Callable[..., Any])
 
-class Flare(object):
-    model_name: str
-    constraints: Optional[Constraints]
-    statistics: Optional[Statistics]
-    feature_alerts: List[FeatureAlert]
-    target: AlertWebhookTarget
+# Metadata of calls without sampling. Shared, so it must not be modified.
+_NO_METADATA: Dict[str, Any] = {}
+
+
+class FlareValidator(object):
+    # Long-lived counterpart of Flare for model servers. Built once per
+    # model, it keeps the compiled baselines, the drift monitor, sampling
+    # policy and alert target across calls, so a call only pays for the
+    # checks themselves. reload() picks up changed baseline files.
+    #
+    # With a registry, the model's baselines are looked up in the registry
+    # on every call instead, so they can be evicted between calls.
+    #
+    # detect_drift=True compares windows of traffic to the baseline
+    # distributions (see flare.drift.DriftMonitor).
 
     def __init__(
-        self, model_name: str, x: pd.DataFrame, target: AlertWebhookTarget
+        self,
+        model_name: str,
+        target: AlertTarget,
+        sampling: Optional[SamplingPolicy] = None,
+        statistics_path: Optional[str] = None,
+        constraints_path: Optional[str] = None,
+        registry: Optional[BaselineRegistry] = None,
+        detect_drift: bool = False,
     ):
         self.model_name = model_name
         self.target = target
-        statistics_path = os.environ.get(
+        self.sampling = sampling
+        self.registry = registry
+        self.detect_drift = detect_drift
+        self._model_labels = (("model", model_name),)
+        self.statistics_path = statistics_path or os.environ.get(
             FLARE_STATISTICS_PATH_VAR, "statistics.json"
         )
-        try:
-            with open(statistics_path, "r") as f:
-                data = json.load(f)
-            self.statistics = from_dict(data_class=Statistics, data=data)
-            logger.debug(f"Loaded statistics baseline: {self.statistics}")
+        self.constraints_path = constraints_path or os.environ.get(
+            FLARE_CONSTRAINTS_PATH_VAR, "constraints.json"
+        )
+        if registry is None:
+            self.reload()
 
-        except Exception as e:
-            logger.exception(f"Could not load statistics baseline: {e}")
-            self.statistics = None
+    @property
+    def plan(self) -> ValidationPlan:
+        if self.registry is not None:
+            return self.registry.get_plan(self.model_name)
+        return self._plan
 
-        constraints_path = os.environ.get(
-            FLARE_CONSTRAINTS_PATH_VAR, "constraints.json"
+    @property
+    def statistics(self) -> Optional[Statistics]:
+        return self.plan.statistics
+
+    @property
+    def constraints(self) -> Optional[Constraints]:
+        return self.plan.constraints
+
+    def reload(self):
+        if self.registry is not None:
+            self.registry.invalidate(self.model_name)
+            return
+        self._plan = baseline_cache.get_plan(
+            self.statistics_path, self.constraints_path
+        )
+        self._drift = get_drift_monitor(
+            self.model_name,
+            self._plan.statistics,
+            self._plan.constraints,
+            self.detect_drift,
         )
 
-        try:
-            with open(constraints_path, "r") as f:
-                data = json.load(f)
-            self.constraints = from_dict(data_class=Constraints, data=data)
-            logger.debug(f"Loaded constraints baseline: {self.constraints}")
-        except Exception as e:
-            logger.exception(f"Could not load constraints baseline: {e}")
-            self.constraints = None
-
-        self.feature_alerts: List[FeatureAlert] = []
-        self.feature_alerts.extend(self._check_constraints(x))
-        self.feature_alerts.extend(self._check_statistics(x))
-
-    def _check_statistics(self, x: pd.DataFrame) -> List[FeatureAlert]:
-        if self.statistics is None:
-            logger.info("Skipping statistical checks.")
-            return []
-
-        result = []
-        for feature in self.statistics.features:
-            col = x[feature.name]
-            result.extend(self._check_feature_statistics(feature, col))
-        logger.info(f"Found {len(result)} statistical alerts.")
-        return result
-
-    def _check_feature_statistics(
-        self, statistic: FeatureStatistics, col: pd.Series
-    ) -> List[FeatureAlert]:
-        result: List[FeatureAlert] = []
-
-        outlier_cutoff = float(os.environ.get("FLARE_OUTLIER_CUTOFF", "4"))
-
-        num_missing = None
-        if numerical_statistic := statistic.numerical_statistics:
-            # Check outlier
-            if (
-                (
-                    abs(col - numerical_statistic.mean)
-                    / numerical_statistic.std_dev
-                )
-                > outlier_cutoff
-            ).any():
-                result.append(
-                    FeatureAlert(
-                        name=col.name, kind=FeatureAlertKind.OUTLIER.value
-                    )
-                )
+    def validate(self, x: Union[pd.DataFrame, Record]) -> List[FeatureAlert]:
+        # Checks x and sends an alert if any check failed
+        alerts, metadata, _ = self.check(x)
+        self.send(alerts, None, metadata)
+        return alerts
+
+    def monitor(
+        self, func: Optional[F] = None, argument: Union[int, str] = 0
+    ) -> Any:
+        # Decorator that validates the inference input of func and reports
+        # exceptions it raises. argument is the position or name of the
+        # input parameter, e.g. argument="x" for a method predict(self, x).
+        if func is None:
+            return functools.partial(self.monitor, argument=argument)
 
-            # Check bound
-            if (col < numerical_statistic.min).any() or (
-                col > numerical_statistic.max
-            ).any():
-                result.append(
-                    FeatureAlert(
-                        name=col.name, kind=FeatureAlertKind.BOUND.value
-                    )
+        # The input is found by parameter name, however it is passed
+        signature = inspect.signature(func)
+        name = argument
+        if isinstance(argument, int):
+            name = list(signature.parameters)[argument]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                x = signature.bind(*args, **kwargs).arguments[name]
+            except (TypeError, KeyError):
+                # Monitoring never breaks inference
+                logger.warning(
+                    f"Input {name} of {func.__name__} not found. "
+                    + "Calling it without validation."
                 )
+                return func(*args, **kwargs)
 
-            num_missing = numerical_statistic.common.num_missing
+            alerts, metadata, _ = self.check(x)
+            try:
+                output = func(*args, **kwargs)
+            except BaseException:
+                exception = _inference_exception(*sys.exc_info())
+                self.send(alerts, exception, metadata)
+                raise
+            self.send(alerts, None, metadata)
+            return output
 
-        if string_statistic := statistic.string_statistics:
-            num_missing = string_statistic.common.num_missing
+        return cast(F, wrapper)
 
-        # Check null
-        if num_missing is not None and num_missing == 0:
-            if col.isnull().any():
-                result.append(
-                    FeatureAlert(
-                        name=col.name, kind=FeatureAlertKind.NULL.value
-                    )
-                )
+    def check(
+        self,
+        x: Union[pd.DataFrame, Record],
+        row_masks: bool = False,
+        plan: Optional[ValidationPlan] = None,
+    ) -> Tuple[List[FeatureAlert], Dict[str, Any], Optional[ValidationResult]]:
+        # Alerts, sampling metadata and, with row_masks, the per-row
+        # violations of the checked rows. Nothing is sent. plan defaults to
+        # the model's current plan.
+        if row_masks and not isinstance(x, pd.DataFrame):
+            raise ValueError("row_masks requires a DataFrame")
 
-        return result
-
-    def _check_constraints(self, x: pd.DataFrame) -> List[FeatureAlert]:
-        if self.constraints is None:
-            return []
-
-        result = []
-        for feature in self.constraints.features:
-            col = x[feature.name]
-            result.extend(self._check_feature_constraint(feature, col))
-        return result
-
-    def _check_feature_constraint(
-        self, constraint: FeatureConstraint, col: pd.Series
-    ) -> List[FeatureAlert]:
-        result = []
-        # Check non-negative
-        if num_constraint := constraint.num_constraints:
-            if num_constraint.is_non_negative:
-                if (col < 0).any():
-                    result.append(
-                        FeatureAlert(
-                            name=col.name, kind=FeatureAlertKind.NEGATIVE.value
-                        )
-                    )
-        # Check categorical
-        if string_constraint := constraint.string_constraints:
-            if len(string_constraint.domains) > 0:
-                if not col.isin(string_constraint.domains).all():
-                    result.append(
-                        FeatureAlert(
-                            name=col.name,
-                            kind=FeatureAlertKind.CATEGORICAL.value,
-                        )
-                    )
-
-        # Check for type
-        dtype_name = str(col.dtype)
-        if constraint.inferred_type == "Fractional":
-            if not dtype_name.startswith("float"):
-                result.append(
-                    FeatureAlert(
-                        name=col.name,
-                        kind=FeatureAlertKind.TYPE.value,
-                    )
-                )
+        sampling = self.sampling
+        if sampling is None:
+            alerts, result = self._check(x, row_masks, plan)
+            return alerts, _NO_METADATA, result
 
-        elif constraint.inferred_type == "Integral":
-            if not (
-                dtype_name.startswith("int") or dtype_name.startswith("uint")
-            ):
-                result.append(
-                    FeatureAlert(
-                        name=col.name,
-                        kind=FeatureAlertKind.TYPE.value,
-                    )
-                )
+        # Exceptions are still captured for calls that are not checked
+        alerts = []
+        result = None
+        rows_checked = 0
+        if sampling.should_check():
+            start = time.perf_counter()
+            sample = x
+            if isinstance(x, pd.DataFrame):
+                sample = sampling.sample_rows(x)
+            alerts, result = self._check(sample, row_masks, plan)
+            sampling.record(time.perf_counter() - start)
+            rows_checked = _n_rows(sample)
+        return alerts, sampling.metadata(rows_checked, _n_rows(x)), result
+
+    def send(
+        self,
+        alerts: List[FeatureAlert],
+        exception: Optional[InferenceException],
+        metadata: Dict[str, Any],
+    ):
+        if len(alerts) == 0 and exception is None:
+            return
+        alert = Alert(self.model_name, alerts, exception, dict(metadata))
+        if not (metrics.enabled and self.plan.engine.emit_metrics):
+            self.target.send_alert(alert)
+            return
+
+        start = time.perf_counter()
+        sent = self.target.send_alert(alert)
+        metrics.observe(
+            DISPATCH_SECONDS, time.perf_counter() - start, self._model_labels
+        )
+        if sent is False:
+            metrics.increment(DISPATCH_FAILURES_TOTAL, 1, self._model_labels)
+
+    def _check(
+        self,
+        x: Union[pd.DataFrame, Record],
+        row_masks: bool,
+        plan: Optional[ValidationPlan],
+    ) -> Tuple[List[FeatureAlert], Optional[ValidationResult]]:
+        if plan is None and self.registry is None:
+            plan, drift = self._plan, self._drift
+        else:
+            if plan is None:
+                plan = self.plan
+            drift = get_drift_monitor(
+                self.model_name,
+                plan.statistics,
+                plan.constraints,
+                self.detect_drift,
+            )
+
+        engine = plan.engine
+        timed = metrics.enabled and engine.emit_metrics
+        start = time.perf_counter() if timed else 0.0
+
+        result = None
+        if not isinstance(x, pd.DataFrame):
+            record = engine.as_record(x)
+            alerts = engine.check_record(record)
+            alerts.extend(drift.update_record(record))
+        elif row_masks:
+            result = engine.validate(x)
+            alerts = list(result.alerts)
+            alerts.extend(drift.update(x))
+        else:
+            alerts = engine.check(x)
+            alerts.extend(drift.update(x))
+
+        if timed:
+            self._record_metrics(alerts, time.perf_counter() - start)
+        return alerts, result
+
+    def _record_metrics(self, alerts: List[FeatureAlert], seconds: float):
+        labels = self._model_labels
+        metrics.increment(CHECKS_TOTAL, 1, labels)
+        metrics.observe(VALIDATION_SECONDS, seconds, labels)
+        for alert in alerts:
+            metrics.increment(
+                FEATURE_ALERTS_TOTAL, 1, labels + (("kind", alert.kind),)
+            )
+
+
+def monitor(
+    model_name: str,
+    target: AlertTarget,
+    sampling: Optional[SamplingPolicy] = None,
+    argument: Union[int, str] = 0,
+    registry: Optional[BaselineRegistry] = None,
+    detect_drift: bool = False,
+) -> Callable[[F], F]:
+    # @monitor("model", target) on an inference function. The validator is
+    # built once, when the function is decorated.
+    validator = FlareValidator(
+        model_name,
+        target,
+        sampling,
+        registry=registry,
+        detect_drift=detect_drift,
+    )
+    return validator.monitor(argument=argument)
+
+
+class Flare(object):
+    model_name: str
+    constraints: Optional[Constraints]
+    statistics: Optional[Statistics]
+    feature_alerts: List[FeatureAlert]
+    target: AlertTarget
+    metadata: Dict[str, Any]
+    result: Optional[ValidationResult]
 
-        elif constraint.inferred_type == "String":
-            if not (dtype_name == "string") or (
-                dtype_name[:2] in {"<U", ">U", "=U"}
-            ):
-                types = set(map(type, col.dropna()))
-                if types != {str}:
-                    result.append(
-                        FeatureAlert(
-                            name=col.name,
-                            kind=FeatureAlertKind.TYPE.value,
-                        )
-                    )
-
-        return result
+    def __init__(
+        self,
+        model_name: str,
+        x: Union[pd.DataFrame, Record],
+        target: AlertTarget,
+        sampling: Optional[SamplingPolicy] = None,
+        row_masks: bool = False,
+        registry: Optional[BaselineRegistry] = None,
+        detect_drift: bool = False,
+    ):
+        # x is a DataFrame, or a single record as a dict or 1-D array,
+        # which is checked without building a DataFrame. row_masks=True
+        # keeps the per-row violations of the checked rows of a DataFrame
+        # in self.result, e.g. to drop bad rows before predicting. With a
+        # registry, baselines are found by model name instead of the
+        # FLARE_*_PATH environment variables.
+        self.model_name = model_name
+        self.target = target
+        self._validator = FlareValidator(
+            model_name,
+            target,
+            sampling,
+            registry=registry,
+            detect_drift=detect_drift,
+        )
+        plan = self._validator.plan
+        self.statistics = plan.statistics
+        self.constraints = plan.constraints
+        self.feature_alerts, metadata, self.result = self._validator.check(
+            x, row_masks, plan
+        )
+        self.metadata = dict(metadata)
 
     def __enter__(self):
-        pass
+        return self
 
     def __exit__(self, type, value, tb):
         inference_exception = None
         if type is not None:
-            logger.exception(
-                f"Exception occured during model inference: {value}"
-            )
-            inference_exception = InferenceException(
-                message=value,
-                traceback="\n".join(
-                    traceback.format_exception(type, value, tb)
-                ),
-            )
-
-        alert = Alert(
-            self.model_name, self.feature_alerts, inference_exception
+            inference_exception = _inference_exception(type, value, tb)
+        self._validator.send(
+            self.feature_alerts, inference_exception, self.metadata
         )
 
-        if len(alert.features) > 0 or alert.exception is not None:
-            self.target.send_alert(alert)
+
+def _inference_exception(type, value, tb) -> InferenceException:
+    logger.exception(f"Exception occured during model inference: {value}")
+    return InferenceException(
+        message=value,
+        traceback="\n".join(traceback.format_exception(type, value, tb)),
+    )
+
+
+def _n_rows(x: Union[pd.DataFrame, Record]) -> int:
+    return len(x) if isinstance(x, pd.DataFrame) else 1
@@ -0,0 +1,87 @@
+import pandas as pd  # type: ignore
+import numpy as np
+from typing import Any, Dict, Optional
+import math
+import threading
+
+# Weight of the latest measurement in the running check-cost average
+COST_SMOOTHING = 0.1
+
+
+class SamplingPolicy(object):
+    # Controls how much of the traffic Flare checks. One policy should be
+    # shared across calls for a model, since the adaptive mode learns the
+    # cost of a check from previous calls.
+    #
+    # - call_rate: fraction of calls that are checked at all
+    # - row_rate: fraction of rows checked in batches of at least
+    #   min_rows_for_row_sampling rows
+    # - overhead_budget_us: if set, lowers the call rate so the average
+    #   check cost per call stays under this many microseconds
+
+    def __init__(
+        self,
+        call_rate: float = 1.0,
+        row_rate: float = 1.0,
+        min_rows_for_row_sampling: int = 1000,
+        overhead_budget_us: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        if not (0.0 <= call_rate <= 1.0 and 0.0 < row_rate <= 1.0):
+            raise ValueError("Sampling rates must be between 0 and 1")
+
+        self.call_rate = call_rate
+        self.row_rate = row_rate
+        self.min_rows_for_row_sampling = min_rows_for_row_sampling
+        self.overhead_budget_us = overhead_budget_us
+
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+        self._mean_cost_us: Optional[float] = None
+
+    @property
+    def effective_call_rate(self) -> float:
+        rate = self.call_rate
+        if self.overhead_budget_us is not None and self._mean_cost_us:
+            rate = min(rate, self.overhead_budget_us / self._mean_cost_us)
+        return rate
+
+    def should_check(self) -> bool:
+        rate = self.effective_call_rate
+        if rate >= 1.0:
+            return True
+        with self._lock:
+            return bool(self._rng.random() < rate)
+
+    def sample_rows(self, x: pd.DataFrame) -> pd.DataFrame:
+        n_rows = len(x)
+        if self.row_rate >= 1.0 or n_rows < self.min_rows_for_row_sampling:
+            return x
+
+        n_sampled = math.ceil(n_rows * self.row_rate)
+        with self._lock:
+            rows = self._rng.choice(n_rows, size=n_sampled, replace=False)
+        rows.sort()
+        return x.iloc[rows]
+
+    def record(self, elapsed_seconds: float):
+        cost_us = elapsed_seconds * 1e6
+        with self._lock:
+            if self._mean_cost_us is None:
+                self._mean_cost_us = cost_us
+            else:
+                self._mean_cost_us += COST_SMOOTHING * (
+                    cost_us - self._mean_cost_us
+                )
+
+    def metadata(self, rows_checked: int, rows_total: int) -> Dict[str, Any]:
+        return {
+            "sampling": {
+                "call_rate": self.effective_call_rate,
+                "row_rate": (
+                    rows_checked / rows_total if rows_total > 0 else 1.0
+                ),
+                "rows_checked": rows_checked,
+                "rows_total": rows_total,
+            }
+        }
@@ -0,0 +1,225 @@
+import numpy as np
+from dacite import from_dict
+from dataclasses import asdict, is_dataclass
+from typing import Any, Dict, List, Sequence, Tuple, Type, TypeVar
+import json
+import os
+import struct
+import tempfile
+
+# Binary baseline layout:
+#
+#   MAGIC | header length (uint64 LE) | header (UTF-8 JSON) | data section
+#
+# The header is the baseline document with long homogeneous lists replaced
+# by references into the data section: {"__array__": i} for numbers and
+# {"__strings__": i} for strings. Arrays are little-endian and aligned to
+# ARRAY_ALIGNMENT bytes, so they are memory-mapped on load and only paged
+# in when used.
+MAGIC = b"FLAREBL1"
+ARRAY_ALIGNMENT = 64
+MIN_ARRAY_LENGTH = 16
+BINARY_EXTENSION = ".flare"
+
+T = TypeVar("T")
+# Keys and list indices leading to a value in a document
+Path = Tuple[Any, ...]
+
+
+class NumpyEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, np.integer):
+            return int(obj)
+        elif isinstance(obj, np.floating):
+            return float(obj)
+        elif isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return json.JSONEncoder.default(self, obj)
+
+
+def is_binary_baseline(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_document(path: str, data_class: Type[T]) -> T:
+    # Loads a statistics/constraints baseline in either format
+    if is_binary_baseline(path):
+        return read_binary(path, data_class)
+    with open(path, "r") as f:
+        return from_dict(data_class=data_class, data=json.load(f))
+
+
+def write_binary(path: str, document: Any):
+    # document is a Statistics/Constraints dataclass or its JSON dict
+    if is_dataclass(document) and not isinstance(document, type):
+        document = json.loads(json.dumps(asdict(document), cls=NumpyEncoder))
+
+    arrays: List[np.ndarray] = []
+    encoded = _encode(document, arrays)
+
+    specs = []
+    offset = 0
+    for array in arrays:
+        offset = _align(offset)
+        specs.append(
+            {"dtype": array.dtype.str, "offset": offset, "length": len(array)}
+        )
+        offset += array.nbytes
+
+    header = json.dumps({"document": encoded, "arrays": specs}).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    # Written to a temporary file and moved into place, so processes that
+    # have the previous version memory-mapped keep a valid file.
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for array, spec in zip(arrays, specs):
+            f.write(b"\0" * (data_start + spec["offset"] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(f.name, path)
+
+
+def read_binary(path: str, data_class: Type[T]) -> T:
+    header, data = _read(path)
+    placeholders: Dict[Path, np.ndarray] = {}
+    document = _decode(
+        header["document"], header["arrays"], data, (), placeholders
+    )
+
+    # dacite would copy numpy arrays into lists, so arrays are attached to
+    # the dataclasses after they are built.
+    result = from_dict(data_class=data_class, data=document)
+    for path_in_document, array in placeholders.items():
+        _set_path(result, path_in_document, array)
+    return result
+
+
+def read_binary_json(path: str) -> Dict[str, Any]:
+    # Decodes a binary baseline back to the equivalent JSON document
+    header, data = _read(path)
+    placeholders: Dict[Path, np.ndarray] = {}
+    document = _decode(
+        header["document"], header["arrays"], data, (), placeholders
+    )
+    for path_in_document, array in placeholders.items():
+        _set_path(document, path_in_document, array.tolist())
+    return document
+
+
+def json_to_binary(json_path: str, binary_path: str):
+    with open(json_path, "r") as f:
+        write_binary(binary_path, json.load(f))
+
+
+def binary_to_json(binary_path: str, json_path: str):
+    with open(json_path, "w") as f:
+        json.dump(read_binary_json(binary_path), f)
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+
+def _encode(node: Any, arrays: List[np.ndarray]) -> Any:
+    if isinstance(node, dict):
+        return {key: _encode(value, arrays) for key, value in node.items()}
+
+    if isinstance(node, (list, tuple)):
+        if len(node) >= MIN_ARRAY_LENGTH:
+            kinds = {type(item) for item in node}
+            if kinds == {float}:
+                arrays.append(np.array(node, dtype="<f8"))
+                return {"__array__": len(arrays) - 1}
+            if kinds == {int} and _fits_int64(node):
+                arrays.append(np.array(node, dtype="<i8"))
+                return {"__array__": len(arrays) - 1}
+            if kinds == {str}:
+                encoded = [item.encode("utf-8") for item in node]
+                lengths = np.array([len(item) for item in encoded])
+                arrays.append(
+                    np.concatenate([[0], np.cumsum(lengths)]).astype("<i8")
+                )
+                arrays.append(np.frombuffer(b"".join(encoded), dtype="u1"))
+                return {"__strings__": len(arrays) - 2}
+        return [_encode(item, arrays) for item in node]
+
+    return node
+
+
+def _fits_int64(values: Sequence[int]) -> bool:
+    limits = np.iinfo(np.int64)
+    return limits.min <= min(values) and max(values) <= limits.max
+
+
+def _read(path: str) -> Tuple[Dict[str, Any], np.ndarray]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a binary Flare baseline")
+        (header_length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+    data_start = _align(len(MAGIC) + 8 + header_length)
+    data: np.ndarray
+    if os.path.getsize(path) > data_start:
+        data = np.memmap(path, dtype="u1", mode="r", offset=data_start)
+    else:
+        data = np.empty(0, dtype="u1")
+    return header, data
+
+
+def _array(spec: Dict[str, Any], data: np.ndarray) -> np.ndarray:
+    dtype = np.dtype(spec["dtype"])
+    start = spec["offset"]
+    stop = start + spec["length"] * dtype.itemsize
+    return data[start:stop].view(dtype)
+
+
+def _decode(
+    node: Any,
+    specs: List[Dict[str, Any]],
+    data: np.ndarray,
+    path: Path,
+    placeholders: Dict[Path, np.ndarray],
+) -> Any:
+    if isinstance(node, dict):
+        if "__array__" in node:
+            placeholders[path] = _array(specs[node["__array__"]], data)
+            return []
+        if "__strings__" in node:
+            index = node["__strings__"]
+            offsets = _array(specs[index], data)
+            blob = _array(specs[index + 1], data).tobytes()
+            return [
+                blob[start:stop].decode("utf-8")
+                for start, stop in zip(offsets[:-1], offsets[1:])
+            ]
+        return {
+            key: _decode(value, specs, data, path + (key,), placeholders)
+            for key, value in node.items()
+        }
+
+    if isinstance(node, list):
+        return [
+            _decode(item, specs, data, path + (index,), placeholders)
+            for index, item in enumerate(node)
+        ]
+
+    return node
+
+
+def _set_path(root: Any, path: Path, value: Any):
+    # Lists and dicts are indexed, dataclasses use attributes
+    node = root
+    for key in path[:-1]:
+        if isinstance(node, (list, dict)):
+            node = node[key]
+        else:
+            node = getattr(node, key)
+    if isinstance(node, (list, dict)):
+        node[path[-1]] = value
+    else:
+        setattr(node, path[-1], value)
@@ -0,0 +1,569 @@
+import pandas as pd  # type: ignore
+import numpy as np
+from typing import Any, List, Optional, Union
+import base64
+import math
+import zlib
+from flare.constraints import BloomFilterSketch
+from flare.partials import FrequentItemsSketch
+from flare.statistics import (
+    HyperLogLogSketch,
+    KLLBucket,
+    KLLDistribution,
+    KLLSketch,
+    KLLSketchParameters,
+)
+
+# Same defaults as SageMaker Model Monitor baselines
+DEFAULT_KLL_K = 2048
+DEFAULT_KLL_C = 0.64
+DEFAULT_KLL_BUCKETS = 10
+
+# 2**14 registers: 16KB, with a standard error of 1.04 / sqrt(2**14) = 0.8%
+DEFAULT_HLL_PRECISION = 14
+MIN_HLL_PRECISION = 4
+MAX_HLL_PRECISION = 18
+
+# Counters of a FrequentItems summary. Counts are at most 0.1% of the
+# values below the true counts.
+DEFAULT_FREQUENT_ITEMS_CAPACITY = 1000
+
+# False positive rate of domain Bloom filters: 9.6 bits per known value
+DEFAULT_BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+_UINT64_MASK = (1 << 64) - 1
+_UINT32_MASK = (1 << 32) - 1
+
+
+class KLL(object):
+    # KLL quantile sketch (Karnin, Lang & Liberty). Items are kept in a
+    # stack of compactors; an item at level h stands for 2**h inputs. When a
+    # level grows past its capacity it is sorted and every other item is
+    # promoted to the next level, so memory stays O(k / (1 - c)) no matter
+    # how many values are added. Sketches with the same parameters can be
+    # merged, e.g. across chunks or partitions of a dataset.
+
+    def __init__(
+        self,
+        k: int = DEFAULT_KLL_K,
+        c: float = DEFAULT_KLL_C,
+        seed: int = 0,
+    ):
+        self.k = k
+        self.c = c
+        self.compactors: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def count(self) -> int:
+        return int(
+            sum(
+                len(items) << level
+                for level, items in enumerate(self.compactors)
+            )
+        )
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * math.pow(self.c, depth))))
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self._compress()
+
+    def merge(self, other: "KLL"):
+        if (self.k, self.c) != (other.k, other.c):
+            raise ValueError("Cannot merge KLL sketches with different k/c")
+        for level, items in enumerate(other.compactors):
+            if level == len(self.compactors):
+                self.compactors.append(np.empty(0))
+            self.compactors[level] = np.concatenate(
+                [self.compactors[level], items]
+            )
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind at the current level
+                n_kept = len(items) % 2
+                start = n_kept + int(self._rng.integers(2))
+                promoted = items[start::2]
+                self.compactors[level] = items[:n_kept]
+                self.compactors[level + 1] = np.concatenate(
+                    [self.compactors[level + 1], promoted]
+                )
+            level += 1
+
+    def _sorted_with_weights(self):
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate(
+            [
+                np.full(len(items), 1 << level, dtype=np.int64)
+                for level, items in enumerate(self.compactors)
+            ]
+        )
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def quantiles(self, qs: np.ndarray) -> np.ndarray:
+        items, cumulative = self._sorted_with_weights()
+        if len(items) == 0:
+            return np.full(np.shape(qs), np.nan)
+        ranks = np.asarray(qs, dtype=np.float64) * cumulative[-1]
+        index = np.searchsorted(cumulative, ranks, side="left")
+        return items[np.minimum(index, len(items) - 1)]
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles(np.array([q]))[0])
+
+    def ranks(self, values: np.ndarray) -> np.ndarray:
+        # Estimated number of inputs <= each value
+        items, cumulative = self._sorted_with_weights()
+        index = np.searchsorted(items, values, side="right")
+        return np.concatenate([[0], cumulative])[index]
+
+    def to_distribution(
+        self, n_buckets: int = DEFAULT_KLL_BUCKETS
+    ) -> KLLDistribution:
+        buckets = []
+        items, _ = self._sorted_with_weights()
+        if len(items) > 0:
+            edges = np.linspace(items[0], items[-1], n_buckets + 1)
+            cumulative = self.ranks(edges)
+            # The first bucket also holds values equal to the minimum
+            cumulative[0] = 0
+            counts = np.diff(cumulative)
+            buckets = [
+                KLLBucket(
+                    lower_bound=float(lower),
+                    upper_bound=float(upper),
+                    count=int(count),
+                )
+                for lower, upper, count in zip(edges, edges[1:], counts)
+            ]
+
+        # Until the first compaction (up to k values) the sketch holds the
+        # raw values, so baselines only carry compacted sketches
+        sketch = self.to_sketch()
+        if len(self.compactors) == 1:
+            sketch.data = [[]]
+        return KLLDistribution(buckets=buckets, sketch=sketch)
+
+    @classmethod
+    def from_distribution(
+        cls, distribution: KLLDistribution, seed: int = 0
+    ) -> Optional["KLL"]:
+        if not any(len(items) > 0 for items in distribution.sketch.data):
+            return None
+        return cls.from_sketch(distribution.sketch, seed)
+
+    def to_sketch(self) -> KLLSketch:
+        return KLLSketch(
+            parameters=KLLSketchParameters(c=self.c, k=self.k),
+            data=[items.tolist() for items in self.compactors],
+        )
+
+    @classmethod
+    def from_sketch(cls, sketch: KLLSketch, seed: int = 0) -> "KLL":
+        parameters = sketch.parameters
+        kll = cls(k=int(parameters.k), c=parameters.c, seed=seed)
+        kll.compactors = [
+            np.asarray(items, dtype=np.float64) for items in sketch.data
+        ] or [np.empty(0)]
+        return kll
+
+
+class HyperLogLog(object):
+    # HyperLogLog distinct count sketch (Flajolet et al.). Each value is
+    # hashed to 64 bits; the first `precision` bits pick a register, which
+    # keeps the longest run of leading zeros seen in the remaining bits.
+    # Memory is 2**precision bytes however many values are added, and
+    # sketches with the same precision merge by taking register maxima.
+    # Counts use Ertl's improved estimator, which needs no bias tables.
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        if not MIN_HLL_PRECISION <= precision <= MAX_HLL_PRECISION:
+            raise ValueError(
+                f"HyperLogLog precision must be between {MIN_HLL_PRECISION}"
+                + f" and {MAX_HLL_PRECISION}, got {precision}"
+            )
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values: np.ndarray):
+        # Hashes are deterministic across processes and platforms, so
+        # sketches of different partitions can be merged.
+        values = np.asarray(values, dtype=object)
+        if len(values) > 0:
+            self.update_hashes(pd.util.hash_array(values, categorize=False))
+
+    def update_hashes(self, hashes: np.ndarray):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        q = 64 - self.precision
+        index = (hashes >> np.uint64(q)).astype(np.intp)
+        rest = hashes & np.uint64((1 << q) - 1)
+        ranks = (q + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, ranks)
+
+    def add_hash(self, value: int):
+        q = 64 - self.precision
+        index = value >> q
+        rank = q + 1 - (value & ((1 << q) - 1)).bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if self.precision != other.precision:
+            raise ValueError(
+                "Cannot merge HyperLogLog sketches with different precision"
+            )
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def clear(self):
+        self.registers[:] = 0
+
+    def count(self) -> float:
+        m = len(self.registers)
+        q = 64 - self.precision
+        histogram = np.bincount(self.registers, minlength=q + 2)
+        z = m * _tau(1 - histogram[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        return m * m / (2 * math.log(2) * z)
+
+    def copy(self) -> "HyperLogLog":
+        sketch = HyperLogLog(self.precision)
+        sketch.registers[:] = self.registers
+        return sketch
+
+    def to_sketch(self) -> HyperLogLogSketch:
+        return HyperLogLogSketch(
+            precision=self.precision,
+            registers=base64.b64encode(
+                zlib.compress(self.registers.tobytes())
+            ).decode("ascii"),
+        )
+
+    @classmethod
+    def from_sketch(cls, sketch: HyperLogLogSketch) -> "HyperLogLog":
+        hll = cls(sketch.precision)
+        registers = np.frombuffer(
+            zlib.decompress(base64.b64decode(sketch.registers)),
+            dtype=np.uint8,
+        )
+        if len(registers) != len(hll.registers):
+            raise ValueError("HyperLogLog registers do not match precision")
+        hll.registers[:] = registers
+        return hll
+
+
+class FrequentItems(object):
+    # Misra-Gries frequent items summary in its mergeable form (Agarwal et
+    # al., "Mergeable Summaries"), equivalent to Space-Saving. At most
+    # `capacity` counters are kept: whenever there are more, the
+    # (capacity + 1)-th largest count is subtracted from all of them and
+    # counters that reach zero are dropped. Counts are therefore lower
+    # bounds, at most `error` <= n / (capacity + 1) below the true counts,
+    # and every value more frequent than that is kept.
+
+    def __init__(self, capacity: int = DEFAULT_FREQUENT_ITEMS_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series([], dtype=np.int64)
+        self.n = 0
+        self.error = 0
+
+    def update_counts(self, value_counts: pd.Series):
+        # Adds exact counts of a chunk, e.g. from Series.value_counts().
+        # The chunk is reduced to `capacity` counters first, so its
+        # distinct values are never grouped with the summary's.
+        self.n += int(value_counts.sum())
+        self._add(self._reduce(value_counts.astype(np.int64)))
+
+    def merge(self, other: "FrequentItems"):
+        if self.capacity != other.capacity:
+            raise ValueError(
+                "Cannot merge FrequentItems summaries with different capacity"
+            )
+        self.n += other.n
+        self.error += other.error
+        self._add(other.counts)
+
+    def top(self, n: Optional[int] = None) -> pd.Series:
+        # Counts in descending order, ties in order of first appearance
+        return self.counts.sort_values(ascending=False, kind="stable")[:n]
+
+    def _add(self, counts: pd.Series):
+        if len(self.counts) == 0:
+            self.counts = counts
+            return
+        self.counts = self._reduce(
+            pd.concat([self.counts, counts])
+            .groupby(level=0, sort=False)
+            .sum()
+            .astype(np.int64)
+        )
+
+    def _reduce(self, counts: pd.Series) -> pd.Series:
+        if len(counts) <= self.capacity:
+            return counts
+        values = counts.to_numpy()
+        k = len(values) - self.capacity - 1
+        cut = np.partition(values, k)[k]
+        self.error += int(cut)
+        return counts[values > cut] - cut
+
+    def to_sketch(self) -> FrequentItemsSketch:
+        return FrequentItemsSketch(
+            capacity=self.capacity,
+            n=self.n,
+            error=self.error,
+            values=self.counts.index.tolist(),
+            counts=self.counts.tolist(),
+        )
+
+    @classmethod
+    def from_sketch(cls, sketch: FrequentItemsSketch) -> "FrequentItems":
+        summary = cls(sketch.capacity)
+        summary.n = sketch.n
+        summary.error = sketch.error
+        summary.counts = pd.Series(
+            np.asarray(sketch.counts, dtype=np.int64),
+            index=pd.Index(list(sketch.values), dtype=object),
+        )
+        return summary
+
+
+class BloomFilter(object):
+    # Bloom filter over 64-bit hashes, for set membership of vocabularies
+    # too large to list. Each value sets n_hashes bits of an array of
+    # n_bits, picked by double hashing (Kirsch & Mitzenmacher): bit i is
+    # (h1 + i * h2) mod n_bits, for the low and high halves of the hash.
+    # Lookups never miss a value that was added, and wrongly report other
+    # values as added with the false positive rate the filter was sized
+    # for. A lookup costs n_hashes bit reads whatever the vocabulary size.
+    # Hashes are pd.util.hash_array's, so filters can be persisted. Values
+    # of other types than str are hashed with their type, so 1 and "1"
+    # are different values, as in domain lists.
+
+    def __init__(self, n_bits: int, n_hashes: int):
+        if n_bits <= 0 or n_hashes <= 0:
+            raise ValueError(
+                "Bloom filter bits and hashes must be positive, got "
+                + f"{n_bits} and {n_hashes}"
+            )
+        self.n_hashes = n_hashes
+        self.false_positive_rate = DEFAULT_BLOOM_FALSE_POSITIVE_RATE
+        self.words = np.zeros(-(-n_bits // 64), dtype=np.uint64)
+
+    @classmethod
+    def for_capacity(
+        cls,
+        n_values: int,
+        false_positive_rate: float = DEFAULT_BLOOM_FALSE_POSITIVE_RATE,
+    ) -> "BloomFilter":
+        # Optimal size and number of hashes for n_values distinct values
+        if not 0 < false_positive_rate < 1:
+            raise ValueError(
+                "Bloom filter false positive rate must be between 0 and 1, "
+                + f"got {false_positive_rate}"
+            )
+        n_values = max(n_values, 1)
+        n_bits = math.ceil(
+            -n_values * math.log(false_positive_rate) / math.log(2) ** 2
+        )
+        bloom = cls(n_bits, max(round(-math.log2(false_positive_rate)), 1))
+        bloom.false_positive_rate = false_positive_rate
+        return bloom
+
+    @property
+    def n_bits(self) -> int:
+        return len(self.words) * 64
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=object)
+        if len(values) > 0:
+            self.update_hashes(_hash_values(values))
+
+    def update_hashes(self, hashes: np.ndarray):
+        # Bits are set in a byte per bit array and packed into the words,
+        # which is much faster than np.bitwise_or.at for many values
+        bits = np.zeros(self.n_bits, dtype=bool)
+        bits[self._positions(hashes).ravel()] = True
+        self.words |= np.packbits(bits, bitorder="little").view("<u8")
+
+    def contains(self, values: np.ndarray) -> np.ndarray:
+        # Per-value membership. Nulls are never members.
+        values = np.asarray(values, dtype=object)
+        result = np.zeros(len(values), dtype=bool)
+        present = ~pd.isna(values)
+        if present.any():
+            result[present] = self.contains_hashes(
+                _hash_values(values[present])
+            )
+        return result
+
+    def contains_hashes(self, hashes: np.ndarray) -> np.ndarray:
+        positions = self._positions(hashes)
+        bits = self.words[positions >> np.uint64(6)] >> (
+            positions & np.uint64(63)
+        )
+        return (bits & np.uint64(1)).astype(bool).all(axis=1)
+
+    def contains_value(self, value: Any) -> bool:
+        # Scalar counterpart of contains(), without intermediate arrays
+        try:
+            if pd.isna(value):
+                return False
+        except (TypeError, ValueError):
+            pass
+        values = np.empty(1, dtype=object)
+        values[0] = value
+        h = int(_hash_values(values)[0])
+        h1 = h & _UINT32_MASK
+        h2 = h >> 32
+        n_bits = self.n_bits
+        for i in range(self.n_hashes):
+            position = (h1 + i * h2) % n_bits
+            if not (int(self.words[position >> 6]) >> (position & 63)) & 1:
+                return False
+        return True
+
+    def merge(self, other: "BloomFilter"):
+        # Union of the added values
+        if self.n_bits != other.n_bits or self.n_hashes != other.n_hashes:
+            raise ValueError(
+                "Cannot merge Bloom filters of different sizes or hashes"
+            )
+        self.words |= other.words
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        # (values, n_hashes) bit positions. The halves are below 2**32, so
+        # h1 + i * h2 cannot overflow 64 bits.
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        h1 = hashes & np.uint64(_UINT32_MASK)
+        h2 = hashes >> np.uint64(32)
+        i = np.arange(self.n_hashes, dtype=np.uint64)
+        return (h1[:, None] + i * h2[:, None]) % np.uint64(self.n_bits)
+
+    def to_sketch(self, binary: bool = False) -> BloomFilterSketch:
+        # Binary baselines store the words as an array to memory-map
+        words: Union[str, List[int]]
+        if binary:
+            words = self.words.view(np.int64).tolist()
+        else:
+            words = base64.b64encode(
+                self.words.astype("<u8").tobytes()
+            ).decode("ascii")
+        return BloomFilterSketch(
+            n_hashes=self.n_hashes,
+            false_positive_rate=self.false_positive_rate,
+            words=words,
+        )
+
+    @classmethod
+    def from_sketch(cls, sketch: BloomFilterSketch) -> "BloomFilter":
+        # Words of a binary baseline are memory-mapped and used in place
+        if isinstance(sketch.words, str):
+            words = np.frombuffer(base64.b64decode(sketch.words), dtype="<i8")
+        else:
+            words = np.asarray(sketch.words, dtype=np.int64)
+        if len(words) == 0:
+            raise ValueError("Bloom filter has no bits")
+        bloom = cls(len(words) * 64, sketch.n_hashes)
+        bloom.false_positive_rate = sketch.false_positive_rate
+        bloom.words = words.view(np.uint64)
+        return bloom
+
+
+def process_hashes(values: np.ndarray) -> np.ndarray:
+    # 64-bit hashes that are only stable within this process, from
+    # Python's hash(). Much cheaper than pd.util.hash_array for a few
+    # values, so suited to sketches of runtime traffic that are never
+    # persisted or merged with a baseline's.
+    hashes = np.fromiter(
+        (hash(value) for value in values), dtype=np.int64, count=len(values)
+    ).view(np.uint64)
+    # splitmix64 finalizer, as hash() of small ints is the int itself
+    hashes = hashes ^ (hashes >> np.uint64(30))
+    hashes = hashes * np.uint64(0xBF58476D1CE4E5B9)
+    hashes = hashes ^ (hashes >> np.uint64(27))
+    hashes = hashes * np.uint64(0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+def process_hash(value: Any) -> int:
+    # Scalar counterpart of process_hashes()
+    h = hash(value) & _UINT64_MASK
+    h ^= h >> 30
+    h = (h * 0xBF58476D1CE4E5B9) & _UINT64_MASK
+    h ^= h >> 27
+    h = (h * 0x94D049BB133111EB) & _UINT64_MASK
+    return h ^ (h >> 31)
+
+
+def _hash_values(values: np.ndarray) -> np.ndarray:
+    # Hashes of non-null values' strings. Those of values that are not
+    # strings are combined with a hash of their type's name.
+    others = np.fromiter(
+        (not isinstance(value, str) for value in values),
+        dtype=bool,
+        count=len(values),
+    )
+    if not others.any():
+        return pd.util.hash_array(values, categorize=False)
+
+    # str() also covers values pandas cannot hash, e.g. lists
+    strings = values.copy()
+    strings[others] = [str(value) for value in values[others]]
+    hashes = pd.util.hash_array(strings, categorize=False)
+    types = np.array(
+        [type(value).__name__ for value in values[others]], dtype=object
+    )
+    hashes[others] ^= pd.util.hash_array(types, categorize=False)
+    return hashes
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    # Exact for uint64: each 32-bit half converts to float64 exactly
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+
+def _sigma(x: float) -> float:
+    if x == 1:
+        return math.inf
+    y = 1.0
+    z = x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0.0
+    y = 1.0
+    z = 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) * (1 - x) * y
+        if z == previous:
+            return z / 3
@@ -18,6 +18,9 @@ class KLLBucket:
 @dataclass
 class KLLSketch:
     parameters: KLLSketchParameters
+    # Items of each compactor level. These are values sampled from the
+    # training data; empty for columns of at most k values, where they
+    # would be every value.
     data: List[List[float]]
 
 
@@ -30,6 +33,9 @@ class CategoryBucket:
 @dataclass
 class CategoricalDistribution:
     buckets: List[CategoryBucket]
+    # Set when buckets only hold the most frequent values: the number of
+    # values outside them. None when buckets hold every value.
+    other_count: Optional[int] = None
 
 
 @dataclass
@@ -68,6 +74,13 @@ class NumericalStatistics:
     distribution: Optional[NumericalDistribution] = None
 
 
+@dataclass
+class HyperLogLogSketch:
+    precision: int
+    # base64 of the zlib-compressed registers, one byte each
+    registers: str
+
+
 @dataclass
 class StringStatistics:
     common: CommonStatistics
@@ -76,6 +89,7 @@ class StringStatistics:
     # TODO: make this non-optional when we
     # decide to tackle string distros
     distribution: Optional[StringDistribution] = None
+    distinct_sketch: Optional[HyperLogLogSketch] = None
 
 
 @dataclass
@@ -1,4 +1,20 @@
+import pandas as pd  # type: ignore
+import numpy as np
 from enum import Enum
+from typing import Any
+import math
+
+# Object columns up to this many rows are scanned in full. Larger columns
+# are checked on a stratified random sample.
+MAX_ROWS_FOR_OBJECT_TYPE_INFERENCE = 100_000
+
+# Sample size for larger columns: if every sampled value is a string, then
+# with this confidence fewer than this fraction of all values are not.
+TYPE_INFERENCE_CONFIDENCE = 0.999
+TYPE_INFERENCE_TOLERANCE = 0.001
+TYPE_INFERENCE_SAMPLE_SIZE = math.ceil(
+    math.log(1 / (1 - TYPE_INFERENCE_CONFIDENCE)) / TYPE_INFERENCE_TOLERANCE
+)
 
 
 class FeatureType(Enum):
@@ -6,3 +22,64 @@ class FeatureType(Enum):
     INTEGRAL = "Integral"
     STRING = "String"
     UNKNOWN = "Unknown"
+
+
+def is_string_series(feature_series: pd.Series) -> bool:
+    # True if every non-null value is a str (and there is at least one)
+    dtype_name = str(feature_series.dtype)
+    if (dtype_name == "string") or (dtype_name[:2] in {"<U", ">U", "=U"}):
+        return True
+    if isinstance(feature_series.dtype, pd.CategoricalDtype):
+        # Values are all categories, so the categories are checked instead
+        return is_string_values(feature_series.cat.categories.to_numpy())
+    if dtype_name != "object":
+        return False
+    return is_string_values(feature_series.to_numpy())
+
+
+def is_string_values(values: np.ndarray) -> bool:
+    # is_string_series() of an object column's values
+    values = values[pd.notna(values)]
+    n_values = len(values)
+    if n_values > MAX_ROWS_FOR_OBJECT_TYPE_INFERENCE:
+        # One random value from each of TYPE_INFERENCE_SAMPLE_SIZE equal
+        # strata, so that runs of other types are not missed by chance.
+        # Seeded so that baselines are reproducible.
+        size = TYPE_INFERENCE_SAMPLE_SIZE
+        offsets = np.random.default_rng(0).random(size)
+        rows = (np.arange(size) + offsets) * n_values / size
+        values = values[rows.astype(np.intp)]
+
+    return pd.api.types.infer_dtype(values, skipna=False) == "string"
+
+
+# Scalar counterparts of the column checks, for single records. A record
+# value is treated as the one-row column pd.DataFrame([record]) would hold.
+
+
+def scalar_to_float(value: Any) -> float:
+    # NaN for nulls and values that are not numeric
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def is_null_scalar(value: Any) -> bool:
+    if value is None:
+        return True
+    return isinstance(value, (float, np.floating)) and math.isnan(value)
+
+
+def matches_feature_type(value: Any, inferred_type: str) -> bool:
+    if inferred_type == FeatureType.FRACTIONAL.value:
+        return isinstance(value, (float, np.floating))
+    if inferred_type == FeatureType.INTEGRAL.value:
+        return isinstance(value, (int, np.integer)) and not isinstance(
+            value, bool
+        )
+    if inferred_type == FeatureType.STRING.value:
+        return isinstance(value, str)
+    return True
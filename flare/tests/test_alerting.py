@@ -0,0 +1,200 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dataclasses import asdict
+from typing import Any, Dict, List, cast
+from flare.alerting import (
+    Alert,
+    AlertAggregator,
+    AlertTarget,
+    AlertWebhookTarget,
+    BackgroundAlertDispatcher,
+    CustomAlertTarget,
+    DropPolicy,
+    FeatureAlert,
+)
+
+
+class RecordingTarget(AlertTarget):
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.alerts: List[Alert] = []
+        self.attempts = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def send_alert(self, alert: Alert) -> bool:
+        self.release.wait()
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            return False
+        self.alerts.append(alert)
+        return True
+
+
+def make_alert(name: str) -> Alert:
+    return Alert("test-model", [FeatureAlert(name=name, kind="Bound")], None)
+
+
+def test_dispatcher_retries_failed_alerts():
+    target = RecordingTarget(failures=2)
+    dispatcher = BackgroundAlertDispatcher(
+        target, max_retries=2, backoff_seconds=0
+    )
+
+    assert dispatcher.send_alert(make_alert("a"))
+    assert dispatcher.flush(timeout=5)
+    dispatcher.shutdown()
+
+    assert target.attempts == 3
+    assert target.alerts == [make_alert("a")]
+    counters = dispatcher.counters
+    assert (counters.queued, counters.sent, counters.failed) == (1, 1, 0)
+
+
+def test_dispatcher_drop_oldest_when_full():
+    target = RecordingTarget()
+    target.release.clear()
+    dispatcher = BackgroundAlertDispatcher(
+        target, max_queue_size=1, drop_policy=DropPolicy.DROP_OLDEST
+    )
+
+    # The first alert is picked up by the (blocked) worker, the second
+    # waits in the queue and is displaced by the third.
+    dispatcher.send_alert(make_alert("a"))
+    assert dispatcher.flush(timeout=0.1) is False
+    dispatcher.send_alert(make_alert("b"))
+    dispatcher.send_alert(make_alert("c"))
+
+    target.release.set()
+    dispatcher.shutdown()
+
+    assert [alert.features[0].name for alert in target.alerts] == ["a", "c"]
+    assert dispatcher.counters.dropped == 1
+    assert dispatcher.counters.sent == 2
+
+
+def test_aggregator_emits_digest():
+    target = RecordingTarget()
+    aggregator = AlertAggregator(target, window_seconds=3600)
+
+    for _ in range(100):
+        aggregator.send_alert(make_alert("a"))
+    aggregator.send_alert(make_alert("b"))
+    assert target.alerts == []
+
+    aggregator.flush()
+    assert len(target.alerts) == 1
+    digest = target.alerts[0]
+    assert digest.features == [
+        FeatureAlert(name="a", kind="Bound", count=100),
+        FeatureAlert(name="b", kind="Bound", count=1),
+    ]
+    assert digest.metadata["alert_count"] == 101
+
+
+def test_aggregator_rate_limit():
+    target = RecordingTarget()
+    aggregator = AlertAggregator(
+        target, window_seconds=0.01, max_digests_per_minute=1
+    )
+
+    aggregator.send_alert(make_alert("a"))
+    aggregator.send_alert(Alert("other-model", [], None))
+    time.sleep(0.1)
+
+    # Only one digest fits in the rate limit, the other model stays pending
+    assert [alert.model_name for alert in target.alerts] == ["test-model"]
+    aggregator.flush()
+    assert [alert.model_name for alert in target.alerts] == [
+        "test-model",
+        "other-model",
+    ]
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = cast(Any, self.server)
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server.clients.append(self.client_address)
+        time.sleep(server.delay)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_webhook(delay: float = 0.0) -> Any:
+    server: Any = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+    server.daemon_threads = True
+    server.clients = []
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_webhook_target_reuses_connections():
+    server = serve_webhook()
+    url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+    target = CustomAlertTarget(url)
+    try:
+        assert all(target.send_alert(make_alert("a")) for _ in range(3))
+        # One keep-alive connection, so one client port
+        assert len(server.clients) == 3
+        assert len(set(server.clients)) == 1
+
+        target.close()
+        assert target.send_alert(make_alert("a"))
+        assert len(set(server.clients)) == 2
+
+        # Targets share neither sessions nor their locks
+        other = CustomAlertTarget(url)
+        assert other.session is not target.session
+        assert other._session_lock is not target._session_lock
+        other.close()
+    finally:
+        target.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_webhook_target_without_super_init():
+    # Subclasses written before targets held sessions skip super().__init__()
+    class LegacyTarget(AlertWebhookTarget):
+        def __init__(self, url: str):
+            self.url = url
+
+        def _alert_webhook_url(self) -> str:
+            return self.url
+
+        def _format_alert(self, alert: Alert) -> Dict[str, str]:
+            return asdict(alert)
+
+    server = serve_webhook()
+    target = LegacyTarget(f"http://127.0.0.1:{server.server_address[1]}/hook")
+    try:
+        assert target.send_alert(make_alert("a"))
+        assert target.send_alert(make_alert("a"))
+        assert len(set(server.clients)) == 1
+    finally:
+        target.close()
+        server.shutdown()
+        server.server_close()
+
+
+def test_webhook_target_read_timeout():
+    server = serve_webhook(delay=1.0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/hook"
+    target = CustomAlertTarget(url, read_timeout=0.1)
+    try:
+        start = time.monotonic()
+        assert not target.send_alert(make_alert("a"))
+        assert time.monotonic() - start < 0.9
+    finally:
+        target.close()
+        server.shutdown()
+        server.server_close()
@@ -92,3 +92,171 @@ def fetch_constrain_feature(
     )
 
     return feature
+
+
+def test_numerical_distribution():
+    from flare.generators import gen_statistics
+
+    test_df = generate_example_dataframe()
+    statistics = gen_statistics(test_df)
+    feature = next(f for f in statistics.features if f.name == "float_1")
+    kll = feature.numerical_statistics.distribution.kll
+
+    assert len(kll.buckets) == 10
+    assert sum(bucket.count for bucket in kll.buckets) == len(test_df)
+    assert kll.buckets[0].lower_bound == test_df["float_1"].min()
+    assert kll.buckets[-1].upper_bound == test_df["float_1"].max()
+
+    # Below k values the sketch would hold every training value
+    assert len(test_df) <= kll.sketch.parameters.k
+    assert kll.sketch.data == [[]]
+
+
+def test_chunked_baseline_matches_in_memory():
+    import numpy as np
+    from flare.generators import gen_statistics
+    from flare.profiling import profile_chunks
+
+    test_df = generate_example_dataframe()
+    chunks = (
+        chunk for _, chunk in test_df.groupby(np.arange(len(test_df)) // 300)
+    )
+    profile = profile_chunks(chunks)
+
+    expected_statistics = gen_statistics(test_df)
+    statistics = profile.to_statistics()
+    assert statistics.dataset == expected_statistics.dataset
+    for feature, expected in zip(
+        statistics.features, expected_statistics.features
+    ):
+        assert feature.name == expected.name
+        assert feature.inferred_type == expected.inferred_type
+        if expected.numerical_statistics is not None:
+            actual = feature.numerical_statistics
+            wanted = expected.numerical_statistics
+            assert actual.common == wanted.common
+            assert np.isclose(actual.mean, wanted.mean)
+            assert np.isclose(actual.std_dev, wanted.std_dev)
+            assert (actual.min, actual.max) == (wanted.min, wanted.max)
+        if expected.string_statistics is not None:
+            actual_string = feature.string_statistics
+            assert actual_string.common == expected.string_statistics.common
+            assert (
+                actual_string.distinct_count
+                == expected.string_statistics.distinct_count
+            )
+
+    expected_constraints = gen_constraints(test_df)
+    constraints = profile.to_constraints()
+    for feature, expected in zip(
+        constraints.features, expected_constraints.features
+    ):
+        assert feature.inferred_type == expected.inferred_type
+        assert np.isclose(feature.completeness, expected.completeness)
+        assert feature.num_constraints == expected.num_constraints
+        if expected.string_constraints is not None:
+            assert set(feature.string_constraints.domains) == set(
+                expected.string_constraints.domains
+            )
+
+
+def test_chunked_csv_with_all_null_string_chunk():
+    import io
+    import pandas as pd  # type: ignore
+    from flare.profiling import profile_chunks
+
+    df = pd.DataFrame(
+        {
+            "label": ["a", "b", "a", None, None, None, "b", "a"],
+            "value": [1.5, 2.0, 0.5, 1.0, 3.0, 2.5, 0.0, 1.0],
+        }
+    )
+    buffer = io.StringIO(df.to_csv(index=False))
+    # The middle chunk reads back the all-missing labels as float64
+    chunks = list(pd.read_csv(buffer, chunksize=3))
+    assert str(chunks[1]["label"].dtype) == "float64"
+
+    constraints = profile_chunks(chunks).to_constraints()
+    expected = gen_constraints(df)
+    assert constraints.features[0].inferred_type == "String"
+    assert constraints.features == expected.features
+
+
+def test_empty_frame_has_nan_completeness():
+    import numpy as np
+    import pandas as pd  # type: ignore
+
+    constraints = gen_constraints(
+        pd.DataFrame({"a": pd.Series([], dtype=float)})
+    )
+    assert np.isnan(constraints.features[0].completeness)
+
+
+def test_integral_statistics_are_ints():
+    import json
+    from dataclasses import asdict
+    from flare.generators import gen_statistics, NumpyEncoder
+
+    test_df = generate_example_dataframe()
+    document = json.loads(
+        json.dumps(asdict(gen_statistics(test_df)), cls=NumpyEncoder)
+    )
+    feature = next(f for f in document["features"] if f["name"] == "int_1")
+    statistics = feature["numerical_statistics"]
+    assert feature["inferred_type"] == FeatureType.INTEGRAL.value
+    assert statistics["sum"] == int(test_df["int_1"].sum())
+    assert statistics["min"] == int(test_df["int_1"].min())
+    assert statistics["max"] == int(test_df["int_1"].max())
+    for name in ["sum", "min", "max"]:
+        assert isinstance(statistics[name], int)
+
+
+def test_parallel_baseline_is_identical():
+    import json
+    from dataclasses import asdict
+    from flare.generators import gen_statistics, NumpyEncoder
+
+    test_df = generate_example_dataframe()
+
+    def dump(document) -> str:
+        return json.dumps(asdict(document), cls=NumpyEncoder)
+
+    assert dump(gen_statistics(test_df, n_jobs=2)) == dump(
+        gen_statistics(test_df)
+    )
+    assert dump(gen_constraints(test_df, n_jobs=2)) == dump(
+        gen_constraints(test_df)
+    )
+
+
+def test_large_object_column_type_inference():
+    import numpy as np
+    import pandas as pd  # type: ignore
+    from flare.types import (
+        MAX_ROWS_FOR_OBJECT_TYPE_INFERENCE,
+        is_string_series,
+    )
+
+    n_rows = MAX_ROWS_FOR_OBJECT_TYPE_INFERENCE * 3
+    strings = pd.Series(
+        np.random.choice(EXAMPLE_DF_STRING_DOMAINS, size=n_rows), dtype=object
+    )
+    strings[::7] = None
+    assert is_string_series(strings)
+
+    # A run of integers in the middle of the column is found by the
+    # stratified sample
+    mixed = strings.copy()
+    start, stop = n_rows // 2, n_rows // 2 + n_rows // 100
+    mixed[start:stop] = 1
+    assert not is_string_series(mixed)
+
+    # Categorical columns are strings if their categories are
+    assert is_string_series(strings.astype("category"))
+    assert not is_string_series(pd.Series([1, 2]).astype("category"))
+
+    constraints = gen_constraints(pd.DataFrame({"s": strings, "m": mixed}))
+    assert [f.inferred_type for f in constraints.features] == [
+        FeatureType.STRING.value,
+        FeatureType.UNKNOWN.value,
+    ]
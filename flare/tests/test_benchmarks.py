@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+from flare.benchmarks import baseline, runtime
+from flare.examples import generate_example_dataframe
+
+
+def test_generate_example_dataframe_shapes():
+    df = generate_example_dataframe(
+        n_rows=50, n_cols_per_type={"float": 3, "str": 1}, seed=0
+    )
+    assert list(df.columns) == ["float_0", "float_1", "float_2", "str_0"]
+    assert len(df) == 50
+    assert df["float_0"].isna().sum() == 10
+    assert df.equals(
+        generate_example_dataframe(
+            n_rows=50, n_cols_per_type={"float": 3, "str": 1}, seed=0
+        )
+    )
+
+
+def test_runtime_benchmark_report():
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "runtime.json")
+        runtime.main(
+            [
+                "--batch-rows",
+                "100",
+                "--iterations",
+                "5",
+                "--batch-iterations",
+                "2",
+                "--baselines",
+                "both",
+                "none",
+                "--output",
+                output,
+            ]
+        )
+        with open(output) as f:
+            report = json.load(f)
+
+    names = [result["name"] for result in report["results"]]
+    assert names == [
+        "row/both",
+        "record/both",
+        "batch/both",
+        "row/none",
+        "record/none",
+        "batch/none",
+    ]
+    for result in report["results"]:
+        assert 0 < result["p50_us"] <= result["p99_us"]
+    assert report["results"][2]["rows"] == 100
+    assert report["parameters"]["cols_per_type"] == 2
+
+
+def test_runtime_benchmark_columns_by_type():
+    report = runtime.run(
+        batch_rows=100,
+        cols_per_type={"float": 3, "id": 1},
+        iterations=2,
+        batch_iterations=1,
+        baselines=["both"],
+        inputs=["batch"],
+    )
+    assert report["parameters"]["cols_per_type"] == {"float": 3, "id": 1}
+    assert report["results"][0]["columns"] == 4
+    assert runtime._cols_per_type("float=50,str=2") == {
+        "float": 50,
+        "str": 2,
+    }
+    assert runtime._cols_per_type("3") == 3
+
+
+def test_baseline_benchmark_case_in_subprocess():
+    assert baseline.columns_per_type("high_cardinality", 10) == {
+        "id": 6,
+        "str": 2,
+        "float": 2,
+    }
+    report = baseline.run(
+        rows=[200, 20000],
+        columns=[10],
+        mixes=["high_cardinality"],
+        functions=["gen_statistics"],
+        max_cells=10000,
+    )
+    assert len(report["results"]) == 1
+    result = report["results"][0]
+    assert result["name"] == "gen_statistics/high_cardinality/200x10"
+    assert result["rows_per_second"] > 0
+    assert result["input_bytes_per_row"] > 0
+    assert result["peak_rss_bytes"] > 0
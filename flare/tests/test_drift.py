@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd  # type: ignore
+from flare.alerting import FeatureAlert
+from flare.drift import DriftMonitor
+from flare.generators import gen_constraints, gen_statistics
+
+
+def make_frame(rng, n: int, shift: float = 0.0, weights=None) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "value": rng.normal(loc=shift, size=n),
+            "category": rng.choice(["a", "b", "c"], size=n, p=weights),
+        }
+    )
+
+
+def test_drift_detected_at_window_end():
+    rng = np.random.default_rng(4)
+    train = make_frame(rng, 10_000)
+    statistics, constraints = gen_statistics(train), gen_constraints(train)
+    # Opt-in
+    assert DriftMonitor(statistics, constraints, window_rows=500).windows == []
+    monitor = DriftMonitor(
+        statistics, constraints, window_rows=500, detect_drift=True
+    )
+
+    # Same distribution, split over several calls
+    for _ in range(4):
+        assert monitor.update(make_frame(rng, 100)) == []
+    assert monitor.update(make_frame(rng, 100)) == []
+
+    # Shifted numeric and categorical distributions
+    for _ in range(4):
+        shifted = make_frame(rng, 100, shift=1.0, weights=[0.8, 0.1, 0.1])
+        assert monitor.update(shifted) == []
+    assert monitor.update(shifted) == [
+        FeatureAlert(name="value", kind="Drift"),
+        FeatureAlert(name="category", kind="Drift"),
+    ]
+    assert monitor.rows_in_window == 0
+
+
+def test_cardinality_alert_on_unseen_values():
+    rng = np.random.default_rng(5)
+    merchants = [f"merchant-{i}" for i in range(100)]
+    train = pd.DataFrame({"merchant": rng.choice(merchants, size=10_000)})
+    monitor = DriftMonitor(
+        gen_statistics(train),
+        gen_constraints(train),
+        window_rows=1000,
+        detect_drift=True,
+    )
+
+    # Windows of baseline values, as a batch and as records
+    assert monitor.update(train.iloc[:1000]) == []
+    for record in train.iloc[:1000].to_dict("records"):
+        assert monitor.update_record(record) == []
+
+    # Upstream started appending request IDs
+    suffixed = train.iloc[:1000].copy()
+    suffixed["merchant"] += [f"/{i}" for i in range(1000)]
+    # The merchants are heavy hitters too, now all missing from traffic
+    assert monitor.update(suffixed) == [
+        FeatureAlert(name="merchant", kind="Drift"),
+        FeatureAlert(name="merchant", kind="Categorical"),
+        FeatureAlert(name="merchant", kind="Cardinality"),
+    ]
+
+
+def test_heavy_hitters_share_of_other_values():
+    rng = np.random.default_rng(6)
+
+    def make_skus(n: int, tail_share: float) -> pd.DataFrame:
+        skus = rng.choice([f"sku-{i}" for i in range(30)], size=n)
+        tail = rng.random(n) < tail_share
+        skus[tail] = [f"rare-{i}" for i in rng.integers(0, 10**6, tail.sum())]
+        return pd.DataFrame({"sku": skus})
+
+    train = make_skus(20_000, tail_share=0.02)
+    statistics = gen_statistics(train)
+    categorical = statistics.features[0].string_statistics.distribution
+    assert categorical is not None
+    heavy_hitters = categorical.categorical
+    # The fewest SKUs that cover 95% of rows, and none of the tail
+    assert 25 < len(heavy_hitters.buckets) <= 30
+    assert all(b.value.startswith("sku-") for b in heavy_hitters.buckets)
+    assert heavy_hitters.other_count == 20_000 - sum(
+        b.count for b in heavy_hitters.buckets
+    )
+    # Too many distinct values for a domain
+    assert gen_constraints(train).features[0].string_constraints is None
+
+    monitor = DriftMonitor(statistics, gen_constraints(train), 1000)
+    assert monitor.update(make_skus(1000, tail_share=0.03)) == []
+    assert FeatureAlert(name="sku", kind="Categorical") in monitor.update(
+        make_skus(1000, tail_share=0.3)
+    )
+
+    # Checked whether or not drift is compared
+    constraints = gen_constraints(train)
+    distribution = constraints.monitoring_config.distribution_constraints
+    distribution.perform_comparison = "Disabled"
+    monitor = DriftMonitor(statistics, constraints, 1000)
+    assert monitor.update(make_skus(1000, tail_share=0.03)) == []
+    assert monitor.update(make_skus(1000, tail_share=0.3)) == [
+        FeatureAlert(name="sku", kind="Categorical")
+    ]
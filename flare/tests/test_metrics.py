@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import json
+import os
+import socket
+import tempfile
+from dataclasses import asdict
+from typing import Any, List
+from flare.alerting import Alert, AlertTarget
+from flare.constraints import Constraints
+from flare.generators import NumpyEncoder, gen_constraints, gen_statistics
+from flare.metrics import (
+    CHECK_SECONDS,
+    PrometheusExporter,
+    StatsDExporter,
+    metrics,
+)
+from flare.registry import BaselineRegistry
+from flare.runtime import FlareValidator
+
+
+class FailingTarget(AlertTarget):
+    def send_alert(self, alert: Alert) -> bool:
+        return False
+
+
+def write_baselines(directory: str, emit_metrics: str = "Enabled"):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "value": rng.normal(size=1000),
+            "color": rng.choice(["red", "blue"], size=1000),
+        }
+    )
+    constraints: Constraints = gen_constraints(df)
+    constraints.monitoring_config.emit_metrics = emit_metrics
+    documents: List[Any] = [
+        ("statistics", gen_statistics(df)),
+        ("constraints", constraints),
+    ]
+    paths = []
+    for name, document in documents:
+        path = os.path.join(directory, name + ".json")
+        with open(path, "w") as f:
+            json.dump(asdict(document), f, cls=NumpyEncoder)
+        paths.append(path)
+    return paths
+
+
+def test_prometheus_exporter_records_check_families():
+    exporter = PrometheusExporter()
+    metrics.add_exporter(exporter)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            statistics_path, constraints_path = write_baselines(directory)
+            validator = FlareValidator(
+                "model",
+                FailingTarget(),
+                statistics_path=statistics_path,
+                constraints_path=constraints_path,
+            )
+            x = pd.DataFrame({"value": [50.0, 0.0], "color": ["red", "x"]})
+            validator.validate(x)
+            validator.validate({"value": 0.0, "color": "red"})
+    finally:
+        metrics.remove_exporter(exporter)
+
+    text = exporter.render()
+    assert 'flare_baseline_load_seconds_count{document="statistics"} 1' in text
+    for family in ["negative", "categorical", "type", "outlier", "record"]:
+        assert f'{CHECK_SECONDS}_count{{family="{family}"}}' in text
+    assert 'flare_checks_total{model="model"} 2' in text
+    assert 'flare_feature_alerts_total{model="model",kind="Outlier"} 1' in text
+    assert 'flare_dispatch_failures_total{model="model"} 1' in text
+    assert 'flare_validation_seconds_bucket{model="model",le="+Inf"} 2' in text
+
+
+def test_statsd_exporter_and_disabled_emit_metrics():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(5)
+    exporter = StatsDExporter(
+        port=receiver.getsockname()[1],
+        prefix="svc.",
+        flush_interval_seconds=60,
+    )
+    metrics.add_exporter(exporter)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            statistics_path, constraints_path = write_baselines(
+                directory, emit_metrics="Disabled"
+            )
+            validator = FlareValidator(
+                "model",
+                FailingTarget(),
+                statistics_path=statistics_path,
+                constraints_path=constraints_path,
+            )
+            validator.validate(pd.DataFrame({"value": [0.0], "color": ["x"]}))
+            registry = BaselineRegistry(
+                manifest={
+                    "other": {
+                        "statistics": statistics_path,
+                        "constraints": constraints_path,
+                    }
+                }
+            )
+            FlareValidator(
+                "other", FailingTarget(), registry=registry
+            ).validate({"value": 0.0, "color": "x"})
+            metrics.increment("marker", 1, (("model", "model"),))
+            metrics.flush()
+            packet = receiver.recv(65536).decode("utf-8")
+    finally:
+        metrics.remove_exporter(exporter)
+        receiver.close()
+
+    # A model with emit_metrics disabled records no loads, checks or
+    # dispatches
+    assert packet.split("\n") == ["svc.marker:1|c|#model:model"]
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import json
+import os
+import pytest
+from dacite import from_dict
+from typing import Any, List
+from flare import generators
+from flare.constraints import Constraints
+from flare.generators import baseline, merge_partials, partial_baseline
+from flare.sketches import KLL
+from flare.statistics import Statistics
+
+
+def generate_dataframe() -> pd.DataFrame:
+    rng = np.random.default_rng(9)
+    n = 40_000
+    value = rng.normal(size=n)
+    value[rng.random(size=n) < 0.05] = np.nan
+    return pd.DataFrame(
+        {
+            "value": value,
+            "count": rng.integers(0, 100, size=n),
+            "label": rng.choice(
+                np.array(["a", "b", "c", None], dtype=object), size=n
+            ),
+            "sku": [f"sku-{i}" for i in rng.zipf(1.5, size=n) % 5000],
+        }
+    )
+
+
+def load_baseline(extension: str = ".json"):
+    documents: List[Any] = []
+    for name, data_class in [
+        ("statistics", Statistics),
+        ("constraints", Constraints),
+    ]:
+        with open(name + extension, "r") as f:
+            documents.append(
+                from_dict(data_class=data_class, data=json.load(f))
+            )
+    return documents
+
+
+@pytest.fixture
+def working_directory(tmp_path, monkeypatch):
+    # Baselines are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(generators.analytics, "analytics_enabled", False)
+    return tmp_path
+
+
+def assert_statistics_close(actual: Statistics, expected: Statistics):
+    # Exact up to float rounding, except the KLL sketches, whose quantiles
+    # ranks agree within the sketches' error
+    assert actual.dataset == expected.dataset
+    for feature, reference in zip(actual.features, expected.features):
+        assert feature.name == reference.name
+        assert feature.inferred_type == reference.inferred_type
+        assert feature.string_statistics == reference.string_statistics
+        numerical = feature.numerical_statistics
+        reference_numerical = reference.numerical_statistics
+        if reference_numerical is None:
+            assert numerical is None
+            continue
+
+        assert numerical is not None
+        assert numerical.common == reference_numerical.common
+        assert numerical.min == reference_numerical.min
+        assert numerical.max == reference_numerical.max
+        for name in ["mean", "sum", "std_dev"]:
+            assert np.isclose(
+                getattr(numerical, name), getattr(reference_numerical, name)
+            )
+        assert numerical.distribution is not None
+        assert reference_numerical.distribution is not None
+        sketch = KLL.from_distribution(numerical.distribution.kll)
+        reference_sketch = KLL.from_distribution(
+            reference_numerical.distribution.kll
+        )
+        assert sketch is not None and reference_sketch is not None
+        assert sketch.count == reference_sketch.count
+        values = reference_sketch.quantiles(np.linspace(0, 1, 101))
+        assert (
+            np.abs(sketch.ranks(values) - reference_sketch.ranks(values))
+            / sketch.count
+            < 0.01
+        ).all()
+
+
+def test_merged_partials_match_single_node_baseline(working_directory):
+    df = generate_dataframe()
+    baseline(df)
+    expected_statistics, expected_constraints = load_baseline()
+
+    # Partials of either format merge together
+    paths = []
+    for i, partition in enumerate(np.array_split(df, 4)):
+        path = f"partial-{i}" + (".flare" if i % 2 else ".json")
+        partial_baseline(partition, path, binary=bool(i % 2))
+        paths.append(path)
+
+    merge_partials(paths)
+    statistics, constraints = load_baseline()
+    assert constraints == expected_constraints
+    assert_statistics_close(statistics, expected_statistics)
+
+    # An existing baseline is updated with new data through its partial
+    merge_partials(paths[:2], partial_path="merged.flare", binary=True)
+    merge_partials(["merged.flare", *paths[2:]], partial_path="merged.flare")
+    statistics, constraints = load_baseline()
+    assert constraints == expected_constraints
+    assert_statistics_close(statistics, expected_statistics)
+    assert os.path.exists("merged.flare")
+
+
+def test_approximate_partials_merge_sketches(working_directory):
+    df = generate_dataframe()
+    baseline(df, approximate_distinct=True, hll_precision=12)
+    expected_statistics, _ = load_baseline()
+
+    paths = []
+    for i, partition in enumerate(np.array_split(df, 3)):
+        paths.append(f"partial-{i}.flare")
+        partial_baseline(
+            partition,
+            paths[-1],
+            binary=True,
+            approximate_distinct=True,
+            hll_precision=12,
+        )
+    merge_partials(paths)
+    statistics, _ = load_baseline()
+
+    # HyperLogLog sketches merge losslessly
+    sku, expected_sku = statistics.features[3], expected_statistics.features[3]
+    assert sku.string_statistics is not None
+    assert expected_sku.string_statistics is not None
+    assert (
+        sku.string_statistics.distinct_sketch
+        == expected_sku.string_statistics.distinct_sketch
+    )
+    assert sku.string_statistics.distinct_count == (
+        expected_sku.string_statistics.distinct_count
+    )
+    # Frequent values agree. Rarer ones can differ, as merged counts are
+    # lower bounds.
+    distribution = sku.string_statistics.distribution
+    expected_distribution = expected_sku.string_statistics.distribution
+    assert distribution is not None and expected_distribution is not None
+    buckets = distribution.categorical.buckets
+    expected_buckets = expected_distribution.categorical.buckets
+    assert [b.value for b in buckets[:50]] == [
+        b.value for b in expected_buckets[:50]
+    ]
+    assert abs(len(buckets) - len(expected_buckets)) < 10
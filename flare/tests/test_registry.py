@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import json
+import os
+import tempfile
+from typing import Any, List
+from dataclasses import asdict
+from flare.alerting import Alert, AlertTarget, FeatureAlert
+from flare.generators import NumpyEncoder, gen_constraints, gen_statistics
+from flare.registry import BaselineRegistry
+from flare.runtime import FlareValidator
+from flare.serialization import write_binary
+
+
+class RecordingTarget(AlertTarget):
+    def __init__(self):
+        self.alerts = []
+
+    def send_alert(self, alert: Alert) -> bool:
+        self.alerts.append(alert)
+        return True
+
+
+def write_model(root: str, model_name: str, scale: float, binary=False):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"value": rng.normal(scale=scale, size=1000)})
+    directory = os.path.join(root, model_name)
+    os.makedirs(directory)
+    documents: List[Any] = [
+        ("statistics", gen_statistics(df)),
+        ("constraints", gen_constraints(df)),
+    ]
+    for name, document in documents:
+        if binary:
+            write_binary(os.path.join(directory, name + ".flare"), document)
+        else:
+            with open(os.path.join(directory, name + ".json"), "w") as f:
+                json.dump(asdict(document), f, cls=NumpyEncoder)
+
+
+def test_registry_loads_models_by_name_and_evicts_lru():
+    with tempfile.TemporaryDirectory() as root:
+        write_model(root, "small", 1.0)
+        write_model(root, "large", 100.0)
+        write_model(root, "binary", 1.0, binary=True)
+
+        registry = BaselineRegistry(root=root, preload=["small"])
+        assert registry.info("small").loads == 1
+        size = registry.info("small").size_bytes
+        assert size > 0
+
+        # Room for two JSON models, or one and the (smaller) binary one
+        registry.max_bytes = size * 2
+        target = RecordingTarget()
+        small = FlareValidator("small", target, registry=registry)
+        large = FlareValidator("large", target, registry=registry)
+        x = pd.DataFrame({"value": [50.0]})
+
+        assert small.validate(x) == [
+            FeatureAlert(name="value", kind="Outlier"),
+            FeatureAlert(name="value", kind="Bound"),
+        ]
+        assert large.validate(x) == []
+        assert registry.get_plan("binary").statistics is not None
+        assert list(registry.loaded()) == ["large", "binary"]
+
+        small.validate(x)
+        info = registry.info("small")
+        assert (info.hits, info.misses, info.loads) == (1, 2, 2)
+        assert info.evictions == 1
+        assert info.last_load_seconds > 0
+        assert registry.total_bytes <= registry.max_bytes
+
+
+def test_registry_manifest():
+    with tempfile.TemporaryDirectory() as root:
+        write_model(root, "model-a", 1.0)
+        manifest = os.path.join(root, "manifest.json")
+        with open(manifest, "w") as f:
+            json.dump(
+                {
+                    "renamed": {
+                        "statistics": "model-a/statistics.json",
+                        "constraints": "model-a/constraints.json",
+                    }
+                },
+                f,
+            )
+
+        registry = BaselineRegistry(manifest=manifest)
+        plan = registry.get_plan("renamed")
+        assert plan.statistics is not None
+        assert plan.constraints is not None
+
+
+def test_registry_drops_plans_invalidated_while_loading():
+    with tempfile.TemporaryDirectory() as root:
+        write_model(root, "model", 1.0)
+        registry = BaselineRegistry(root=root)
+        load = registry._load
+
+        def load_then_invalidate(model_name: str):
+            # The baseline files are replaced while they are being read
+            plan = load(model_name)
+            registry.invalidate(model_name)
+            return plan
+
+        setattr(registry, "_load", load_then_invalidate)
+        stale = registry.get_plan("model")
+        assert stale.statistics is not None
+        assert list(registry.loaded()) == []
+        assert registry.total_bytes == 0
+
+        setattr(registry, "_load", load)
+        assert registry.get_plan("model") is not stale
+        assert list(registry.loaded()) == ["model"]
+        assert registry.info("model").loads == 2
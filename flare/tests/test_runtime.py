@@ -117,3 +117,381 @@ def test_bound(statistics):
         FeatureAlert(name="float", kind="Bound"),
         FeatureAlert(name="int", kind="Bound"),
     ]
+
+
+def test_baseline_cache(statistics):
+    from flare.cache import BaselineCache
+
+    cache = BaselineCache()
+    first = cache.get_plan(statistics, "missing-constraints.json")
+    second = cache.get_plan(statistics, "missing-constraints.json")
+    assert first is second
+    assert first.statistics is not None
+    assert first.constraints is None
+    assert cache.cache_info().hits == 1
+    assert cache.cache_info().misses == 1
+
+    # Rewriting the file changes its signature and forces a reload
+    stats = generate_statistics()
+    stats.dataset.item_count = 2
+    with open(statistics, "w") as f:
+        json.dump(asdict(stats), f)
+    os.utime(statistics, ns=(0, 0))
+
+    third = cache.get_plan(statistics, "missing-constraints.json")
+    assert third is not first
+    assert third.statistics.dataset.item_count == 2
+    assert cache.cache_info().misses == 2
+
+
+def test_check_engine_alert_order():
+    from flare.engine import CheckEngine
+    from flare.examples import generate_example_dataframe
+    from flare.generators import gen_constraints, gen_statistics
+
+    df = generate_example_dataframe()
+    engine = CheckEngine(gen_statistics(df), gen_constraints(df))
+
+    x = df.head(3).copy()
+    x["str_0"] = "eeny"
+    x["positive_int_0"] = [1, -1, 2]
+    x["int_1"] = [0, 1_000_000, 0]
+    x["float_1"] = [0.5, None, 0.5]
+    x["str_1"] = ["eeny", "meeny", "unknown"]
+
+    assert engine.check(x) == [
+        FeatureAlert(name="positive_int_0", kind="Negative"),
+        FeatureAlert(name="str_1", kind="Categorical"),
+        FeatureAlert(name="int_1", kind="Outlier"),
+        FeatureAlert(name="int_1", kind="Bound"),
+        FeatureAlert(name="positive_int_0", kind="Bound"),
+        FeatureAlert(name="float_1", kind="Null"),
+    ]
+
+
+def test_sampling_skips_checks_but_captures_exceptions(statistics):
+    from flare.alerting import Alert, AlertTarget
+    from flare.sampling import SamplingPolicy
+
+    class RecordingTarget(AlertTarget):
+        def __init__(self):
+            self.alerts = []
+
+        def send_alert(self, alert: Alert) -> bool:
+            self.alerts.append(alert)
+            return True
+
+    os.environ[FLARE_STATISTICS_PATH_VAR] = statistics
+    x = pd.DataFrame([[-1.0, 4, "3"]], columns=["float", "int", "string"])
+    target = RecordingTarget()
+    never = SamplingPolicy(call_rate=0.0)
+
+    with Flare("test-model", x, target, sampling=never):
+        pass
+    assert target.alerts == []
+
+    with pytest.raises(ValueError):
+        with Flare("test-model", x, target, sampling=never):
+            raise ValueError("boom")
+    assert len(target.alerts) == 1
+    assert target.alerts[0].features == []
+    assert target.alerts[0].exception is not None
+    assert target.alerts[0].metadata["sampling"]["rows_checked"] == 0
+
+    rows = pd.concat([x] * 10, ignore_index=True)
+    half = SamplingPolicy(row_rate=0.5, min_rows_for_row_sampling=10)
+    session = Flare("test-model", rows, target, sampling=half)
+    assert len(session.feature_alerts) == 2
+    assert session.metadata["sampling"]["rows_checked"] == 5
+    assert session.metadata["sampling"]["row_rate"] == 0.5
+
+
+def test_robust_outlier_detection():
+    from flare.engine import CheckEngine
+    from flare.generators import gen_constraints, gen_statistics
+    import numpy as np
+
+    rng = np.random.default_rng(3)
+    # A heavy tail inflates the standard deviation, hiding outliers from
+    # the mean/std check but not from the median/IQR check. Baselines only
+    # carry the sketch for columns of more than k values.
+    values = np.concatenate([rng.normal(size=4950), np.full(50, 1000.0)])
+    df = pd.DataFrame({"value": values})
+    statistics = gen_statistics(df)
+    constraints = gen_constraints(df)
+    x = pd.DataFrame({"value": [20.0]})
+
+    assert CheckEngine(statistics, constraints).check(x) == []
+
+    distribution = constraints.monitoring_config.distribution_constraints
+    distribution.comparison_method = "Robust"
+    assert CheckEngine(statistics, constraints).check(x) == [
+        FeatureAlert(name="value", kind="Outlier")
+    ]
+
+
+def test_validation_result_row_masks():
+    from flare.engine import CheckEngine
+    from flare.generators import gen_constraints, gen_statistics
+    import numpy as np
+
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame(
+        {
+            "value": rng.normal(size=1000),
+            "count": rng.integers(0, 10, size=1000),
+            "label": rng.choice(["a", "b"], size=1000),
+        }
+    )
+    engine = CheckEngine(gen_statistics(df), gen_constraints(df))
+    x = pd.DataFrame(
+        {
+            "value": [0.0, 100.0, np.nan, 0.5],
+            "count": [1, 2, -3, 4],
+            "label": ["a", "b", "a", "z"],
+        },
+        index=[10, 11, 12, 13],
+    )
+
+    result = engine.validate(x)
+    assert result.alerts == engine.check(x)
+    assert result.mask("value", "Outlier").tolist() == [0, 1, 0, 0]
+    assert result.mask("value", "Null").tolist() == [0, 0, 1, 0]
+    assert result.mask("count", "Negative").tolist() == [0, 0, 1, 0]
+    assert result.mask("label", "Categorical").tolist() == [0, 0, 0, 1]
+    assert result.count("count", "Bound") == 1
+    assert result.rate("value", "Null") == 0.25
+    assert result.count("label", "Null") == 0
+    assert list(x.index[result.valid_rows]) == [10]
+
+
+def test_domain_checks_match_isin():
+    from flare.engine import MAX_SET_LOOKUP_VALUES, CheckEngine
+    from flare.generators import gen_constraints
+    import numpy as np
+
+    rng = np.random.default_rng(8)
+    labels = ["a", "b", "c"]
+    engine = CheckEngine(
+        None, gen_constraints(pd.DataFrame({"label": labels * 10}))
+    )
+    values = np.array(labels + ["z", None, np.nan, 1, ["a"]], dtype=object)
+
+    for size in [1, 100, MAX_SET_LOOKUP_VALUES + 1]:
+        col = pd.Series(rng.choice(values, size=size), name="label")
+        expected = ~col.isin(labels).to_numpy()
+        categorical = col.where(col.isin(labels + ["z"])).astype("category")
+        for x, rows in [
+            (col, expected),
+            (categorical, ~categorical.isin(labels).to_numpy()),
+        ]:
+            result = engine.validate(x.to_frame())
+            assert result.mask("label", "Categorical").tolist() == list(rows)
+            assert result.count("label", "Categorical") == rows.sum()
+
+
+def test_categorical_columns_pass_end_to_end(monkeypatch, tmp_path):
+    from flare.alerting import Alert, AlertTarget
+    from flare.engine import CheckEngine
+    from flare.generators import NumpyEncoder, gen_constraints, gen_statistics
+    from flare.runtime import FLARE_CONSTRAINTS_PATH_VAR
+    import numpy as np
+
+    class RecordingTarget(AlertTarget):
+        def __init__(self):
+            self.alerts = []
+
+        def send_alert(self, alert: Alert) -> bool:
+            self.alerts.append(alert)
+            return True
+
+    rng = np.random.default_rng(11)
+    df = pd.DataFrame(
+        {
+            "value": rng.normal(size=1000),
+            "label": rng.choice(["a", "b", "c"], size=1000),
+        }
+    )
+    statistics, constraints = gen_statistics(df), gen_constraints(df)
+    for name, document, variable in [
+        ("statistics", statistics, FLARE_STATISTICS_PATH_VAR),
+        ("constraints", constraints, FLARE_CONSTRAINTS_PATH_VAR),
+    ]:
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps(asdict(document), cls=NumpyEncoder))
+        monkeypatch.setenv(variable, str(path))
+
+    x = df.head(100).astype({"label": "category"})
+    unknown = x.copy()
+    unknown["label"] = unknown["label"].cat.add_categories("z")
+    unknown.loc[unknown.index[0], "label"] = "z"
+
+    engine = CheckEngine(statistics, constraints)
+    assert engine.check(x) == []
+    assert engine.check(unknown) == [
+        FeatureAlert(name="label", kind="Categorical")
+    ]
+
+    target = RecordingTarget()
+    with Flare("categorical-model", x, target) as flare:
+        assert flare.feature_alerts == []
+    assert target.alerts == []
+
+
+def test_type_checks_by_dtype():
+    from flare.engine import CheckEngine
+    from flare.generators import gen_constraints
+
+    df = pd.DataFrame(
+        {
+            "a": ["x", "y"],
+            "b": ["x", "y"],
+            "c": ["x", "y"],
+            "d": ["x", "y"],
+            "n": [1.5, 2.5],
+            "i": [1, 2],
+        }
+    )
+    engine = CheckEngine(None, gen_constraints(df))
+    assert engine.check(df) == []
+    assert engine.check(df.astype({"a": "string", "b": "category"})) == []
+
+    x = pd.DataFrame(
+        {
+            "a": ["x", 1],
+            "b": [None, None],
+            "c": [1.0, 2.0],
+            "d": ["x", None],
+            "n": [1, 2],
+            "i": [1.0, 2.0],
+        }
+    )
+    assert [alert for alert in engine.check(x) if alert.kind == "Type"] == [
+        FeatureAlert(name=name, kind="Type")
+        for name in ["a", "b", "c", "n", "i"]
+    ]
+
+
+def test_check_record_matches_dataframe_path():
+    from flare.engine import CheckEngine
+    from flare.generators import gen_constraints, gen_statistics
+    import numpy as np
+
+    rng = np.random.default_rng(6)
+    df = pd.DataFrame(
+        {
+            "value": rng.normal(size=1000),
+            "count": rng.integers(0, 10, size=1000),
+            "label": rng.choice(["a", "b"], size=1000),
+        }
+    )
+    engine = CheckEngine(gen_statistics(df), gen_constraints(df))
+    candidates = {
+        "value": [0.5, 100.0, -3.0, np.nan, None, 1, "1.5", "x", True],
+        "count": [3, -1, 50, 2.0, np.nan, None, "4", np.int32(5)],
+        "label": ["a", "z", None, np.nan, 1, b"a"],
+    }
+
+    for _ in range(200):
+        record = {
+            name: values[rng.integers(len(values))]
+            for name, values in candidates.items()
+        }
+        assert engine.check_record(record) == engine.check(
+            pd.DataFrame([record])
+        ), record
+
+    record = np.array([100.0, -1.0, 0.0])
+    assert engine.check_record(
+        dict(zip(["value", "count", "label"], record))
+    ) == engine.check(pd.DataFrame([record], columns=engine.record_columns))
+    assert engine.check_record(record) == engine.check_record(
+        dict(zip(engine.record_columns, record.tolist()))
+    )
+
+
+def test_non_numeric_values_are_not_nulls(caplog):
+    from flare.engine import CheckEngine
+    from flare.generators import gen_constraints, gen_statistics
+    import logging
+    import numpy as np
+
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(
+        {"value": rng.normal(size=100), "count": rng.integers(0, 10, 100)}
+    )
+    engine = CheckEngine(gen_statistics(df), gen_constraints(df))
+    x = pd.DataFrame({"value": ["abc", 0.5], "count": [1, 2]})
+
+    with caplog.at_level(logging.WARNING, logger="flare"):
+        alerts = engine.check(x)
+    assert [(alert.name, alert.kind) for alert in alerts] == [
+        ("value", "Type")
+    ]
+    assert not caplog.records
+    assert engine.check_record({"value": "abc", "count": 1}) == alerts
+
+    # Actual nulls next to non-numeric values are still reported
+    x = pd.DataFrame({"value": ["abc", None], "count": [1, 2]})
+    assert {(alert.name, alert.kind) for alert in engine.check(x)} == {
+        ("value", "Type"),
+        ("value", "Null"),
+    }
+
+
+def test_validator_and_monitor_decorator(statistics):
+    from flare.alerting import Alert, AlertTarget
+    from flare.runtime import FlareValidator, monitor
+
+    class RecordingTarget(AlertTarget):
+        def __init__(self):
+            self.alerts = []
+
+        def send_alert(self, alert: Alert) -> bool:
+            self.alerts.append(alert)
+            return True
+
+    os.environ[FLARE_STATISTICS_PATH_VAR] = statistics
+    good = pd.DataFrame([[1.0, 2, "3"]], columns=["float", "int", "string"])
+    bad = pd.DataFrame([[-1.0, 4, "3"]], columns=["float", "int", "string"])
+    target = RecordingTarget()
+
+    validator = FlareValidator("test-model", target)
+    assert validator.validate(good) == []
+    assert validator.validate(bad) == [
+        FeatureAlert(name="float", kind="Bound"),
+        FeatureAlert(name="int", kind="Bound"),
+    ]
+    assert len(target.alerts) == 1
+
+    class Model:
+        @validator.monitor(argument="x")
+        def predict(self, x):
+            if len(x) == 0:
+                raise ValueError("empty")
+            return len(x)
+
+    assert Model().predict(good) == 1
+    assert len(target.alerts) == 1
+    assert Model().predict(x=bad) == 1
+    assert len(target.alerts) == 2
+
+    @monitor("test-model", target)
+    def predict(x):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        predict(bad)
+    assert len(target.alerts[-1].features) == 2
+    assert target.alerts[-1].exception is not None
+
+    # The input is found when passed by keyword, and a call without it
+    # runs unvalidated
+    @validator.monitor
+    def score(x=None, scale=1):
+        return scale * (0 if x is None else len(x))
+
+    assert score(x=bad, scale=2) == 2
+    assert len(target.alerts) == 4
+    assert score(scale=3) == 0
+    assert len(target.alerts) == 4
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import json
+import os
+import tempfile
+from dataclasses import asdict
+from flare.engine import CheckEngine
+from flare.generators import NumpyEncoder, gen_constraints, gen_statistics
+from flare.serialization import (
+    binary_to_json,
+    json_to_binary,
+    load_document,
+    read_binary_json,
+    write_binary,
+)
+from flare.statistics import Statistics
+from flare.constraints import Constraints
+
+
+def generate_dataframe() -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    return pd.DataFrame(
+        {
+            "value": rng.normal(size=10_000),
+            "count": rng.integers(0, 100, size=10_000),
+            "label": rng.choice(["a", "b", "c"], size=10_000),
+        }
+    )
+
+
+def test_json_binary_roundtrip_is_lossless():
+    statistics = gen_statistics(generate_dataframe())
+    document = json.loads(json.dumps(asdict(statistics), cls=NumpyEncoder))
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "statistics.json")
+        binary_path = os.path.join(directory, "statistics.flare")
+        roundtrip_path = os.path.join(directory, "roundtrip.json")
+        with open(json_path, "w") as f:
+            json.dump(document, f)
+
+        json_to_binary(json_path, binary_path)
+        binary_to_json(binary_path, roundtrip_path)
+        with open(roundtrip_path, "r") as f:
+            assert json.load(f) == document
+        assert read_binary_json(binary_path) == document
+        assert os.path.getsize(binary_path) < os.path.getsize(json_path)
+
+
+def test_binary_baseline_loads_like_json():
+    df = generate_dataframe()
+    statistics = gen_statistics(df)
+    constraints = gen_constraints(df)
+    x = pd.DataFrame({"value": [50.0], "count": [-1], "label": ["d"]})
+
+    with tempfile.TemporaryDirectory() as directory:
+        statistics_path = os.path.join(directory, "statistics.flare")
+        constraints_path = os.path.join(directory, "constraints.flare")
+        write_binary(statistics_path, statistics)
+        write_binary(constraints_path, constraints)
+
+        loaded_statistics = load_document(statistics_path, Statistics)
+        loaded_constraints = load_document(constraints_path, Constraints)
+        # Sketch levels long enough to be stored as arrays are mapped
+        numerical = loaded_statistics.features[0].numerical_statistics
+        data = numerical.distribution.kll.sketch.data  # type: ignore
+        assert any(isinstance(items, np.ndarray) for items in data)
+
+        assert CheckEngine(loaded_statistics, loaded_constraints).check(
+            x
+        ) == CheckEngine(statistics, constraints).check(x)
+
+
+def test_binary_domain_filter_is_mapped():
+    rng = np.random.default_rng(7)
+    vocabulary = np.array([f"sku-{i}" for i in range(5_000)], dtype=object)
+    df = pd.DataFrame({"sku": rng.choice(vocabulary, size=20_000)})
+    # JSON baselines hold the filter's bits as base64
+    string_constraints = (
+        gen_constraints(df, domain_filter_fpr=0.001)
+        .features[0]
+        .string_constraints
+    )
+    assert string_constraints is not None
+    assert string_constraints.domains == []
+    assert string_constraints.domain_filter is not None
+    assert isinstance(string_constraints.domain_filter.words, str)
+
+    constraints = gen_constraints(df, domain_filter_fpr=0.001, binary=True)
+
+    x = pd.DataFrame({"sku": ["sku-1", "sku-2", "other", None]})
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "constraints.flare")
+        write_binary(path, constraints)
+        loaded = load_document(path, Constraints)
+        domain_filter = loaded.features[0].string_constraints.domain_filter
+        assert isinstance(domain_filter.words, np.ndarray)  # type: ignore
+
+        engine = CheckEngine(None, loaded)
+        result = engine.validate(x)
+        assert result.mask("sku", "Categorical").tolist() == [
+            False,
+            False,
+            True,
+            True,
+        ]
+        assert engine.check_record({"sku": "sku-3"}) == []
+        assert engine.check_record({"sku": "other"}) == result.alerts
+
+    # Columns can be left out, e.g. IDs whose new values are expected
+    constraints = gen_constraints(
+        df, domain_filter_fpr=0.001, domain_filter_columns=[]
+    )
+    assert constraints.features[0].string_constraints is None
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd  # type: ignore
+from flare.profiling import profile_chunks, profile_dataframe
+from flare.sketches import KLL, BloomFilter, FrequentItems, HyperLogLog
+
+
+def test_kll_quantiles_are_accurate():
+    values = np.random.default_rng(1).normal(size=200_000)
+    sketch = KLL(k=200)
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+
+    assert sketch.count == len(values)
+    qs = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+    estimated = sketch.quantiles(qs)
+    # Compare ranks rather than values: KLL guarantees rank error
+    true_ranks = np.searchsorted(np.sort(values), estimated) / len(values)
+    assert np.all(np.abs(true_ranks - qs) < 0.02)
+    assert sum(len(items) for items in sketch.compactors) < 1000
+
+
+def test_kll_merge_and_roundtrip():
+    rng = np.random.default_rng(2)
+    left, right = KLL(k=200), KLL(k=200)
+    left.update(rng.uniform(0, 1, size=50_000))
+    right.update(rng.uniform(1, 2, size=50_000))
+    left.merge(right)
+
+    assert left.count == 100_000
+    assert abs(left.quantile(0.5) - 1.0) < 0.05
+
+    distribution = left.to_distribution()
+    assert sum(bucket.count for bucket in distribution.buckets) == 100_000
+    restored = KLL.from_distribution(distribution)
+    assert restored is not None
+    assert restored.quantile(0.5) == left.quantile(0.5)
+
+
+def test_hyperloglog_counts_merges_and_roundtrips():
+    ids = np.array([f"user-{i}" for i in range(200_000)], dtype=object)
+    left, right = HyperLogLog(precision=12), HyperLogLog(precision=12)
+    left.update(ids[:120_000])
+    right.update(ids[80_000:])
+    # Repeated values do not change the count
+    right.update(ids[80_000:100_000])
+    left.merge(right)
+
+    # 1.04 / sqrt(2**12) = 1.6% standard error
+    assert abs(left.count() / len(ids) - 1) < 0.05
+    restored = HyperLogLog.from_sketch(left.to_sketch())
+    assert restored.count() == left.count()
+
+    small = HyperLogLog()
+    small.update(np.array(["a", "b", "c", "a"], dtype=object))
+    assert round(small.count()) == 3
+    assert HyperLogLog().count() == 0
+
+
+def test_approximate_distinct_profile_matches_exact():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(
+        {
+            "id": [f"id-{i}" for i in rng.integers(0, 50_000, size=100_000)],
+            "color": rng.choice(["red", "green", "blue"], size=100_000),
+        }
+    )
+    exact = profile_dataframe(df)
+    approximate = profile_chunks(
+        np.array_split(df, 10), approximate_distinct=True, hll_precision=12
+    )
+
+    true_count = df["id"].nunique()
+    assert exact.columns["id"].distinct_count == true_count
+    assert (
+        abs(approximate.columns["id"].distinct_count / true_count - 1) < 0.05
+    )
+    # High-cardinality value counts are not kept
+    assert approximate.columns["id"].value_counts_overflow
+    assert len(approximate.columns["id"].value_counts) == 0
+
+    # Low-cardinality columns keep their exact counts and domains
+    assert (
+        approximate.to_constraints().features[1]
+        == exact.to_constraints().features[1]
+    )
+    statistics = approximate.to_statistics().features[1].string_statistics
+    assert statistics is not None and statistics.distinct_count == 3
+
+
+def test_frequent_items_are_mergeable_lower_bounds():
+    rng = np.random.default_rng(7)
+    values = pd.Series(
+        np.concatenate(
+            [
+                rng.choice(["a", "b", "c"], size=90_000, p=[0.5, 0.3, 0.2]),
+                [f"tail-{i}" for i in range(10_000)],
+            ]
+        )
+    ).sample(frac=1, random_state=0)
+    left, right = FrequentItems(capacity=50), FrequentItems(capacity=50)
+    for i, chunk in enumerate(np.array_split(values, 8)):
+        (left if i % 2 else right).update_counts(chunk.value_counts())
+    left.merge(right)
+
+    exact = values.value_counts()
+    top = left.top(3)
+    assert list(top.index) == ["a", "b", "c"]
+    assert left.n == len(values)
+    assert len(left.counts) <= 50
+    assert left.error <= len(values) / 51
+    for value, count in top.items():
+        assert exact[value] - left.error <= count <= exact[value]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    known = np.array([f"sku-{i}" for i in range(100_000)], dtype=object)
+    unknown = np.array([f"new-{i}" for i in range(100_000)], dtype=object)
+    bloom = BloomFilter.for_capacity(len(known), 0.01)
+    bloom.update(known)
+
+    assert bloom.contains(known).all()
+    assert bloom.contains(unknown).mean() < 0.02
+    values = np.array(["sku-7", "new-7", None, np.nan], dtype=object)
+    assert bloom.contains(values).tolist() == [
+        bloom.contains_value(value) for value in values
+    ]
+    assert bloom.contains(values)[0] and not bloom.contains(values)[2:].any()
+
+    for binary in [False, True]:
+        restored = BloomFilter.from_sketch(bloom.to_sketch(binary))
+        assert (restored.contains(unknown) == bloom.contains(unknown)).all()
+
+
+def test_bloom_filter_distinguishes_types():
+    bloom = BloomFilter.for_capacity(1000, 0.001)
+    bloom.update(np.array([str(i) for i in range(1000)], dtype=object))
+    values = np.array(["1", 1, 1.0, b"1", ["1"]], dtype=object)
+    assert bloom.contains(values).tolist() == [True] + [False] * 4
+    assert [bloom.contains_value(value) for value in values] == [
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]